@@ -4,18 +4,406 @@ Used by both main_clinics.py and main_ecom.py.
 """
 
 import asyncio
+import contextlib
+import functools
 import json
+import os
+import random
 import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Optional
 from urllib.parse import unquote, urljoin, urlparse
 
 import aiohttp
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
 import dns.resolver
+from dotenv import load_dotenv
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from playwright.async_api import Page
 
+from signatures import (
+    COOKIE_SIGNATURES,
+    FRAMEWORK_COOKIE_SIGNATURES,
+    CSP_MATCHER,
+    META_GENERATOR_MATCHER,
+    DNS_MATCHERS,
+    JS_INLINE_MATCHER,
+    JS_INLINE_VERSION,
+    MX_MATCHER,
+    MX_PREFIX_RULES,
+    MX_RANK,
+    MX_VARIANTS,
+    ROBOTS_MATCHER,
+)
+
+
+class PageSnapshot:
+    """
+    One fetched page, shared by every detector that looks at it.
+    Holds the raw HTML/text, source lists, anchors as (href, text) pairs and
+    meta tags as (name, content) pairs; lowercased forms are built on first
+    use and memoized, so a multi-MB page is lowercased at most once however
+    many detectors read it.
+    """
+
+    __slots__ = (
+        "url", "html", "text", "script_srcs", "iframe_srcs", "link_hrefs", "links", "meta",
+        "_html_lower", "_text_lower", "_sources_lower",
+    )
+
+    def __init__(self, url: str, html: str = "", text: str = "",
+                 script_srcs: list = None, iframe_srcs: list = None, link_hrefs: list = None,
+                 links: list = None, meta: list = None):
+        self.url = url
+        self.html = html or ""
+        self.text = text or ""
+        self.script_srcs = script_srcs or []
+        self.iframe_srcs = iframe_srcs or []
+        self.link_hrefs = link_hrefs or []
+        self.links = links or []
+        self.meta = meta or []
+        self._html_lower = None
+        self._text_lower = None
+        self._sources_lower = None
+
+    @property
+    def html_lower(self) -> str:
+        if self._html_lower is None:
+            self._html_lower = self.html.lower()
+        return self._html_lower
+
+    @property
+    def text_lower(self) -> str:
+        if self._text_lower is None:
+            self._text_lower = self.text.lower()
+        return self._text_lower
+
+    @property
+    def sources_lower(self) -> str:
+        """Script srcs, iframe srcs and link hrefs, lowercased and space-joined."""
+        if self._sources_lower is None:
+            self._sources_lower = " ".join(
+                s.lower() for s in self.script_srcs + self.iframe_srcs + self.link_hrefs
+            )
+        return self._sources_lower
+
+
+# Runs inside the page: everything the detectors read, in one structured payload.
+# Attribute values are raw getAttribute() strings (relative URLs kept as written);
+# html mirrors page.content() (doctype + outerHTML).
+HARVEST_JS = """
+() => {
+    const all = (sel) => Array.from(document.querySelectorAll(sel));
+    let html = "";
+    if (document.doctype) html = new XMLSerializer().serializeToString(document.doctype);
+    if (document.documentElement) html += document.documentElement.outerHTML;
+    return {
+        url: location.href,
+        html: html,
+        text: document.body ? document.body.innerText : "",
+        scripts: all("script[src]").map(el => el.getAttribute("src") || ""),
+        iframes: all("iframe[src]").map(el => el.getAttribute("src") || ""),
+        hrefs: all("link[href], a[href]").map(el => el.getAttribute("href") || ""),
+        anchors: all("a[href]").map(el => [el.getAttribute("href") || "", el.innerText || ""]),
+        meta: all("meta[content]").map(el => [
+            (el.getAttribute("name") || el.getAttribute("property") || "").toLowerCase(),
+            el.getAttribute("content") || "",
+        ]),
+    };
+}
+"""
+
+
+async def harvest_page(page: Page) -> PageSnapshot:
+    """
+    Snapshot the current page with a single page.evaluate round-trip instead of
+    one get_attribute/inner_text IPC call per element.
+    Script srcs: URLs from script tags (used for TECH_SIGNATURES matching).
+    Link hrefs: ALL hrefs (relative + absolute) — relative paths like
+    /wp-content/uploads/trustindex-feed-instagram-widget.css were previously
+    dropped and caused Trustindex/CF7/CSS-based signatures to be missed.
+    """
+    data = await page.evaluate(HARVEST_JS)
+
+    script_srcs = []
+    for src in data["scripts"]:
+        if not src:
+            continue
+        script_srcs.append(src)
+        # If this is a CDN-proxied URL that contains a wp-content path,
+        # also append the path component alone so plugin signatures match
+        # e.g. cdn-akhmn.nitrocdn.com/.../wp-content/plugins/gravityforms/...
+        if "wp-content" in src.lower():
+            path = urlparse(src).path
+            if path and path not in script_srcs:
+                script_srcs.append(path)
+
+    link_hrefs = []
+    for href in data["hrefs"]:
+        h = href.strip()
+        # Include relative + absolute; exclude non-URL values
+        if h and h != "#" and not h.startswith(("mailto:", "tel:", "javascript:")):
+            link_hrefs.append(h)
+
+    return PageSnapshot(
+        data["url"],
+        data["html"],
+        data["text"],
+        script_srcs,
+        [src for src in data["iframes"] if src],
+        link_hrefs,
+        links=[(href, text) for href, text in data["anchors"]],
+        meta=[(name, content) for name, content in data["meta"]],
+    )
+
+
+# -----------------------------------------------------------------------------
+# SQLite files behind the in-memory caches, kept off the event loop
+# -----------------------------------------------------------------------------
+
+class SqliteCacheStore:
+    """
+    The SQLite file behind a cache (DnsCache, ScriptScanCache). Every statement
+    runs on one worker thread, so the event loop never waits on the file or its
+    lock (shards share it). Reads are awaited; writes are buffered, last write
+    per key winning, and committed in batches in the background. close()
+    commits whatever is still buffered.
+    """
+
+    def __init__(self, path: str, schema: list, upsert: str):
+        self.path = path
+        self.schema = schema      # statements (sql, params) run when the file is opened
+        self.upsert = upsert      # executemany'd with the buffered rows
+        self._pending = {}        # key -> row
+        self._flusher = None
+        self._executor = None
+        self._db = None
+
+    def _conn(self):
+        # Worker thread only (or close(), once the worker has stopped)
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            for sql, params in self.schema:
+                db.execute(sql, params)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _read(self, sql: str, params: tuple) -> list:
+        try:
+            return self._conn().execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def _write(self, rows: list) -> None:
+        try:
+            db = self._conn()
+            db.executemany(self.upsert, rows)
+            db.commit()
+        except sqlite3.Error:
+            pass    # the memory copies still serve this run
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        rows = await self._run(self._read, sql, params)
+        return rows[0] if rows else None
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list:
+        return await self._run(self._read, sql, params)
+
+    def put(self, key, row: tuple) -> None:
+        """Buffer one row for the upsert; a background flush commits it."""
+        self._pending[key] = row
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        while self._pending:
+            rows = list(self._pending.values())
+            self._pending.clear()
+            await self._run(self._write, rows)
+
+    def close(self) -> None:
+        """Wait for the worker, commit what is still buffered, close the file."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._pending:
+            rows = list(self._pending.values())
+            self._pending.clear()
+            self._write(rows)
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# -----------------------------------------------------------------------------
+# DNS: native async lookups behind a shared, TTL-aware cache
+# -----------------------------------------------------------------------------
+
+DNS_LIFETIME = 5.0            # seconds per lookup, all nameservers and retries included
+DNS_KEEP_STALE = 30 * 86400   # expired answers stay on disk this long, for re-classification
+
+
+def _soa_negative_ttl(response) -> Optional[int]:
+    """Negative-caching TTL from a response's SOA (RFC 2308: min of SOA TTL and MINIMUM)."""
+    for rrset in getattr(response, "authority", None) or ():
+        if rrset.rdtype == dns.rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+class DnsCache:
+    """
+    Async DNS resolver (dnspython's asyncresolver, no thread pool) with a
+    cache keyed by (name, rdtype). Answers live for their record TTL, NXDOMAIN
+    and NoAnswer for the zone's negative TTL, both clamped to
+    [min_ttl, max_ttl]. Timeouts and server failures are not cached. A bounded
+    in-memory LRU sits in front of a SQLite file (a SqliteCacheStore), so
+    repeat runs and sharded processes share answers. Concurrent lookups of one
+    key share one query.
+    """
+
+    def __init__(self, path: Optional[str] = "data/dns_cache.sqlite", max_entries: int = 20000,
+                 min_ttl: int = 60, max_ttl: int = 86400, negative_ttl: int = 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl   # when the response carries no SOA
+        self.hits = 0
+        self.negative_hits = 0             # part of hits: cached NXDOMAIN / NoAnswer
+        self.misses = 0
+        self.errors = 0
+        self._lru = OrderedDict()          # (name, rdtype) -> (records or None, expires_at)
+        self._inflight = {}
+        self._resolver = None
+        self._db = SqliteCacheStore(path, [
+            # Frequent small commits: WAL without fsync-per-commit keeps bulk runs cheap
+            ("PRAGMA journal_mode=WAL", ()),
+            ("PRAGMA synchronous=NORMAL", ()),
+            ("CREATE TABLE IF NOT EXISTS answers (name TEXT NOT NULL, rdtype TEXT NOT NULL,"
+             " records TEXT, expires_at REAL NOT NULL, PRIMARY KEY (name, rdtype))", ()),
+            ("DELETE FROM answers WHERE expires_at < ?", (time.time() - DNS_KEEP_STALE,)),
+        ], "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)") if path else None
+
+    def _remember(self, key: tuple, entry: tuple) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def _load(self, key: tuple) -> Optional[tuple]:
+        entry = self._lru.get(key)
+        if entry is None and self._db is not None:
+            row = await self._db.fetchone(
+                "SELECT records, expires_at FROM answers WHERE name = ? AND rdtype = ?", key
+            )
+            if row is not None:
+                entry = (json.loads(row[0]) if row[0] is not None else None, row[1])
+                self._remember(key, entry)
+        if entry is None or entry[1] < time.time():
+            return None
+        self._lru.move_to_end(key)
+        return entry
+
+    def _store(self, key: tuple, records: Optional[list], ttl: int) -> None:
+        entry = (records, time.time() + max(self.min_ttl, min(ttl, self.max_ttl)))
+        self._remember(key, entry)
+        if self._db is not None:
+            self._db.put(key, (*key, json.dumps(records) if records is not None else None, entry[1]))
+
+    async def resolve(self, name: str, rdtype: str = "A") -> Optional[list]:
+        """
+        Record texts for name/rdtype (rdata.to_text(), e.g. "10 aspmx.l.google.com.").
+        [] when the name does not exist or has no such records; None when the
+        lookup failed (timeout, SERVFAIL, no nameservers) and may succeed later.
+        """
+        key = (name.lower().rstrip("."), rdtype.upper())
+        entry = await self._load(key)
+        if entry is not None:
+            self.hits += 1
+            if entry[0] is None:
+                self.negative_hits += 1
+                return []
+            return entry[0]
+        pending = self._inflight.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._query(key))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _query(self, key: tuple) -> Optional[list]:
+        try:
+            if self._resolver is None:
+                self._resolver = dns.asyncresolver.Resolver()
+                self._resolver.lifetime = DNS_LIFETIME
+            answer = await self._resolver.resolve(key[0], key[1], raise_on_no_answer=False)
+        except dns.resolver.NXDOMAIN as e:
+            ttl = next(filter(None, map(_soa_negative_ttl, e.responses().values())), None)
+            self._store(key, None, ttl if ttl is not None else self.negative_ttl)
+            return []
+        except (dns.exception.DNSException, OSError):
+            self.errors += 1
+            return None
+        if answer.rrset is None:             # NoAnswer
+            ttl = _soa_negative_ttl(answer.response)
+            self._store(key, None, ttl if ttl is not None else self.negative_ttl)
+            return []
+        records = [rdata.to_text() for rdata in answer.rrset]
+        self._store(key, records, answer.rrset.ttl)
+        return records
+
+    async def stored(self, rdtype: str) -> dict:
+        """
+        name -> record texts ([] for negative answers) for every stored answer of
+        rdtype, expired ones included. No queries; for re-classifying a corpus.
+        """
+        rdtype = rdtype.upper()
+        answers = {}
+        if self._db is not None:
+            await self._db.flush()
+            for name, records in await self._db.fetchall(
+                "SELECT name, records FROM answers WHERE rdtype = ?", (rdtype,)
+            ):
+                answers[name] = json.loads(records) if records is not None else []
+        for (name, kind), (records, _) in self._lru.items():
+            if kind == rdtype:
+                answers[name] = records if records is not None else []
+        return answers
+
+    def use_nameservers(self, hosts: list, port: int = 53) -> None:
+        """Query these servers instead of the system resolv.conf (e.g. a local stub)."""
+        self._resolver = dns.asyncresolver.Resolver(configure=False)
+        self._resolver.nameservers = list(hosts)
+        self._resolver.port = port
+        self._resolver.lifetime = DNS_LIFETIME
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+    def summary(self) -> str:
+        return (f"{self.hits} hits ({self.negative_hits} negative), {self.misses} misses, "
+                f"{self.errors} errors")
+
+
+DNS_CACHE = DnsCache()
+
 
 # Map snake_case provider keys to Title Case display strings.
 # "not_detected" and "privateemail" are kept lowercase (not in this mapping).
@@ -54,7 +442,71 @@ def _format_email_provider(raw: str) -> str:
     return ", ".join(formatted)
 
 
-async def get_email_provider(domain: str) -> str:
+# A variant is listed where the key it refines would be
+_MX_OUTPUT_RANK = {**MX_RANK, **{variant: MX_RANK[key] for key, (_, variant) in MX_VARIANTS.items()}}
+
+
+@functools.lru_cache(maxsize=65536)
+def _mx_host_keys(host: str) -> frozenset:
+    """Provider keys for one lowercased MX host (memoized: a few hosts serve most domains)."""
+    keys = set(MX_MATCHER.match(host))
+    for prefix, unless, key in MX_PREFIX_RULES:
+        if host.startswith(prefix) and not any(u in host for u in unless):
+            keys.add(key)
+    return frozenset(keys)
+
+
+def classify_mx(records: list) -> list:
+    """
+    Provider keys for one domain's MX records ("10 aspmx.l.google.com." or bare
+    hosts), in MX_SIGNATURES order, after MX_VARIANTS refinement.
+    """
+    hosts = [r.split()[-1].lower() for r in records if r.strip()]
+    keys = set()
+    for host in hosts:
+        keys |= _mx_host_keys(host)
+    for key, (marker, variant) in MX_VARIANTS.items():
+        if key in keys and any(marker in host for host in hosts):
+            keys.discard(key)
+            keys.add(variant)
+    return sorted(keys, key=_MX_OUTPUT_RANK.__getitem__)
+
+
+def email_provider_from_mx(records: Optional[list]) -> str:
+    """get_email_provider's value for a list of MX record texts ([] / None -> not_detected)."""
+    if not records:
+        return "not_detected"
+    keys = classify_mx(records)
+    # Has MX records but no known provider — self-hosted or obscure
+    return _format_email_provider(", ".join(keys) if keys else "privateemail")
+
+
+def classify_mx_batch(answers: list) -> list:
+    """
+    email_provider_from_mx over a whole column of MX answers (e.g. every cached
+    answer after a rule change). Identical record sets are classified once and
+    hosts are memoized, so a corpus of tens of thousands takes well under a second.
+    """
+    memo = {}
+    out = []
+    for records in answers:
+        key = tuple(records) if records else ()
+        if key not in memo:
+            memo[key] = email_provider_from_mx(list(key))
+        out.append(memo[key])
+    return out
+
+
+def _bare_domain(domain: str) -> str:
+    """'https://www.clinic.com.au/contact' -> 'clinic.com.au'."""
+    return (domain.replace("www.", "")
+                  .replace("http://", "")
+                  .replace("https://", "")
+                  .strip()
+                  .split('/')[0])
+
+
+async def get_email_provider(domain: str, cache: DnsCache = None) -> str:
     """
     Detect email provider from MX records.
     Returns comma-separated string if multiple providers found.
@@ -78,108 +530,53 @@ async def get_email_provider(domain: str) -> str:
       "Yahoo"              — Yahoo Mail
       "privateemail"       — Generic private/self-hosted (lowercase)
       "not_detected"       — MX lookup failed (lowercase)
+
+    Lookups go through DNS_CACHE (or cache), so domains seen earlier in this
+    run or a previous one (including ones without MX) are answered without a query.
     """
     try:
-        domain = (domain.replace("www.", "")
-                        .replace("http://", "")
-                        .replace("https://", "")
-                        .strip()
-                        .split('/')[0])
-
-        answers = await asyncio.get_event_loop().run_in_executor(
-            None, lambda: dns.resolver.resolve(domain, 'MX')
-        )
-        records = [str(r.exchange).lower() for r in answers]
-
-        providers = []
-
-        # Google — distinguish Workspace vs personal
-        if any("google" in r or "googlemail" in r for r in records):
-            # aspmx.l.google.com = Workspace; gmail-smtp-in = personal Gmail
-            if any("aspmx" in r for r in records):
-                providers.append("google_workspace")
-            else:
-                providers.append("gmail")
-
-        # Microsoft
-        if any("outlook.com" in r or "protection.outlook.com" in r
-               or "mail.protection.outlook.com" in r or "office365" in r for r in records):
-            providers.append("microsoft_365")
-
-        # Proofpoint (wraps M365/Google, but worth flagging — signals security investment)
-        if any("pphosted.com" in r for r in records):
-            providers.append("proofpoint")
-
-        # Mimecast
-        if any("mimecast.com" in r for r in records):
-            providers.append("mimecast")
-
-        # Zoho
-        if any("zoho.com" in r or "zohomail" in r for r in records):
-            providers.append("zoho")
-
-        # GoDaddy / Secureserver
-        if any("secureserver.net" in r or "godaddy.com" in r for r in records):
-            providers.append("godaddy")
-
-        # Fastmail
-        if any("fastmail" in r for r in records):
-            providers.append("fastmail")
+        return email_provider_from_mx(await (cache or DNS_CACHE).resolve(_bare_domain(domain), "MX"))
 
-        # Namecheap Private Email
-        if any("privateemail.com" in r for r in records):
-            providers.append("namecheap")
-
-        # Mailgun (sometimes used as primary MX)
-        if any("mailgun.org" in r for r in records):
-            providers.append("mailgun")
-
-        # SendGrid
-        if any("sendgrid.net" in r for r in records):
-            providers.append("sendgrid")
-
-        # Amazon SES
-        if any("amazonaws.com" in r or "amazonses.com" in r for r in records):
-            providers.append("amazon_ses")
-
-        # iCloud / Apple
-        if any("icloud.com" in r or "apple.com" in r for r in records):
-            providers.append("icloud")
-
-        # Yahoo
-        if any("yahoodns.net" in r or "yahoo.com" in r for r in records):
-            providers.append("yahoo")
-
-        # VentraIP / Synergy Wholesale (cPanel-based AU hosting)
-        if any("ventraip" in r or "synergywholesale" in r or "vendorinternet" in r
-               or "cpanelemailer" in r or "mxroute" in r for r in records):
-            providers.append("ventraip")
+    except Exception:
+        return "not_detected"
 
-        # Crazy Domains
-        if any("crazydomains" in r for r in records):
-            providers.append("crazy_domains")
 
-        # NetRegistry
-        if any("netregistry" in r for r in records):
-            providers.append("netregistry")
+async def cached_email_providers(domains: list, cache: DnsCache = None) -> list:
+    """
+    get_email_provider values for domains from stored MX answers only (expired
+    included, no queries), via classify_mx_batch. None where nothing is stored.
+    """
+    stored = await (cache or DNS_CACHE).stored("MX")
+    answers = [stored.get(_bare_domain(d).lower().rstrip(".")) for d in domains]
+    providers = classify_mx_batch([records or [] for records in answers])
+    return [p if records is not None else None for p, records in zip(providers, answers)]
 
-        # cPanel generic (mail.domain.com pattern = typical cPanel default)
-        if any(".mail.protection.outlook.com" not in r and "google" not in r and "microsoft" not in r
-               and re.search(r"^mail\.", r) for r in records):
-            providers.append("cpanel_shared")
 
-        if providers:
-            return _format_email_provider(", ".join(providers))
+# (name prefix, record type) looked up per domain by dns_fingerprint
+DNS_FINGERPRINT_QUERIES = (("", "TXT"), ("", "NS"), ("www.", "CNAME"))
 
-        # Has MX records but no known provider — self-hosted or obscure
-        return _format_email_provider("privateemail")
 
-    except dns.resolver.NXDOMAIN:
-        return "not_detected"
-    except dns.resolver.NoAnswer:
-        return "not_detected"
-    except Exception:
-        return "not_detected"
+async def dns_fingerprint(domain: str, cache: DnsCache = None) -> dict:
+    """
+    Tech hints from DNS alone, per DNS_SIGNATURES: SPF includes and verification
+    TXT records, the apex's NS, and the www CNAME. All record types are resolved
+    at once through the cache; failed lookups just contribute nothing.
+    Returns dict of category -> set of tool names (same shape as the page scans).
+    """
+    cache = cache or DNS_CACHE
+    domain = _bare_domain(domain)
+    answers = await asyncio.gather(*(
+        cache.resolve(prefix + domain, rdtype) for prefix, rdtype in DNS_FINGERPRINT_QUERIES
+    ))
+    found = {}
+    for (_, rdtype), records in zip(DNS_FINGERPRINT_QUERIES, answers):
+        if not records:
+            continue
+        # TXT strings over 255 chars arrive split: '"v=spf1 ... " "include:..."'
+        text = " ".join(r.replace('" "', "").strip('"') for r in records).lower()
+        for category, tool in DNS_MATCHERS[rdtype].match(text):
+            found.setdefault(category, set()).add(tool)
+    return found
 
 
 def detect_email_provider_from_addresses(emails: list) -> str:
@@ -204,27 +601,6 @@ def detect_email_provider_from_addresses(emails: list) -> str:
     return ""
 
 
-COOKIE_SIGNATURES = {
-    "_shopify_y":     ("cms", "Shopify"),
-    "shopify_pay":    ("cms", "Shopify"),
-    "hubspotutk":     ("crm", "HubSpot"),
-    "__hstc":         ("crm", "HubSpot"),
-    "hs":             ("crm", "HubSpot"),  # Guard: literal "hs" cookie set by HubSpot tracking (e.g. on Wix sites)
-    "__kla_id":       ("crm", "Klaviyo"),
-    "__cf_bm":        ("infra", "Cloudflare"),
-    "_cfuvid":        ("infra", "Cloudflare"),
-    "intercom-id":    ("live_chat", "Intercom"),
-    "intercom-session":("live_chat", "Intercom"),
-    "__lc_cid":       ("live_chat", "LiveChat"),
-    "_ga":            ("pixels", "Google Analytics 4"),
-    "_gid":           ("pixels", "Google Analytics 4"),
-    "_fbp":           ("pixels", "Meta Pixel"),
-    "_ttp":           ("pixels", "TikTok Pixel"),
-    "_hjid":          ("pixels", "Hotjar"),
-    "MUID":           ("pixels", "Microsoft Clarity"),
-}
-
-
 def detect_from_cookies(cookies: list) -> dict:
     """
     Detect tech from browser cookies set after page load.
@@ -243,25 +619,6 @@ def detect_from_cookies(cookies: list) -> dict:
     return found
 
 
-FRAMEWORK_COOKIE_SIGNATURES = {
-    # Laravel
-    "XSRF-TOKEN":           ("cms", "Laravel (Custom)"),
-    "_token":               ("cms", "Laravel (Custom)"),
-    # Django
-    "csrftoken":            ("cms", "Django (Custom)"),
-    "sessionid":            ("cms", "Django (Custom)"),
-    # Ruby on Rails
-    "_rails_session":       ("cms", "Rails (Custom)"),
-    # ASP.NET
-    "ASP.NET_SessionId":    ("cms", "ASP.NET (Custom)"),
-    "__RequestVerificationToken": ("cms", "ASP.NET (Custom)"),
-    # Next.js / Vercel
-    "__next_hmr_cb":        ("cms", "Next.js (Custom)"),
-    "next-auth.session-token": ("cms", "Next.js (Custom)"),
-    # Phoenix / Elixir
-    "_csrf_token":          ("cms", "Phoenix (Custom)"),
-}
-
 # Session cookie patterns that confirm Laravel when combined with XSRF-TOKEN
 LARAVEL_SESSION_PATTERN = re.compile(r'^[a-z0-9_]+_session$')
 
@@ -289,37 +646,6 @@ def detect_framework_from_cookies(cookies: list) -> dict:
     return found
 
 
-CSP_SIGNATURES = {
-    "mkt.dynamics.com":         ("crm", "Microsoft Dynamics 365"),
-    "dynamics.com":             ("crm", "Microsoft Dynamics 365"),
-    "cxondemand.com":           ("crm", "NICE CXone"),
-    "salesforce.com":           ("crm", "Salesforce"),
-    "pardot.com":               ("crm", "Salesforce"),
-    "marketo.net":              ("crm", "Adobe Marketo"),
-    "eloqua.com":               ("crm", "Oracle Eloqua"),
-    "hsforms.com":              ("crm", "HubSpot"),
-    "hs-scripts.com":           ("crm", "HubSpot"),
-    "klaviyo.com":              ("crm", "Klaviyo"),
-    "mypurecloud.com":          ("live_chat", "Genesys"),
-    "mypurecloud.com.au":       ("live_chat", "Genesys"),
-    "genesys.com":              ("live_chat", "Genesys"),
-    "zopim.com":                ("live_chat", "Zendesk"),
-    "zdassets.com":             ("live_chat", "Zendesk"),
-    "intercom.io":              ("live_chat", "Intercom"),
-    "tawk.to":                  ("live_chat", "Tawk.to"),
-    "formstack.com":            ("forms", "Formstack"),
-    "wpforms.com":              ("forms", "WPForms"),
-    "typeform.com":             ("forms", "Typeform"),
-    "jotform.com":              ("forms", "JotForm"),
-    "stripe.com":               ("payments", "Stripe"),
-    "authorize.net":            ("payments", "Authorize.net"),
-    "medipass.com.au":          ("payments", "Medipass"),
-    "coviu.com":                ("telehealth", "Coviu"),
-    "zoom.us":                  ("telehealth", "Zoom"),
-    "doxy.me":                  ("telehealth", "Doxy.me"),
-}
-
-
 def parse_csp_header(header_value: str) -> dict:
     """
     Scan Content-Security-Policy header value for known vendor domains.
@@ -330,81 +656,146 @@ def parse_csp_header(header_value: str) -> dict:
     found = {}
     if not header_value:
         return found
-    header_lower = header_value.lower()
-    for domain, (category, tool) in CSP_SIGNATURES.items():
-        if domain in header_lower:
-            found.setdefault(category, set()).add(tool)
+    for category, tool in CSP_MATCHER.match(header_value.lower()):
+        found.setdefault(category, set()).add(tool)
     return found
 
 
-META_GENERATOR_SIGNATURES = {
-    "wordpress": ("cms", "WordPress"),
-    "wix": ("cms", "Wix"),
-    "squarespace": ("cms", "Squarespace"),
-    "webflow": ("cms", "Webflow"),
-    "drupal": ("cms", "Drupal"),
-    "joomla": ("cms", "Joomla"),
-    "shopify": ("cms", "Shopify"),
-    "ghost": ("cms", "Ghost"),
-    "weebly": ("cms", "Weebly"),
-    "framer": ("cms", "Framer"),
-    "divi":      ("cms", "WordPress (Divi)"),
-    "elementor": ("cms", "WordPress (Elementor)"),
-    "avada":     ("cms", "WordPress (Avada)"),
-    "beaver builder": ("cms", "WordPress (Beaver Builder)"),
-    "wpbakery":  ("cms", "WordPress (WPBakery)"),
-}
-
-
-def detect_from_meta_generator(html: str) -> dict:
+def detect_from_meta_generator(snapshot: PageSnapshot) -> dict:
     """
     Check <meta name='generator' content='...'> tag.
     Most reliable CMS signal — it's self-reported.
     """
     found = {}
-    pattern = r'<meta[^>]+name=["\']generator["\'][^>]+content=["\'](.*?)["\']'
-    match = re.search(pattern, html, re.IGNORECASE)
-    if not match:
-        # Also try reversed attribute order
-        pattern2 = r'<meta[^>]+content=["\'](.*?)["\'][^>]+name=["\']generator["\']'
-        match = re.search(pattern2, html, re.IGNORECASE)
-    if match:
-        content = match.group(1).lower()
-        for keyword, (category, tool) in META_GENERATOR_SIGNATURES.items():
-            if keyword in content:
-                found.setdefault(category, set()).add(tool)
+    if snapshot.meta:
+        # Harvested pages: every generator tag (WordPress + page builder often both declare one)
+        contents = [content.lower() for name, content in snapshot.meta if name == "generator"]
+    else:
+        html_lower = snapshot.html_lower
+        pattern = r'<meta[^>]+name=["\']generator["\'][^>]+content=["\'](.*?)["\']'
+        match = re.search(pattern, html_lower)
+        if not match:
+            # Also try reversed attribute order
+            pattern2 = r'<meta[^>]+content=["\'](.*?)["\'][^>]+name=["\']generator["\']'
+            match = re.search(pattern2, html_lower)
+        contents = [match.group(1)] if match else []
+    for content in contents:
+        for category, tool in META_GENERATOR_MATCHER.match(content):
+            found.setdefault(category, set()).add(tool)
     return found
 
 
-JS_INLINE_SIGNATURES = {
-    "_learnq":              ("crm", "Klaviyo"),
-    "klaviyo":              ("crm", "Klaviyo"),
-    "fbq(":                 ("pixels", "Meta Pixel"),
-    "fbevents":             ("pixels", "Meta Pixel"),
-    "ttq.load":             ("pixels", "TikTok Pixel"),
-    "gtag(":                ("pixels", "Google Analytics 4"),
-    "window.intercomsettings": ("live_chat", "Intercom"),
-    "intercom(":            ("live_chat", "Intercom"),
-    "drift.load":           ("live_chat", "Drift"),
-    "driftt.com":           ("live_chat", "Drift"),
-    "__lc =":               ("live_chat", "LiveChat"),
-    "livechat":             ("live_chat", "LiveChat"),
-    "mixpanel.init":        ("pixels", "Mixpanel"),
-    "heap.load":            ("pixels", "Heap"),
-    "hj(":                  ("pixels", "Hotjar"),
-    "hotjar":               ("pixels", "Hotjar"),
-    "window.clarity":       ("pixels", "Microsoft Clarity"),
-    "pintrk(":              ("pixels", "Pinterest"),
-    "snaptr(":              ("pixels", "Snapchat"),
-    "hsq.push":             ("crm", "HubSpot"),
-    "mc.js":                ("crm", "Mailchimp"),
-    "mailchimp":            ("crm", "Mailchimp"),
-    "activecampaign":       ("crm", "ActiveCampaign"),
-    "cliniko":              ("pms_ehr", "Cliniko"),
-    "halaxy":               ("pms_ehr", "Halaxy"),
-    "hotdoc":               ("booking", "HotDoc"),
-    "healthengine":         ("booking", "HealthEngine"),
-}
+# -----------------------------------------------------------------------------
+# Shared HTTP client: one pooled aiohttp session for every non-browser fetch
+# -----------------------------------------------------------------------------
+
+HTTP_LIMIT = 100             # open connections in total
+HTTP_LIMIT_PER_HOST = 4      # per (host, port, TLS, proxy) — stays polite to one site
+HTTP_KEEPALIVE = 30          # seconds an idle connection is kept for reuse
+HTTP_DNS_TTL = 300           # seconds a resolved host stays in the connector's DNS cache
+HTTP_DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+
+class HttpView:
+    """
+    Per-caller defaults (headers, timeout, proxy) over the shared session, with
+    the request()/get()/head() subset of the ClientSession API SiteProbe and
+    SiteDiscovery use. Nothing to close: connections belong to the shared pool.
+    """
+
+    __slots__ = ("client", "headers", "timeout", "proxy")
+
+    def __init__(self, client: "HttpClient", headers: Optional[dict] = None,
+                 timeout: Optional[aiohttp.ClientTimeout] = None, proxy: Optional[str] = None):
+        self.client = client
+        self.headers = headers
+        self.timeout = timeout
+        self.proxy = proxy
+
+    def request(self, method: str, url: str, **kwargs):
+        if self.headers is not None:
+            kwargs.setdefault("headers", self.headers)
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        if self.proxy:
+            kwargs.setdefault("proxy", self.proxy)
+        return self.client.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+
+class HttpClient:
+    """
+    Process-wide aiohttp session behind one tuned TCPConnector (total and
+    per-host limits, keep-alive, DNS cache), created on first use inside the
+    running loop and closed with the run via close(). Trace hooks count
+    connections opened vs reused and DNS cache hits vs misses.
+    """
+
+    def __init__(self):
+        self._session = None
+        self.opened = 0
+        self.reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, ctx, params):
+            self.opened += 1
+
+        async def on_reuse(session, ctx, params):
+            self.reused += 1
+
+        async def on_dns_hit(session, ctx, params):
+            self.dns_hits += 1
+
+        async def on_dns_miss(session, ctx, params):
+            self.dns_misses += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        trace.on_dns_cache_hit.append(on_dns_hit)
+        trace.on_dns_cache_miss.append(on_dns_miss)
+        return trace
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_LIMIT,
+                limit_per_host=HTTP_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE,
+                ttl_dns_cache=HTTP_DNS_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=HTTP_DEFAULT_HEADERS, trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def view(self, headers: Optional[dict] = None, timeout: Optional[aiohttp.ClientTimeout] = None,
+             proxy: Optional[str] = None) -> HttpView:
+        return HttpView(self, headers, timeout, proxy)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def summary(self) -> str:
+        total = self.opened + self.reused
+        reuse = f" ({self.reused / total:.0%} reused)" if total else ""
+        return (f"{self.opened} connections opened, {self.reused} reused{reuse}; "
+                f"DNS cache {self.dns_hits} hits / {self.dns_misses} misses")
+
+
+HTTP = HttpClient()
+
 
 JS_SKIP_DOMAINS = [
     "google", "facebook", "cloudflare", "jquery", "bootstrap",
@@ -412,86 +803,1375 @@ JS_SKIP_DOMAINS = [
 ]
 
 
-async def scan_external_js(script_srcs: list, base_url: str) -> dict:
+JS_SCAN_BYTES = 100_000       # only the head of each script is scanned
+JS_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=5)
+MAX_JS_FETCHES = 8            # network fetches per scan_external_js call; cache hits are free
+
+
+async def read_capped(resp, limit: int) -> bytes:
+    """Body of an aiohttp response up to limit bytes (content.read(n) stops at the first chunk)."""
+    chunks, size = [], 0
+    async for chunk in resp.content.iter_chunked(min(limit, 65536)):
+        chunks.append(chunk[:limit - size])
+        size += len(chunks[-1])
+        if size >= limit:
+            break
+    return b"".join(chunks)
+
+
+def _scan_js_text(text: str) -> set:
+    return set(JS_INLINE_MATCHER.match(text[:JS_SCAN_BYTES].lower()))
+
+
+class ScriptScanCache:
     """
-    Fetch up to 3 third-party JS files and scan first 100kb for inline signatures.
+    URL-keyed cache of third-party script scans: only each script's
+    JS_INLINE_SIGNATURES hit set is kept, never its body. A bounded in-memory
+    LRU sits in front of a SQLite file (a SqliteCacheStore) that survives runs. Entries younger
+    than fresh_for are used as-is; older ones are revalidated with
+    If-None-Match / If-Modified-Since (a 304 keeps the hits), and entries from
+    another JS_INLINE_VERSION are rescanned. A script answering an error status
+    is stored as an empty hit set that stays fresh for failed_fresh_for only, so
+    a dead bundle shared by many sites is not refetched for each of them.
+    Concurrent lookups of one URL share a single fetch.
+    """
+
+    def __init__(self, path: Optional[str] = "data/script_scan_cache.sqlite",
+                 max_entries: int = 5000, fresh_for: float = 7 * 86400,
+                 failed_fresh_for: float = 6 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.fresh_for = fresh_for
+        self.failed_fresh_for = min(failed_fresh_for, fresh_for)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.revalidated = 0       # 304 Not Modified
+        self.fetched = 0           # full downloads
+        self.failed = 0            # error statuses, cached as empty hit sets
+        self.errors = 0
+        self._lru = OrderedDict()  # url -> (hits, etag, last_modified, checked_at)
+        self._inflight = {}
+        self._db = SqliteCacheStore(path, [
+            ("CREATE TABLE IF NOT EXISTS scripts (url TEXT PRIMARY KEY, hits TEXT NOT NULL,"
+             " etag TEXT, last_modified TEXT, checked_at REAL NOT NULL, version TEXT NOT NULL)", ()),
+        ], "INSERT OR REPLACE INTO scripts VALUES (?, ?, ?, ?, ?, ?)") if path else None
+
+    def _remember(self, url: str, entry: tuple) -> None:
+        self._lru[url] = entry
+        self._lru.move_to_end(url)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def _load(self, url: str) -> Optional[tuple]:
+        entry = self._lru.get(url)
+        if entry is not None:
+            self._lru.move_to_end(url)
+            return entry
+        if self._db is None:
+            return None
+        row = await self._db.fetchone(
+            "SELECT hits, etag, last_modified, checked_at FROM scripts WHERE url = ? AND version = ?",
+            (url, JS_INLINE_VERSION),
+        )
+        if row is None:
+            return None
+        entry = ({tuple(hit) for hit in json.loads(row[0])}, row[1], row[2], row[3])
+        self._remember(url, entry)
+        return entry
+
+    def _store(self, url: str, entry: tuple) -> None:
+        self._remember(url, entry)
+        if self._db is not None:
+            self._db.put(url, (url, json.dumps(sorted(entry[0])), entry[1], entry[2], entry[3],
+                               JS_INLINE_VERSION))
+
+    async def cached(self, url: str) -> Optional[set]:
+        """Hit set if a fresh entry exists (no network), else None."""
+        in_memory = url in self._lru
+        entry = await self._load(url)
+        if entry is None or time.time() - entry[3] > self.fresh_for:
+            return None
+        if in_memory:
+            self.memory_hits += 1
+        else:
+            self.disk_hits += 1
+        return entry[0]
+
+    async def scan(self, url: str, session=None) -> Optional[set]:
+        """Hit set for url: cached, revalidated or freshly fetched. None if unavailable."""
+        hits = await self.cached(url)
+        if hits is not None:
+            return hits
+        pending = self._inflight.get(url)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(url, session or HTTP.session))
+            self._inflight[url] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, url: str, session) -> Optional[set]:
+        stale = await self._load(url)
+        headers = {}
+        if stale is not None:
+            if stale[1]:
+                headers["If-None-Match"] = stale[1]
+            if stale[2]:
+                headers["If-Modified-Since"] = stale[2]
+        try:
+            async with session.get(url, timeout=JS_FETCH_TIMEOUT, headers=headers) as resp:
+                if resp.status == 304 and stale is not None:
+                    self.revalidated += 1
+                    self._store(url, (stale[0], stale[1], stale[2], time.time()))
+                    return stale[0]
+                if resp.status != 200:
+                    # Negative entry: checked_at is backdated so it goes stale
+                    # after failed_fresh_for rather than fresh_for
+                    self.failed += 1
+                    self._store(url, (set(), None, None,
+                                      time.time() - (self.fresh_for - self.failed_fresh_for)))
+                    return set()
+                body = (await read_capped(resp, JS_SCAN_BYTES * 4)).decode("utf-8", "ignore")
+                hits = _scan_js_text(body)
+                self.fetched += 1
+                self._store(url, (hits, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), time.time()))
+                return hits
+        except Exception:
+            self.errors += 1
+            return None
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+    def summary(self) -> str:
+        return (f"{self.memory_hits} memory + {self.disk_hits} disk hits, "
+                f"{self.revalidated} revalidated, {self.fetched} fetched, {self.failed} failed, "
+                f"{self.errors} errors")
+
+
+SCRIPT_SCAN_CACHE = ScriptScanCache()
+
+
+async def scan_external_js(script_srcs: list, base_url: str,
+                           cache: Optional[ScriptScanCache] = None, session=None) -> dict:
+    """
+    Scan third-party JS files (first 100kb) for inline signatures.
+    With a cache, scripts already scanned cost nothing and only up to
+    MAX_JS_FETCHES uncached ones go to the network (concurrently); without
+    one, up to MAX_JS_FETCHES scripts are downloaded.
+    session: ClientSession or HttpView to fetch with (default: the shared HTTP client).
     Returns dict of category -> set of tool names.
     """
+    if session is None:
+        session = HTTP.session
     found = {}
-    fetched = 0
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    to_fetch = []
 
-    for src in script_srcs:
-        if fetched >= 8:
-            break
+    for src in dict.fromkeys(script_srcs):
         if not src.startswith("http"):
             continue
         src_lower = src.lower()
         if any(skip in src_lower for skip in JS_SKIP_DOMAINS):
             continue
+        hits = await cache.cached(src) if cache is not None else None
+        if hits is not None:
+            for category, tool in hits:
+                found.setdefault(category, set()).add(tool)
+        elif len(to_fetch) < MAX_JS_FETCHES:
+            to_fetch.append(src)
+
+    async def fetch_uncached(src):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    src, timeout=aiohttp.ClientTimeout(total=5), headers=headers
-                ) as resp:
-                    if resp.status == 200:
-                        content = (await resp.text(errors="ignore"))[:100_000].lower()
-                        for sig, (category, tool) in JS_INLINE_SIGNATURES.items():
-                            if sig in content:
-                                found.setdefault(category, set()).add(tool)
-                        fetched += 1
+            async with session.get(src, timeout=JS_FETCH_TIMEOUT) as resp:
+                if resp.status == 200:
+                    return _scan_js_text((await read_capped(resp, JS_SCAN_BYTES * 4)).decode("utf-8", "ignore"))
         except Exception:
-            continue
+            pass
+        return None
 
-    return found
+    async def fetch_cached(src):
+        return await cache.scan(src, session)
 
+    fetch = fetch_cached if cache is not None else fetch_uncached
+    for hits in await asyncio.gather(*(fetch(src) for src in to_fetch)):
+        for category, tool in hits or ():
+            found.setdefault(category, set()).add(tool)
 
-ROBOTS_SIGNATURES = {
-    # CMS
-    "/wp-admin":        ("cms",   "WordPress"),
-    "/wp-content":      ("cms",   "WordPress"),
-    "shopify":          ("cms",   "Shopify"),
-    "squarespace":      ("cms",   "Squarespace"),
-    "wix":              ("cms",   "Wix"),
-    "webflow":          ("cms",   "Webflow"),
-    # WordPress plugins (Disallow paths)
-    "/wp-content/uploads/wpforms/":          ("forms",  "WPForms"),
-    "/wp-content/uploads/gravity_forms/":    ("forms",  "Gravity Forms"),
-    "/wp-content/plugins/contact-form-7/":   ("forms",  "Contact Form 7"),
-    "/wp-content/plugins/elementor/":        ("forms",  "Elementor Forms"),
-    "/wp-content/plugins/woocommerce/":      ("payments", "WooCommerce"),
-    # Hosting
-    "wpstaq":           ("infra", "WPStaq"),
-    "wpengine":         ("infra", "WP Engine"),
-    "kinsta":           ("infra", "Kinsta"),
-    "siteground":       ("infra", "SiteGround"),
-}
+    return found
 
 
-async def scan_robots_txt(base_url: str) -> dict:
+async def fetch_robots_txt(base_url: str, session=None) -> str:
     """
-    Fetch /robots.txt and scan for CMS path patterns.
-    Very reliable for WordPress (always has /wp-admin/).
+    Fetch /robots.txt and return its text ("" if missing or unreachable).
+    session: ClientSession or HttpView to use (default: the shared HTTP client).
     """
-    found = {}
+    if session is None:
+        session = HTTP.session
     try:
         parsed = urlparse(base_url)
         robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
         headers = {"User-Agent": "Mozilla/5.0"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                robots_url, timeout=aiohttp.ClientTimeout(total=5), headers=headers
-            ) as resp:
-                if resp.status == 200:
-                    content = (await resp.text(errors="ignore")).lower()
-                    for sig, (category, tool) in ROBOTS_SIGNATURES.items():
-                        if sig in content:
-                            found.setdefault(category, set()).add(tool)
+        async with session.get(
+            robots_url, timeout=aiohttp.ClientTimeout(total=5), headers=headers
+        ) as resp:
+            if resp.status == 200:
+                return await resp.text(errors="ignore")
     except Exception:
         pass
+    return ""
+
+
+async def scan_robots_txt(base_url: str, robots_text: str = None) -> dict:
+    """
+    Fetch /robots.txt and scan for CMS path patterns.
+    Very reliable for WordPress (always has /wp-admin/).
+    Pass robots_text when it was already downloaded (e.g. by SiteDiscovery).
+    """
+    found = {}
+    if robots_text is None:
+        robots_text = await fetch_robots_txt(base_url)
+    for category, tool in ROBOTS_MATCHER.match(robots_text.lower()):
+        found.setdefault(category, set()).add(tool)
     return found
 
 
+# -----------------------------------------------------------------------------
+# HTTP probe: check guessed subpage URLs before spending a browser navigation
+# -----------------------------------------------------------------------------
+
+PROBE_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=6)
+PROBE_BODY_LIMIT = 200_000          # bytes read when a body is needed for soft-404 checks
+# A bare "404" is not a marker: it matches real titles ("404 Dental", "Suite 404")
+SOFT_404_TITLE_MARKERS = ["not found", "page cannot be found", "doesn't exist", "does not exist"]
+
+
+def open_probe_session(proxy: Optional[str] = None) -> HttpView:
+    """
+    Per-clinic view of the shared HTTP client for SiteProbe / SiteDiscovery.
+    proxy: egress proxy URL for every request (the clinic's context proxy).
+    """
+    return HTTP.view(headers=PROBE_HEADERS, timeout=PROBE_TIMEOUT, proxy=proxy)
+
+
+def _normalize_probe_url(url: str) -> str:
+    """
+    Comparable form of a URL: lowercase host, no www, fragment or trailing slash.
+    The query is kept: /?page_id=12 (WordPress plain permalinks) is its own page.
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower().replace("www.", "")
+    return f"{host}{parsed.path.rstrip('/')}" + (f"?{parsed.query}" if parsed.query else "")
+
+
+def _page_fingerprint(html: str) -> tuple:
+    """(lowercased <title>, length) — enough to tell a catch-all page from a real one."""
+    match = re.search(r"<title[^>]*>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
+    title = re.sub(r"\s+", " ", match.group(1)).strip().lower() if match else ""
+    return title, len(html)
+
+
+def _same_page(a: tuple, b: tuple) -> bool:
+    """Same title and length within 5% (absorbs nonces, timestamps, CSRF tokens)."""
+    return a[0] == b[0] and abs(a[1] - b[1]) <= 0.05 * max(a[1], b[1], 1)
+
+
+class SiteProbe:
+    """
+    Cheap HEAD/GET existence check for one site's guessed subpage URLs.
+
+    filter() drops candidates that 404, redirect back to the homepage, or are
+    soft 404s. Looking like the homepage or like the site's answer for a path
+    that cannot exist only counts when that answer is its own page: a
+    client-rendered SPA serves one HTML shell for every route, so there the
+    fingerprints say nothing and the browser must render each candidate.
+    It returns the resolved final URLs, deduped,
+    in candidate order. Anything the probe cannot judge (blocked, 403/429/5xx,
+    network error) is kept, so the browser still gets its chance.
+    Results are memoized, so detectors probing the same path pay once.
+    """
+
+    __slots__ = ("session", "home_url", "_baseline", "_results")
+
+    def __init__(self, session, home_url: str):
+        self.session = session
+        self.home_url = home_url
+        self._baseline = None     # asyncio.Task -> (home final URL, home fp, catch-all fp or None, any-path-200)
+        self._results = {}        # candidate URL -> asyncio.Task -> final URL or None
+
+    async def _fetch(self, url: str, method: str = "GET"):
+        """Returns (status, final URL, body or "") — body only for GET."""
+        async with self.session.request(method, url, allow_redirects=True) as resp:
+            body = ""
+            if method == "GET":
+                body = (await read_capped(resp, PROBE_BODY_LIMIT)).decode("utf-8", errors="ignore")
+            return resp.status, str(resp.url), body
+
+    async def _load_baseline(self) -> tuple:
+        parsed = urlparse(self.home_url)
+        bogus_url = f"{parsed.scheme or 'https'}://{parsed.netloc}/crawl-atlas-probe-{random.randrange(10**9)}"
+        home, bogus = await asyncio.gather(
+            self._fetch(self.home_url), self._fetch(bogus_url), return_exceptions=True
+        )
+        home_final, home_fp = self.home_url, None
+        if not isinstance(home, BaseException) and home[0] == 200:
+            home_final, home_fp = home[1], _page_fingerprint(home[2])
+        # Sites that answer 200 for any path: remember what that page looks like,
+        # unless it is the homepage again (SPA shell) and tells nothing apart
+        catch_all_fp = None
+        any_path_ok = not isinstance(bogus, BaseException) and bogus[0] == 200
+        if any_path_ok:
+            catch_all_fp = _page_fingerprint(bogus[2])
+            if home_fp is None or _same_page(catch_all_fp, home_fp):
+                catch_all_fp = None
+        return _normalize_probe_url(home_final), home_fp, catch_all_fp, any_path_ok
+
+    async def _check(self, url: str):
+        """Final URL if url is worth a browser visit, else None."""
+        if self._baseline is None:
+            self._baseline = asyncio.ensure_future(self._load_baseline())
+        home_key, home_fp, catch_all_fp, any_path_ok = await self._baseline
+        try:
+            status, final_url, body = await self._fetch(url, "HEAD")
+            if status in (403, 405, 501) or (status == 200 and any_path_ok):
+                # HEAD refused, or a catch-all site where only the body tells pages apart
+                status, final_url, body = await self._fetch(url)
+        except Exception:
+            return url
+        if status in (404, 410):
+            return None
+        if status != 200:
+            return url
+        final_key = _normalize_probe_url(final_url)
+        if final_key == home_key:
+            return None                     # redirected back to the homepage
+        if body:
+            fp = _page_fingerprint(body)
+            if any(marker in fp[0] for marker in SOFT_404_TITLE_MARKERS):
+                return None
+            # Fingerprints only mean something when the site has a distinct not-found page
+            if catch_all_fp and (_same_page(fp, home_fp) or _same_page(fp, catch_all_fp)):
+                return None
+        return final_url
+
+    async def filter(self, candidates: list) -> list:
+        for url in candidates:
+            if url not in self._results:
+                self._results[url] = asyncio.ensure_future(self._check(url))
+        finals = await asyncio.gather(*(self._results[url] for url in candidates))
+        kept, seen = [], set()
+        for final_url in finals:
+            if final_url is None:
+                continue
+            key = _normalize_probe_url(final_url)
+            if key not in seen:
+                seen.add(key)
+                kept.append(final_url)
+        return kept
+
+
+# -----------------------------------------------------------------------------
+# Site discovery: robots.txt + sitemaps, ranked per target field
+# -----------------------------------------------------------------------------
+
+# Token -> weight, matched against URL path tokens and anchor-text tokens
+DISCOVERY_FIELD_TOKENS = {
+    "team": {
+        "team": 3, "staff": 3, "practitioners": 3, "practitioner": 3, "doctors": 3,
+        "dentists": 3, "clinicians": 3, "therapists": 3, "physiotherapists": 3,
+        "people": 2, "meet": 2, "our-team": 3, "about": 1, "who": 1,
+    },
+    "fees": {
+        "fees": 3, "fee": 3, "pricing": 3, "prices": 3, "price": 2, "costs": 3, "cost": 2,
+        "billing": 3, "bulk": 2, "medicare": 2, "payment": 2, "payments": 2, "rates": 2,
+        "insurance": 1, "funds": 1,
+    },
+    "booking": {
+        "book": 3, "booking": 3, "bookings": 3, "appointment": 3, "appointments": 3,
+        "schedule": 2, "online": 1, "now": 1, "reserve": 2,
+    },
+    "contact": {
+        "contact": 3, "enquire": 2, "enquiry": 2, "location": 2, "locations": 2,
+        "find": 1, "hours": 1, "directions": 2,
+    },
+    "services": {
+        "services": 3, "service": 2, "treatments": 3, "treatment": 2, "therapies": 2,
+        "conditions": 2, "what-we-do": 3, "what": 1,
+    },
+}
+
+# Path tokens that mark content pages (a blog post about "team building" is not the team page)
+DISCOVERY_PENALTY_TOKENS = {"blog", "news", "post", "posts", "article", "articles", "tag", "category", "author", "feed"}
+DISCOVERY_SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".xml", ".zip", ".doc", ".docx")
+SITEMAP_DEFAULT_PATHS = ["/sitemap.xml", "/sitemap_index.xml", "/wp-sitemap.xml"]
+SITEMAP_MAX_FILES = 8         # sitemap documents fetched per site (index + children)
+SITEMAP_MAX_URLS = 5000
+SITEMAP_MAX_BYTES = 2_000_000  # per sitemap document; a cut-off tail just loses its last <loc>s
+
+
+def _url_tokens(text: str) -> set:
+    """Lowercase word tokens plus hyphenated compounds (e.g. "our-team", "what-we-do")."""
+    text = text.lower()
+    tokens = set(t for t in re.split(r"[^a-z0-9]+", text) if t)
+    tokens.update(t for t in re.split(r"[^a-z0-9-]+", text) if "-" in t)
+    return tokens
+
+
+def score_url_for_field(field: str, url: str, anchor_text: str = "") -> float:
+    """
+    Relevance of a same-site URL for one target field, from its path tokens
+    and (if known) the anchor text linking to it. Shallow paths win ties.
+    """
+    weights = DISCOVERY_FIELD_TOKENS[field]
+    path = urlparse(url).path
+    path_tokens = _url_tokens(path)
+    score = sum(w for token, w in weights.items() if token in path_tokens)
+    if anchor_text:
+        anchor_tokens = _url_tokens(anchor_text)
+        score += 0.5 * sum(w for token, w in weights.items() if token in anchor_tokens)
+    if score <= 0:
+        return 0.0
+    if path_tokens & DISCOVERY_PENALTY_TOKENS:
+        score -= 2
+    depth = len([seg for seg in path.split("/") if seg])
+    return score - 0.25 * max(depth - 1, 0)
+
+
+def _parse_sitemap_hints(robots_text: str) -> list:
+    """Sitemap: lines from robots.txt."""
+    return [
+        line.split(":", 1)[1].strip()
+        for line in robots_text.splitlines()
+        if line.lower().startswith("sitemap:") and line.split(":", 1)[1].strip()
+    ]
+
+
+class SiteDiscovery:
+    """
+    Subpage discovery for one site: robots.txt Sitemap: hints, the usual
+    sitemap locations, sitemap index files, plus the homepage's own links.
+    Everything is fetched once (start() kicks it off early) and shared by
+    detectors, each of which asks for its top-k URLs via candidates().
+    """
+
+    __slots__ = ("session", "home_url", "_robots", "_sitemap")
+
+    def __init__(self, session, home_url: str):
+        self.session = session
+        self.home_url = home_url
+        self._robots = None       # asyncio.Task -> robots.txt text
+        self._sitemap = None      # asyncio.Task -> [same-site URLs]
+
+    def start(self) -> None:
+        if self._robots is None:
+            self._robots = asyncio.ensure_future(fetch_robots_txt(self.home_url, self.session))
+        if self._sitemap is None:
+            self._sitemap = asyncio.ensure_future(self._crawl_sitemaps())
+
+    def cancel(self) -> None:
+        """Stop any fetch still running (clinic finished or timed out)."""
+        for task in (self._robots, self._sitemap):
+            if task is not None:
+                task.cancel()
+
+    async def robots_txt(self) -> str:
+        self.start()
+        return await self._robots
+
+    async def sitemap_urls(self) -> list:
+        self.start()
+        return await self._sitemap
+
+    def _same_site(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower().replace("www.", "")
+        return host == urlparse(self.home_url).netloc.lower().replace("www.", "")
+
+    async def _fetch_sitemap(self, url: str) -> tuple:
+        """(is_index, [loc URLs]) for one sitemap document; (False, []) on failure."""
+        try:
+            async with self.session.get(url, allow_redirects=True) as resp:
+                if resp.status != 200:
+                    return False, []
+                body = (await read_capped(resp, SITEMAP_MAX_BYTES)).decode("utf-8", errors="ignore")
+        except Exception:
+            return False, []
+        locs = [unquote(loc.strip()) for loc in re.findall(r"<loc>\s*(.*?)\s*</loc>", body, re.IGNORECASE | re.DOTALL)]
+        return "<sitemapindex" in body[:2000].lower(), locs
+
+    async def _crawl_sitemaps(self) -> list:
+        parsed = urlparse(self.home_url)
+        root = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+        hints = _parse_sitemap_hints(await self._robots)
+        queue = list(dict.fromkeys(hints + [root + p for p in SITEMAP_DEFAULT_PATHS]))
+        fetched, urls = set(), []
+        while queue and len(fetched) < SITEMAP_MAX_FILES and len(urls) < SITEMAP_MAX_URLS:
+            # Pop until the batch is full: already-fetched URLs are consumed, never
+            # left at the head (an empty batch would spin without ever yielding)
+            batch = []
+            while queue and len(batch) < SITEMAP_MAX_FILES - len(fetched):
+                u = queue.pop(0)
+                if u not in fetched and u not in batch:
+                    batch.append(u)
+            if not batch:
+                break
+            fetched.update(batch)
+            for is_index, locs in await asyncio.gather(*(self._fetch_sitemap(u) for u in batch)):
+                if is_index:
+                    # Page sitemaps first: they hold /team, /fees; post sitemaps are mostly blog
+                    # (/sitemap.xml, /sitemap_index.xml, /wp-sitemap.xml often serve one index)
+                    children = sorted(locs, key=lambda u: ("page" not in u.lower(), "post" in u.lower()))
+                    queued = set(queue)
+                    for u in children:
+                        if u not in fetched and u not in queued:
+                            queue.append(u)
+                            queued.add(u)
+                else:
+                    urls.extend(u for u in locs if self._same_site(u))
+        return list(dict.fromkeys(urls))[:SITEMAP_MAX_URLS]
+
+    async def candidates(self, field: str, homepage: "PageSnapshot" = None, k: int = 3) -> list:
+        """
+        Top-k same-site URLs for field ("team", "fees", "booking", "contact",
+        "services"), ranked by score_url_for_field over sitemap URLs and the
+        homepage's links (whose anchor text counts too). [] if nothing scores.
+        """
+        anchors = {}
+        if homepage is not None:
+            for href, text in homepage.links:
+                href = href.strip()
+                if not href or href.startswith(("mailto:", "tel:", "#", "javascript:")):
+                    continue
+                full = urljoin(homepage.url or self.home_url, href).split("#")[0]
+                if self._same_site(full):
+                    anchors[full] = (anchors.get(full, "") + " " + text).strip()
+        pool = list(dict.fromkeys([*anchors, *await self.sitemap_urls()]))
+        scored = []
+        for url in pool:
+            if urlparse(url).path.lower().endswith(DISCOVERY_SKIP_EXTENSIONS):
+                continue
+            score = score_url_for_field(field, url, anchors.get(url, ""))
+            if score > 0:
+                scored.append((-score, len(url), url))
+        return [url for _, _, url in sorted(scored)[:k]]
+
+
+# -----------------------------------------------------------------------------
+# Proxy pool: egress proxies with health scoring, cooldowns and sticky domains
+# -----------------------------------------------------------------------------
+
+PROXY_BLOCK_STATUSES = (403, 407, 429)
+
+
+class ProxyStats:
+    """Running health of one proxy. Rates are EWMAs so old history fades."""
+
+    __slots__ = ("url", "latency", "fail_rate", "block_rate", "requests", "streak",
+                 "cooldown_until", "cooldowns", "ejected")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None       # EWMA seconds
+        self.fail_rate = 0.0
+        self.block_rate = 0.0
+        self.requests = 0
+        self.streak = 0           # consecutive failures or blocks
+        self.cooldown_until = 0.0
+        self.cooldowns = 0
+        self.ejected = False
+
+    def score(self) -> float:
+        """Lower is better; untried proxies look average so they get traffic."""
+        latency = self.latency if self.latency is not None else 2.0
+        return latency * (1 + 3 * self.block_rate + 2 * self.fail_rate)
+
+
+class ProxyPool:
+    """
+    Rotating egress proxies (e.g. Bright Data endpoints) for browser contexts
+    and aiohttp sessions.
+
+    choose(domain) prefers the proxy the domain is pinned to, so a site sees
+    one IP for its homepage, subpages, HTTP probes and later retries;
+    otherwise it picks a healthy proxy at random, weighted towards low latency
+    and block rates. Pins expire after sticky_ttl and are pruned as new ones
+    are made, so the table stays at about one TTL's worth of domains.
+    report() feeds each request's outcome back. A proxy on a failure/block
+    streak, or whose block rate climbs too high, is cooled down (doubling each
+    time) and after eject_after cooldowns dropped for the rest of the run.
+    """
+
+    def __init__(self, urls, sticky_ttl: float = 900.0, max_streak: int = 3,
+                 max_block_rate: float = 0.4, min_requests: int = 5, cooldown: float = 60.0,
+                 max_cooldown: float = 900.0, eject_after: int = 4, alpha: float = 0.2):
+        self.proxies = {url: ProxyStats(url) for url in dict.fromkeys(urls) if url}
+        if not self.proxies:
+            raise ValueError("ProxyPool needs at least one proxy URL")
+        self.sticky_ttl = sticky_ttl
+        self.max_streak = max_streak
+        self.max_block_rate = max_block_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.eject_after = eject_after
+        self.alpha = alpha
+        self._sticky = OrderedDict()   # domain -> (proxy url, expires), oldest first
+
+    @classmethod
+    def from_env(cls, var: str = "PROXY_URLS", **options) -> Optional["ProxyPool"]:
+        """Pool from a comma/space separated env var (or .env); None = connect directly."""
+        load_dotenv()
+        urls = [u for u in re.split(r"[\s,]+", os.environ.get(var, "")) if u]
+        return cls(urls, **options) if urls else None
+
+    @staticmethod
+    def label(url: str) -> str:
+        """host:port without credentials, for logs."""
+        parsed = urlparse(url)
+        return f"{parsed.hostname}:{parsed.port}" if parsed.port else str(parsed.hostname)
+
+    @staticmethod
+    def playwright_proxy(url: Optional[str]) -> Optional[dict]:
+        """Proxy URL → the `proxy` option of browser.new_context()."""
+        if not url:
+            return None
+        parsed = urlparse(url)
+        server = f"{parsed.scheme}://{parsed.hostname}" + (f":{parsed.port}" if parsed.port else "")
+        proxy = {"server": server}
+        if parsed.username:
+            proxy["username"] = unquote(parsed.username)
+            proxy["password"] = unquote(parsed.password or "")
+        return proxy
+
+    def healthy(self, url: str) -> bool:
+        stats = self.proxies.get(url)
+        return stats is not None and not stats.ejected and stats.cooldown_until <= time.monotonic()
+
+    def pinned(self, domain: str) -> Optional[str]:
+        """The proxy domain is pinned to, if the pin is live and the proxy healthy."""
+        pin = self._sticky.get(domain)
+        if pin and pin[1] > time.monotonic() and self.healthy(pin[0]):
+            return pin[0]
+        return None
+
+    def choose(self, domain: Optional[str] = None) -> str:
+        if domain:
+            pinned = self.pinned(domain)
+            if pinned:
+                return pinned
+        candidates = [p for p in self.proxies.values() if self.healthy(p.url)]
+        if not candidates:
+            # Everything is cooling down: use whichever recovers first rather than going direct
+            live = [p for p in self.proxies.values() if not p.ejected] or list(self.proxies.values())
+            chosen = min(live, key=lambda p: p.cooldown_until).url
+        else:
+            weights = [1 / p.score() for p in candidates]
+            chosen = random.choices(candidates, weights=weights)[0].url
+        if domain:
+            self.pin(domain, chosen)
+        return chosen
+
+    def pin(self, domain: str, url: str) -> None:
+        now = time.monotonic()
+        self._sticky[domain] = (url, now + self.sticky_ttl)
+        self._sticky.move_to_end(domain)
+        # Every pin gets the same TTL, so the expired ones are all at the front
+        # (with sticky_ttl <= 0 that is every pin, the new one included)
+        while self._sticky and next(iter(self._sticky.values()))[1] <= now:
+            self._sticky.popitem(last=False)
+
+    def report(self, url: Optional[str], latency: Optional[float] = None,
+               ok: bool = True, blocked: bool = False) -> None:
+        stats = self.proxies.get(url) if url else None
+        if stats is None:
+            return
+        a = self.alpha
+        stats.requests += 1
+        if latency is not None and ok:
+            stats.latency = latency if stats.latency is None else (1 - a) * stats.latency + a * latency
+        stats.fail_rate = (1 - a) * stats.fail_rate + a * (not ok and not blocked)
+        stats.block_rate = (1 - a) * stats.block_rate + a * blocked
+        stats.streak = 0 if ok and not blocked else stats.streak + 1
+
+        reason = None
+        if stats.streak >= self.max_streak:
+            reason = f"{stats.streak} failures in a row"
+        elif stats.requests >= self.min_requests and stats.block_rate > self.max_block_rate:
+            reason = f"block rate {stats.block_rate:.0%}"
+        if reason:
+            self._cool_down(stats, reason)
+
+    def _cool_down(self, stats: ProxyStats, reason: str) -> None:
+        stats.cooldowns += 1
+        if stats.cooldowns >= self.eject_after:
+            stats.ejected = True
+            print(f"🚫 Proxy {self.label(stats.url)} ejected ({reason})")
+        else:
+            pause = min(self.max_cooldown, self.cooldown * 2 ** (stats.cooldowns - 1))
+            stats.cooldown_until = time.monotonic() + pause
+            print(f"🧊 Proxy {self.label(stats.url)} cooling down {pause:.0f}s ({reason})")
+        # Probation afterwards: half the bad history, fresh streak
+        stats.streak = 0
+        stats.fail_rate /= 2
+        stats.block_rate /= 2
+        self._sticky = OrderedDict((d, pin) for d, pin in self._sticky.items() if pin[0] != stats.url)
+
+    def summary(self) -> str:
+        now = time.monotonic()
+        parts = []
+        for p in self.proxies.values():
+            state = "ejected" if p.ejected else "cooling" if p.cooldown_until > now else "ok"
+            latency = f"{p.latency:.1f}s" if p.latency is not None else "-"
+            parts.append(f"{self.label(p.url)} {state} {p.requests} req {latency} {p.block_rate:.0%} blocked")
+        return "; ".join(parts)
+
+
+# -----------------------------------------------------------------------------
+# Browser context pool: warm contexts handed to workers, cleaned between sites
+# -----------------------------------------------------------------------------
+
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+
+
+class PooledContext:
+    """
+    One pooled browser context and its current page, lent to one site at a time.
+    Register context listeners through on() so they are removed on release.
+    `lost` is set (by BrowserSupervisor) if the browser died while it was lent.
+    `proxy` is the egress proxy URL the context was created with (None = direct).
+    """
+
+    __slots__ = ("context", "page", "uses", "lost", "proxy", "_listeners", "_origins")
+
+    def __init__(self, context, page, proxy: Optional[str] = None):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.lost = False
+        self.proxy = proxy
+        self._listeners = []
+        self._origins = set()
+
+    def on(self, event: str, handler) -> None:
+        """context.on() that is undone automatically when the lease is returned."""
+        self.context.on(event, handler)
+        self._listeners.append((event, handler))
+
+    def _note_origin(self, request) -> None:
+        if request.is_navigation_request():
+            parsed = urlparse(request.url)
+            if parsed.scheme in ("http", "https"):
+                self._origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+
+class ContextPool:
+    """
+    Pre-initialized browser contexts (resource-blocking route installed, one
+    page open) handed out with acquire() and returned with release().
+
+    Between sites a context is cleaned: pool-tracked listeners removed, every
+    page closed (side tabs, sessionStorage, page listeners), storage of every
+    origin it navigated to wiped, cookies and permissions cleared, and a fresh
+    page opened. A context is recycled (closed and replaced) after max_uses
+    sites, when the caller reports a failure, or when cleaning fails.
+
+    Only `warm` of the `size` slots (default: all) are built by start(); the
+    rest are built the first time demand actually reaches them.
+
+    With a ProxyPool each context is created behind a proxy it chooses, and a
+    context whose proxy has been cooled down or ejected is recycled on release
+    so its replacement picks a healthy one. acquire(domain) keeps a domain on
+    its pinned proxy: an idle context behind that proxy is preferred, else the
+    context handed out is rebuilt behind it; the domain is (re)pinned either way.
+    """
+
+    def __init__(self, browser, size: int, max_uses: int = 50,
+                 block_resources: tuple = BLOCKED_RESOURCE_TYPES, warm: int = None,
+                 proxies: Optional[ProxyPool] = None, **context_options):
+        self.browser = browser
+        self.proxies = proxies
+        self.size = size
+        self.warm = size if warm is None else min(warm, size)
+        self.max_uses = max_uses
+        self.block_resources = tuple(block_resources)
+        self.context_options = context_options
+        self.created = 0
+        self.recycled = 0
+        # PooledContext, or None = slot to (re)build on acquire. LIFO so warm
+        # contexts are reused before a cold slot is ever built.
+        self._idle = asyncio.LifoQueue()
+        self._closed = False
+
+    async def _new_lease(self, domain: Optional[str] = None) -> PooledContext:
+        proxy = self.proxies.choose(domain) if self.proxies is not None else None
+        options = dict(self.context_options)
+        if proxy:
+            options["proxy"] = ProxyPool.playwright_proxy(proxy)
+        context = await self.browser.new_context(**options)
+        if self.block_resources:
+            blocked = self.block_resources
+
+            async def block_heavy_resources(route):
+                if route.request.resource_type in blocked:
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", block_heavy_resources)
+        lease = PooledContext(context, await context.new_page(), proxy)
+        # Pool-owned listener: remembers origins so release() can wipe their storage
+        context.on("request", lease._note_origin)
+        self.created += 1
+        return lease
+
+    async def start(self) -> None:
+        """Warm up `warm` contexts; the remaining slots stay cold."""
+        for _ in range(self.size - self.warm):
+            self._idle.put_nowait(None)
+        leases = await asyncio.gather(
+            *(self._new_lease() for _ in range(self.warm)), return_exceptions=True
+        )
+        for lease in leases:
+            self._idle.put_nowait(None if isinstance(lease, BaseException) else lease)
+
+    async def acquire(self, domain: Optional[str] = None) -> PooledContext:
+        lease = await self._idle.get()
+        if self._closed:
+            self._idle.put_nowait(None)   # pass the wake-up on to the next waiter
+            raise RuntimeError("context pool is closed")
+        wanted = self.proxies.pinned(domain) if domain and self.proxies is not None else None
+        if wanted and (lease is None or lease.proxy != wanted):
+            lease = self._swap_idle(lease, wanted)
+        if lease is not None and lease.proxy and (
+            lease.proxy != (wanted or lease.proxy) or not self.proxies.healthy(lease.proxy)
+        ):
+            self.recycled += 1            # wrong or unhealthy egress IP for this site: rebuild the slot
+            try:
+                await lease.context.close()
+            except Exception:
+                pass
+            lease = None
+        if lease is None:
+            try:
+                lease = await self._new_lease(domain)
+            except BaseException:
+                self._idle.put_nowait(None)   # give the slot back for the next caller
+                raise
+        if domain and lease.proxy:
+            self.proxies.pin(domain, lease.proxy)
+        return lease
+
+    def _swap_idle(self, lease: Optional[PooledContext], proxy: str) -> Optional[PooledContext]:
+        """Trade lease for an idle context already behind proxy, if there is one."""
+        idle = []
+        while not self._idle.empty():
+            idle.append(self._idle.get_nowait())
+        match = next((other for other in idle if other is not None and other.proxy == proxy), None)
+        if match is not None:
+            idle.remove(match)
+            idle.insert(0, lease)
+            lease = match
+        for other in reversed(idle):      # same LIFO order; a traded-in lease goes on top
+            self._idle.put_nowait(other)
+        return lease
+
+    async def _reset(self, lease: PooledContext) -> None:
+        context = lease.context
+        for event, handler in lease._listeners:
+            context.remove_listener(event, handler)
+        lease._listeners.clear()
+        for page in list(context.pages):
+            await page.close()
+        page = await context.new_page()
+        if lease._origins:
+            cdp = await context.new_cdp_session(page)
+            for origin in lease._origins:
+                await cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            await cdp.detach()
+            lease._origins.clear()
+        await context.clear_cookies()
+        await context.clear_permissions()
+        lease.page = page
+
+    async def release(self, lease: PooledContext, failed: bool = False) -> None:
+        """Return a lease: cleaned and reused, or recycled if failed / worn out."""
+        if self._closed:
+            try:
+                await lease.context.close()
+            except Exception:
+                pass
+            return
+        lease.uses += 1
+        if lease.proxy and not self.proxies.healthy(lease.proxy):
+            failed = True             # move this slot to a healthy proxy
+        if not failed and lease.uses < self.max_uses:
+            try:
+                await self._reset(lease)
+                self._idle.put_nowait(lease)
+                return
+            except Exception:
+                pass  # could not clean it — recycle below
+        self.recycled += 1
+        try:
+            await lease.context.close()
+        except Exception:
+            pass  # already closed by a crash — safe to ignore
+        try:
+            self._idle.put_nowait(await self._new_lease())
+        except Exception:
+            self._idle.put_nowait(None)
+
+    async def close(self) -> None:
+        """Close idle contexts; leases still out are closed when released and
+        callers blocked in acquire() get an error instead of waiting forever."""
+        self._closed = True
+        while not self._idle.empty():
+            lease = self._idle.get_nowait()
+            if lease is None:
+                continue
+            try:
+                await lease.context.close()
+            except Exception:
+                pass
+        self._idle.put_nowait(None)
+
+
+# -----------------------------------------------------------------------------
+# Adaptive concurrency: AIMD limit driven by latency, errors, loop lag and RSS
+# -----------------------------------------------------------------------------
+
+def process_rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted by AIMD instead of a fixed semaphore.
+
+    Callers hold a slot while working (`async with limiter.slot():`) and report
+    each item with record(latency, ok, timeout). Every `window` reports the
+    limiter looks at the window's p90 latency, error and timeout rates, the
+    worst event-loop lag seen and the process RSS: any of them over its
+    threshold halves the limit (multiplicative decrease); otherwise, if the
+    limit was actually saturated, it grows by one (additive increase).
+    """
+
+    def __init__(self, initial: int = 5, min_limit: int = 1, max_limit: int = 20,
+                 window: int = 10, p90_latency: float = 30.0, max_error_rate: float = 0.3,
+                 max_timeout_rate: float = 0.2, max_loop_lag: float = 0.5,
+                 max_rss_mb: Optional[float] = None, lag_interval: float = 0.25):
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.p90_latency = p90_latency
+        self.max_error_rate = max_error_rate
+        self.max_timeout_rate = max_timeout_rate
+        self.max_loop_lag = max_loop_lag
+        self.max_rss_mb = max_rss_mb
+        self.lag_interval = lag_interval
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self.last_reason = ""
+        self._samples = []          # (latency, ok, timeout) since the last decision
+        self._saturated = False
+        self._loop_lag = 0.0        # worst lag since the last decision
+        self._changed = asyncio.Condition()
+        self._lag_task = None
+
+    # -- slots ----------------------------------------------------------------
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._saturated = True
+
+    async def release(self) -> None:
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    # -- signals --------------------------------------------------------------
+
+    async def _watch_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            self._loop_lag = max(self._loop_lag, loop.time() - started - self.lag_interval)
+
+    def start(self) -> None:
+        """Start the event-loop lag monitor (call from inside the running loop)."""
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._watch_loop_lag())
+
+    def stop(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    async def record(self, latency: float, ok: bool = True, timeout: bool = False) -> None:
+        """Report one finished item; adjusts the limit once per full window."""
+        self._samples.append((latency, ok, timeout))
+        if len(self._samples) < self.window:
+            return
+        samples, self._samples = self._samples, []
+        latencies = sorted(s[0] for s in samples)
+        p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+        error_rate = sum(not s[1] for s in samples) / len(samples)
+        timeout_rate = sum(s[2] for s in samples) / len(samples)
+        lag, self._loop_lag = self._loop_lag, 0.0
+        rss = process_rss_mb() if self.max_rss_mb else None
+
+        distress = []
+        if p90 > self.p90_latency:
+            distress.append(f"p90 {p90:.1f}s")
+        if error_rate > self.max_error_rate:
+            distress.append(f"errors {error_rate:.0%}")
+        if timeout_rate > self.max_timeout_rate:
+            distress.append(f"timeouts {timeout_rate:.0%}")
+        if lag > self.max_loop_lag:
+            distress.append(f"loop lag {lag:.2f}s")
+        if rss is not None and rss > self.max_rss_mb:
+            distress.append(f"RSS {rss:.0f}MB")
+
+        async with self._changed:
+            if distress:
+                new_limit = max(self.min_limit, self.limit // 2)
+                if new_limit < self.limit:
+                    self.decreases += 1
+                    print(f"🎚️  Concurrency {self.limit} → {new_limit} ({', '.join(distress)})")
+                self.last_reason = ", ".join(distress)
+                self.limit = new_limit
+            elif self._saturated and self.limit < self.max_limit:
+                self.limit += 1
+                self.increases += 1
+                self.last_reason = f"healthy (p90 {p90:.1f}s)"
+                self.peak_limit = max(self.peak_limit, self.limit)
+                self._changed.notify_all()
+            self._saturated = self.in_flight >= self.limit
+
+    def summary(self) -> str:
+        return (f"limit {self.limit} (peak {self.peak_limit}, range {self.min_limit}-{self.max_limit}), "
+                f"{self.increases} up / {self.decreases} down"
+                + (f", last: {self.last_reason}" if self.last_reason else ""))
+
+
+# -----------------------------------------------------------------------------
+# Browser supervisor: relaunch on crash, recycle after N sites or a memory cap
+# -----------------------------------------------------------------------------
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Resident memory in MB of pid (default: this process) plus every descendant,
+    i.e. the Playwright driver and all Chromium processes it spawned.
+    None where /proc is unavailable.
+    """
+    root = os.getpid() if pid is None else pid
+    children, rss_pages = {}, {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    stat = f.read()
+                with open(f"/proc/{entry}/statm") as f:
+                    rss_pages[int(entry)] = int(f.read().split()[1])
+            except (OSError, ValueError, IndexError):
+                continue            # process exited while we were looking
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        page_mb = os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+    total, stack = 0, [root]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, ()))
+    return total * page_mb
+
+
+class BrowserSupervisor:
+    """
+    Owns the Chromium process and its ContextPool, and stands in for the pool
+    (same acquire() / release() / created / recycled), so scrapers need not
+    know the browser underneath can change.
+
+    - Crash: when the browser disconnects unexpectedly it is relaunched with a
+      fresh pool. Leases that were out on it are marked `lost`; callers should
+      re-run those sites, as their results are unreliable.
+    - Recycle: after `recycle_after` sites, or once the browser process tree
+      exceeds `max_memory_mb`, new acquires wait, in-flight sites finish on the
+      old browser, and it is replaced before work resumes.
+    """
+
+    def __init__(self, playwright, pool_size: int, launch_options: Optional[dict] = None,
+                 recycle_after: int = 500, max_memory_mb: Optional[float] = None,
+                 memory_check_every: int = 5, **pool_options):
+        self.playwright = playwright
+        self.pool_size = pool_size
+        self.launch_options = launch_options or {"headless": True}
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_every = memory_check_every
+        self.pool_options = pool_options
+        self.proxies = pool_options.get("proxies")
+        if self.proxies is not None and "proxy" not in self.launch_options:
+            # Chromium only honours per-context proxies if the launch sets one
+            self.launch_options = {**self.launch_options, "proxy": {"server": "http://per-context"}}
+        self.browser = None
+        self.pool = None
+        self.crashes = 0
+        self.relaunches = 0
+        self._retired_created = 0
+        self._retired_recycled = 0
+        self._sites = 0               # sites finished on the current browser
+        self._in_use = 0              # leases out on the current browser
+        self._issued = {}             # id(lease) -> (pool that issued it, lease)
+        self._ready = asyncio.Event()   # cleared while draining or relaunching
+        self._restarting = False
+        self._closing = False
+        self._replace_task = None
+
+    @property
+    def created(self) -> int:
+        return self._retired_created + (self.pool.created if self.pool else 0)
+
+    @property
+    def recycled(self) -> int:
+        return self._retired_recycled + (self.pool.recycled if self.pool else 0)
+
+    async def _launch(self) -> None:
+        browser = await self.playwright.chromium.launch(**self.launch_options)
+        browser.on("disconnected", lambda b: self._on_disconnected(b))
+        pool = ContextPool(browser, self.pool_size, **self.pool_options)
+        await pool.start()
+        self.browser, self.pool = browser, pool
+        self._sites = 0
+        self._in_use = 0
+        self._ready.set()
+
+    async def start(self) -> None:
+        await self._launch()
+
+    def _on_disconnected(self, browser) -> None:
+        if browser is not self.browser or self._closing or self._restarting:
+            return              # planned close, or an already-replaced browser
+        self.crashes += 1
+        for pool, lease in self._issued.values():
+            if pool is self.pool:
+                lease.lost = True
+        print(f"💥 Browser disconnected ({self._in_use} sites in flight) — relaunching")
+        self._ready.clear()     # hold new acquires until the relaunch is done
+        self._schedule_replace(crashed=True)
+
+    def _schedule_replace(self, crashed: bool = False) -> None:
+        # Own task: a site's timeout must never cancel a relaunch half-way
+        if self._replace_task is None or self._replace_task.done():
+            self._replace_task = asyncio.get_running_loop().create_task(self._replace(crashed))
+
+    async def _replace(self, crashed: bool = False) -> None:
+        if self._restarting:
+            return
+        self._restarting = True
+        self._ready.clear()
+        old_browser, old_pool = self.browser, self.pool
+        try:
+            self._retired_created += old_pool.created
+            self._retired_recycled += old_pool.recycled
+            self.pool = None
+            if not crashed:
+                await old_pool.close()
+            try:
+                await old_browser.close()
+            except Exception:
+                pass            # already gone
+            while True:
+                try:
+                    await self._launch()
+                    break
+                except Exception as e:
+                    print(f"🔥 Browser relaunch failed: {e} — retrying in 5s")
+                    await asyncio.sleep(5)
+            self.relaunches += 1
+        finally:
+            self._restarting = False
+
+    def _needs_recycle(self) -> Optional[str]:
+        if self._sites >= self.recycle_after:
+            return f"{self._sites} sites"
+        if self.max_memory_mb and self._sites % self.memory_check_every == 0:
+            rss = process_tree_rss_mb()
+            if rss is not None and rss > self.max_memory_mb:
+                return f"{rss:.0f}MB resident"
+        return None
+
+    async def acquire(self, domain: Optional[str] = None) -> PooledContext:
+        while True:
+            await self._ready.wait()
+            pool = self.pool
+            try:
+                lease = await pool.acquire(domain)
+            except Exception:
+                if pool is self.pool and self._ready.is_set():
+                    raise
+                continue        # that browser died while we waited — try the new one
+            if pool is self.pool and self._ready.is_set():
+                break
+            # Browser started draining or was replaced while we waited: hand it back
+            await self._give_back(pool, lease, failed=pool is not self.pool)
+        self._issued[id(lease)] = (pool, lease)
+        self._in_use += 1
+        return lease
+
+    async def _give_back(self, pool, lease, failed: bool) -> None:
+        try:
+            await pool.release(lease, failed=failed)
+        except Exception:
+            pass                # its browser is gone — nothing to clean
+
+    async def release(self, lease: PooledContext, failed: bool = False) -> None:
+        pool, _ = self._issued.pop(id(lease), (None, None))
+        if pool is not self.pool:
+            # Issued by a browser that has since crashed or been recycled; returning
+            # it still wakes anyone blocked on that pool so they can move on
+            await self._give_back(pool, lease, failed=True)
+            return
+        self._in_use -= 1
+        self._sites += 1
+        await pool.release(lease, failed=failed)
+        if not self._restarting and self._ready.is_set():
+            reason = self._needs_recycle()
+            if reason:
+                print(f"♻️  Recycling browser after {reason} — draining {self._in_use} in flight")
+                self._ready.clear()
+        if not self._ready.is_set() and not self._restarting and self._in_use == 0:
+            self._schedule_replace()
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._replace_task is not None and not self._replace_task.done():
+            await self._replace_task
+        if self.pool is not None:
+            await self.pool.close()
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+
+
+# -----------------------------------------------------------------------------
+# Failure classification: what kind of error a scrape result carries
+# -----------------------------------------------------------------------------
+
+# Checked in order against the lowercased error text; first match wins
+FAILURE_CLASSES = [
+    ("dns",        ("err_name_not_resolved", "err_name_resolution_failed", "getaddrinfo",
+                    "nxdomain", "name or service not known")),
+    ("tls",        ("err_cert_", "err_ssl_", "ssl_error", "ssl:", "certificate")),
+    ("timeout",    ("timeout", "err_timed_out", "timed out")),
+    ("connection", ("err_connection_", "err_empty_response", "err_address_unreachable",
+                    "err_network_changed", "err_internet_disconnected", "err_http2_",
+                    "connection reset", "connection refused")),
+    ("crash",      ("target closed", "has been closed", "browser has disconnected",
+                    "crashed", "worker error", "context pool is closed")),
+]
+HTTP_STATUS_IN_ERROR = re.compile(r"\bhttp (\d{3})\b")
+
+
+def classify_failure(error: Optional[str]) -> Optional[str]:
+    """
+    Bucket an error message: "dns", "tls", "timeout", "connection", "crash",
+    "http_4xx", "http_5xx" or "other". None when there is no error.
+    """
+    if not error:
+        return None
+    text = error.lower()
+    status = HTTP_STATUS_IN_ERROR.search(text)
+    if status:
+        return f"http_{status.group(1)[0]}xx"
+    for failure, markers in FAILURE_CLASSES:
+        if any(marker in text for marker in markers):
+            return failure
+    return "other"
+
+
+# -----------------------------------------------------------------------------
+# Deadline budgets: one per-site deadline sliced across stages
+# -----------------------------------------------------------------------------
+
+class DeadlineBudget:
+    """
+    A site-wide deadline handed down through the crawl. Each stage runs under
+    run(stage, awaitable), capped by its share of the total (shares maps stage
+    name -> fraction; unlisted stages may use everything left) and by what is
+    left overall. A stage that runs out is cancelled, recorded in `cut`, and
+    its default returned, so the caller keeps everything gathered so far.
+    A TimeoutError raised inside the stage before its slice is up (an aiohttp
+    or inner wait_for timeout) also returns the default, but is not a cut.
+    """
+
+    def __init__(self, total: float, shares: Optional[Dict[str, float]] = None):
+        self.total = total
+        self.shares = shares or {}
+        self.deadline = time.monotonic() + total
+        self.cut = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def stage_timeout(self, stage: str) -> float:
+        share = self.shares.get(stage)
+        left = self.remaining()
+        return min(left, share * self.total) if share is not None else left
+
+    def timeout_ms(self, default_ms: int, stage: Optional[str] = None) -> int:
+        """Playwright-style timeout: default_ms, but never past the stage's slice."""
+        left = self.stage_timeout(stage) if stage else self.remaining()
+        return max(1, int(min(default_ms, left * 1000)))
+
+    async def run(self, stage: str, awaitable, default=None):
+        timeout = self.stage_timeout(stage)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            elif isinstance(awaitable, asyncio.Future):
+                awaitable.cancel()
+            self.cut.append(stage)
+            return default
+        if timeout == float("inf"):
+            return await awaitable
+        loop = asyncio.get_running_loop()
+        stage_deadline = loop.time() + timeout
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            if loop.time() < stage_deadline:
+                return default
+            self.cut.append(stage)
+            print(f"  ⏳ Budget: '{stage}' cut after {timeout:.1f}s")
+            return default
+
+
 def extract_email(text: str) -> Optional[str]:
     """Extract email address from text using regex."""
     email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
@@ -776,9 +2456,9 @@ def extract_phone(text: str) -> Optional[str]:
     return None
 
 
-def extract_social_media(html: str) -> Dict[str, str]:
+def extract_social_media(snapshot: PageSnapshot) -> Dict[str, str]:
     """Extract social media presence from HTML. Only detects actionable links/embeds."""
-    html_lower = html.lower()
+    html_lower = snapshot.html_lower
 
     # Instagram: must be a linked profile, not just a mention
     has_instagram = bool(re.search(
@@ -890,6 +2570,149 @@ def init_google_sheets(sheet_key_or_url: str, service_account_file: str = 'servi
         raise
 
 
+# -----------------------------------------------------------------------------
+# Sheets batch writer: buffered row updates, one batch_update per flush
+# -----------------------------------------------------------------------------
+
+SHEET_BATCH_ROWS = 50           # flush once this many distinct ranges are waiting...
+SHEET_FLUSH_INTERVAL = 10.0     # ...or the oldest has waited this long (seconds)
+SHEET_RETRY_STATUSES = {429, 500, 502, 503}   # quota / transient; anything else fails the batch
+SHEET_MAX_RETRIES = 8
+SHEET_MAX_BACKOFF = 120.0
+
+
+def _sheet_error_status(error: Exception) -> Optional[int]:
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def sheet_batch_update(worksheet, updates: dict, max_retries: int = SHEET_MAX_RETRIES,
+                       max_backoff: float = SHEET_MAX_BACKOFF) -> None:
+    """
+    Write {range: rows} with one worksheet.batch_update. Quota (429) and 5xx
+    errors, and connection errors, are retried with exponential backoff plus
+    jitter; anything else, or running out of retries, raises. Blocking.
+    """
+    data = [{"range": range_name, "values": values} for range_name, values in updates.items()]
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        try:
+            worksheet.batch_update(data)
+            return
+        except (gspread.exceptions.APIError, OSError) as e:
+            status = _sheet_error_status(e)
+            if attempt == max_retries or (status is not None and status not in SHEET_RETRY_STATUSES):
+                raise
+            wait = min(delay, max_backoff) * random.uniform(0.8, 1.2)
+            print(f"⏳ Sheets {'quota' if status == 429 else 'error'} ({status or type(e).__name__}) — "
+                  f"retrying {len(data)} ranges in {wait:.0f}s")
+            time.sleep(wait)
+            delay *= 2
+
+
+class SheetWriter:
+    """
+    Background writer that coalesces row updates into batch_update calls.
+    put() only buffers: a later write to the same range replaces the earlier
+    one. A flush runs when max_rows ranges are waiting or the oldest has
+    waited flush_interval, on its own thread (sheet_batch_update, so quota
+    errors back off there without blocking the loop or the crawl workers).
+    close() flushes whatever is left; call it in the runner's finally so
+    Ctrl-C still writes every finished row.
+    """
+
+    def __init__(self, worksheet, max_rows: int = SHEET_BATCH_ROWS,
+                 flush_interval: float = SHEET_FLUSH_INTERVAL):
+        self.worksheet = worksheet
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self.rows_written = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._pending = {}              # range -> rows
+        self._waiters = {}              # range -> futures resolved when it is written
+        self._oldest = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+    def start(self) -> "SheetWriter":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def put(self, range_name: str, rows: list) -> asyncio.Future:
+        """
+        Queue rows for range_name. The returned future resolves to True once
+        written (or False if the batch failed); awaiting it is optional.
+        """
+        if self._closed:
+            raise RuntimeError("SheetWriter is closed")
+        if range_name in self._pending:
+            self.coalesced += 1
+        elif self._oldest is None:
+            self._oldest = time.monotonic()
+        self._pending[range_name] = rows
+        done = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(range_name, []).append(done)
+        if len(self._pending) >= self.max_rows:
+            self._wake.set()
+        return done
+
+    async def _run(self) -> None:
+        while not self._closed:
+            timeout = self.flush_interval
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far as one batch."""
+        if not self._pending:
+            return
+        updates, waiters = self._pending, self._waiters
+        self._pending, self._waiters, self._oldest = {}, {}, None
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, sheet_batch_update, self.worksheet, updates
+            )
+            ok = True
+            self.batches += 1
+            self.rows_written += len(updates)
+        except Exception as e:
+            ok = False
+            self.failed += len(updates)
+            print(f"❌ Sheet batch of {len(updates)} ranges failed "
+                  f"({', '.join(list(updates)[:3])}{', …' if len(updates) > 3 else ''}): {e}")
+        for futures in waiters.values():
+            for done in futures:
+                if not done.done():
+                    done.set_result(ok)
+
+    async def close(self) -> None:
+        """Stop the background task and flush the rest (also after a cancellation)."""
+        self._closed = True
+        if self._task is not None:
+            self._wake.set()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def summary(self) -> str:
+        return (f"{self.rows_written} rows in {self.batches} batches, "
+                f"{self.coalesced} coalesced, {self.failed} failed")
+
+
 def get_current_timestamp() -> str:
     """Get current timestamp in YYYY-MM-DD HH:MM:SS format."""
     return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
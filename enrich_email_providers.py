@@ -0,0 +1,288 @@
+"""
+Bulk email-provider enrichment: MX lookups only, no browser.
+
+Reads clinic websites from the main_clinics sheet (column A) or a CSV, resolves
+MX for every domain at high concurrency through core.DNS_CACHE and writes the
+classified provider (same values as get_email_provider) to email_provider_stack
+(column B) in one batch update of the changed cells. Rows that already have a
+provider are left alone unless --all is given.
+
+    python enrich_email_providers.py [--all | --reclassify] [--concurrency N] [--nameserver HOST[:PORT]]
+    python enrich_email_providers.py --csv IN.csv [OUT.csv] [...]
+    python enrich_email_providers.py --selftest
+
+A CSV needs a website_url column (or has the URL in its first column); the
+output keeps every column and adds/fills email_provider_stack. --nameserver
+points the lookups at a specific server, e.g. a local stub for testing.
+--reclassify rewrites every row from the MX answers stored in the DNS cache
+(expired ones included) after an MX_SIGNATURES change, without re-querying.
+--selftest runs a CSV through a stub DNS server started in-process (no
+network, no cache file) and checks the providers written.
+"""
+
+import asyncio
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+from core import (
+    DNS_CACHE,
+    DnsCache,
+    cached_email_providers,
+    get_email_provider,
+    init_google_sheets,
+    sheet_batch_update,
+)
+
+MX_CONCURRENCY = 300          # lookups in flight; each is one UDP query, no browser
+PROGRESS_EVERY = 1000
+URL_COLUMN = "website_url"
+PROVIDER_COLUMN = "email_provider_stack"
+
+
+async def resolve_providers(urls: list, concurrency: int = MX_CONCURRENCY,
+                            cache: DnsCache = None) -> list:
+    """get_email_provider for every url (same order), at most `concurrency` at a time."""
+    cache = cache or DNS_CACHE
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def one(url):
+        nonlocal done
+        async with semaphore:
+            provider = await get_email_provider(url, cache)
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            print(f"  {done}/{len(urls)} resolved — DNS cache {cache.summary()}")
+        return provider
+
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+async def providers_for(urls: list, concurrency: int = MX_CONCURRENCY, reclassify: bool = False,
+                        cache: DnsCache = None) -> list:
+    """
+    Providers for urls. reclassify: classify the MX answers already stored in
+    DNS_CACHE (or cache) in one batch (seconds for the whole corpus after a
+    rule change); only urls with no stored answer are resolved.
+    """
+    if not reclassify:
+        return await resolve_providers(urls, concurrency, cache)
+    providers = await cached_email_providers(urls, cache)
+    missing = [idx for idx, provider in enumerate(providers) if provider is None]
+    print(f"  {len(urls) - len(missing)} re-classified from stored MX answers, {len(missing)} to resolve")
+    for idx, provider in zip(missing, await resolve_providers([urls[i] for i in missing], concurrency, cache)):
+        providers[idx] = provider
+    return providers
+
+
+def _needs_provider(current: str, overwrite: bool) -> bool:
+    return overwrite or current.strip() in ("", "not_detected")
+
+
+def _changed_ranges(indices) -> list:
+    """Sorted indices grouped into inclusive (first, last) runs of consecutive ones."""
+    runs = []
+    for idx in sorted(indices):
+        if runs and idx == runs[-1][1] + 1:
+            runs[-1][1] = idx
+        else:
+            runs.append([idx, idx])
+    return [tuple(run) for run in runs]
+
+
+# -----------------------------------------------------------------------------
+# Sheet
+# -----------------------------------------------------------------------------
+
+async def enrich_sheet(overwrite: bool = False, concurrency: int = MX_CONCURRENCY,
+                       reclassify: bool = False) -> int:
+    from main_clinics import SHEET_KEY_OR_URL, SERVICE_ACCOUNT_FILE
+
+    worksheet = init_google_sheets(SHEET_KEY_OR_URL, SERVICE_ACCOUNT_FILE, worksheet_name="main_clinics")
+    all_values = worksheet.get_all_values()
+
+    column = [row[1] if len(row) > 1 else "" for row in all_values[1:]]   # B2.. as read
+    todo = [
+        (idx, row[0].strip()) for idx, row in enumerate(all_values[1:])
+        if row and row[0].strip() and _needs_provider(column[idx], overwrite)
+    ]
+    print(f"📇 {len(todo)} of {len(column)} rows need an email provider")
+    if not todo:
+        return 0
+
+    providers = await providers_for([url for _, url in todo], concurrency, reclassify)
+    changed = set()
+    for (idx, _), provider in zip(todo, providers):
+        if provider != column[idx]:
+            column[idx] = provider
+            changed.add(idx)
+
+    # Only the changed cells of column B: one range per run of consecutive rows,
+    # all in a single batch_update (index 0 is row 2)
+    updates = {
+        f"B{first + 2}:B{last + 2}": [[value] for value in column[first:last + 1]]
+        for first, last in _changed_ranges(changed)
+    }
+    if updates:
+        sheet_batch_update(worksheet, updates)
+        print(f"  ✍️  Wrote {len(changed)} cells in {len(updates)} ranges")
+    return len(changed)
+
+
+# -----------------------------------------------------------------------------
+# CSV
+# -----------------------------------------------------------------------------
+
+async def enrich_csv(in_path: str, out_path: str = None, overwrite: bool = False,
+                     concurrency: int = MX_CONCURRENCY, reclassify: bool = False,
+                     cache: DnsCache = None) -> int:
+    with open(in_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return 0
+
+    header = rows[0]
+    url_col = header.index(URL_COLUMN) if URL_COLUMN in header else 0
+    if PROVIDER_COLUMN not in header:
+        header.append(PROVIDER_COLUMN)
+    provider_col = header.index(PROVIDER_COLUMN)
+    for row in rows[1:]:
+        row.extend([""] * (len(header) - len(row)))
+
+    todo = [
+        row for row in rows[1:]
+        if row[url_col].strip() and _needs_provider(row[provider_col], overwrite)
+    ]
+    print(f"📇 {len(todo)} of {len(rows) - 1} rows need an email provider")
+    providers = await providers_for([row[url_col].strip() for row in todo], concurrency, reclassify, cache)
+    for row, provider in zip(todo, providers):
+        row[provider_col] = provider
+
+    with open(out_path or in_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    return len(todo)
+
+
+# -----------------------------------------------------------------------------
+# Self-test: a local stub DNS server, no network
+# -----------------------------------------------------------------------------
+
+# domain -> MX records served by the stub ([] = no MX; absent = NXDOMAIN)
+SELFTEST_ZONE = {
+    "workspace.test": ["1 aspmx.l.google.com.", "5 alt1.aspmx.l.google.com."],
+    "m365.test": ["0 m365-test.mail.protection.outlook.com."],
+    "zoho.test": ["10 mx.zoho.com.au.", "20 mx2.zoho.com.au."],
+    "nomx.test": [],
+}
+# (website_url, email_provider_stack already in the CSV, expected afterwards)
+SELFTEST_ROWS = [
+    ("https://www.workspace.test/contact", "", "Google Workspace"),
+    ("m365.test", "not_detected", "Microsoft 365"),
+    ("http://zoho.test", "", "Zoho"),
+    ("nomx.test", "", "not_detected"),
+    ("missing.test", "", "not_detected"),
+    ("https://www.m365.test/", "Gmail", "Gmail"),           # already set: left alone
+]
+
+
+class _StubDnsServer(asyncio.DatagramProtocol):
+    """Answers every query from SELFTEST_ZONE and counts them."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        records = SELFTEST_ZONE.get(question.name.to_text().rstrip(".").lower())
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif records and question.rdtype == dns.rdatatype.MX:
+            response.answer.append(dns.rrset.from_text_list(question.name, 300, "IN", "MX", records))
+        self.queries += 1
+        self.transport.sendto(response.to_wire(), addr)
+
+
+async def selftest() -> bool:
+    """Run SELFTEST_ROWS through enrich_csv against a stub DNS server; True if all match."""
+    transport, stub = await asyncio.get_running_loop().create_datagram_endpoint(
+        _StubDnsServer, local_addr=("127.0.0.1", 0)
+    )
+    cache = DnsCache(path=None)
+    cache.use_nameservers(["127.0.0.1"], transport.get_extra_info("sockname")[1])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clinics.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows([[URL_COLUMN, PROVIDER_COLUMN]]
+                                        + [[url, current] for url, current, _ in SELFTEST_ROWS])
+            await enrich_csv(path, cache=cache)
+            await enrich_csv(path, cache=cache)    # second pass: answered from the cache
+            with open(path, newline="", encoding="utf-8") as f:
+                written = [row[1] for row in list(csv.reader(f))[1:]]
+    finally:
+        transport.close()
+
+    ok = True
+    for (url, _, expected), got in zip(SELFTEST_ROWS, written):
+        ok &= got == expected
+        print(f"{'✅' if got == expected else '❌'} {url}: {got!r} (expected {expected!r})")
+    # Each domain is queried once; the second pass and repeated domains hit the cache
+    queried_once = stub.queries == cache.misses and cache.hits > 0
+    ok &= queried_once
+    print(f"{'✅' if queried_once else '❌'} {stub.queries} queries to the stub — DNS cache {cache.summary()}")
+    return ok
+
+
+async def main(args: list) -> None:
+    if "--selftest" in args:
+        if not await selftest():
+            sys.exit(1)
+        return
+
+    reclassify = "--reclassify" in args
+    overwrite = reclassify or "--all" in args
+    args = [a for a in args if a not in ("--all", "--reclassify")]
+    options = {}
+    for flag in ("--concurrency", "--nameserver"):
+        if flag in args:
+            at = args.index(flag)
+            options[flag] = args[at + 1]
+            del args[at:at + 2]
+
+    if "--nameserver" in options:
+        host, _, port = options["--nameserver"].partition(":")
+        DNS_CACHE.use_nameservers([host], int(port or 53))
+    concurrency = int(options.get("--concurrency", MX_CONCURRENCY))
+
+    start_time = time.time()
+    try:
+        if args and args[0] == "--csv":
+            written = await enrich_csv(args[1], args[2] if len(args) > 2 else None, overwrite,
+                                       concurrency, reclassify)
+        else:
+            written = await enrich_sheet(overwrite, concurrency, reclassify)
+    finally:
+        DNS_CACHE.close()
+
+    print(f"\n✅ {written} providers written in {time.time() - start_time:.0f}s — "
+          f"DNS cache {DNS_CACHE.summary()}")
+
+
+if __name__ == "__main__":
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print(__doc__)
+    else:
+        asyncio.run(main(sys.argv[1:]))
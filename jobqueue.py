@@ -0,0 +1,338 @@
+"""
+Lease-based job queue for splitting crawl work across processes and machines.
+
+Workers claim jobs with a time-limited lease, heartbeat while they work, and
+complete or release them. A lease that runs out (worker killed, machine gone)
+is put back to pending by the next claim, so nothing is lost and finished jobs
+are never handed out again.
+
+Two interchangeable backends expose the same methods:
+  SQLiteJobQueue  — one SQLite file; its write lock serializes claims, so any
+                    number of local processes (or hosts on a shared disk) can use it
+  RemoteJobQueue  — client for a JobQueueServer, a small TCP broker that fronts
+                    a SQLiteJobQueue for machines without a shared disk
+open_job_queue("crawl_jobs.sqlite") / open_job_queue("tcp://host:8765") picks one.
+
+The broker has no access control beyond a shared token: it binds to 127.0.0.1
+unless given a host, and refuses a non-loopback host unless JOB_QUEUE_TOKEN is
+set (clients send the same JOB_QUEUE_TOKEN from their environment).
+
+    python jobqueue.py serve crawl_jobs.sqlite [host:port]
+    python jobqueue.py status <spec>
+"""
+
+import hmac
+import json
+import os
+import select
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3          # leases a job may burn before it is marked failed
+DEFAULT_BROKER_PORT = 8765
+DEFAULT_BROKER_HOST = "127.0.0.1"   # exposing the broker takes an explicit host (and a token)
+TOKEN_ENV = "JOB_QUEUE_TOKEN"
+
+Job = namedtuple("Job", ["job_id", "payload", "attempts"])   # attempts: leases so far, this one included
+
+
+# -----------------------------------------------------------------------------
+# SQLite backend
+# -----------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    owner       TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    result      TEXT,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+"""
+
+
+class SQLiteJobQueue:
+    """
+    Job queue stored in one SQLite file. Every call opens its own short
+    connection, so an instance can be shared by threads and the file by processes.
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")   # take the write lock up front
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _requeue_expired(self, conn, now: float) -> int:
+        return conn.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " owner = NULL, lease_until = NULL, updated_at = ?"
+            " WHERE state = 'leased' AND lease_until < ?",
+            (self.max_attempts, now, now),
+        ).rowcount
+
+    def enqueue(self, jobs: Iterable[Tuple[str, dict]]) -> int:
+        """Add (job_id, payload) pairs; ids already known (in any state) are left alone."""
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, updated_at) VALUES (?, ?, ?)",
+                [(str(job_id), json.dumps(payload), now) for job_id, payload in jobs],
+            )
+            return conn.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              limit: int = 1) -> List[Job]:
+        """Lease up to `limit` pending jobs to worker_id, re-queuing expired leases first."""
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            rows = conn.execute(
+                "SELECT job_id, payload, attempts FROM jobs WHERE state = 'pending' ORDER BY rowid LIMIT ?",
+                (limit,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_until = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                [(worker_id, now + lease_seconds, now, job_id) for job_id, _, _ in rows],
+            )
+        return [Job(job_id, json.loads(payload), attempts + 1) for job_id, payload, attempts in rows]
+
+    def heartbeat(self, worker_id: str, job_id: str,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease. False means the lease was lost and the job may be re-run elsewhere."""
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ?"
+                " WHERE job_id = ? AND owner = ? AND state = 'leased'",
+                (now + lease_seconds, now, str(job_id), worker_id),
+            ).rowcount == 1
+
+    def complete(self, worker_id: str, job_id: str, result: Optional[dict] = None) -> bool:
+        """Mark a leased job done. False if worker_id no longer holds the lease."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, owner = NULL, lease_until = NULL,"
+                " updated_at = ? WHERE job_id = ? AND owner = ? AND state = 'leased'",
+                (json.dumps(result) if result is not None else None, time.time(),
+                 str(job_id), worker_id),
+            ).rowcount == 1
+
+    def release(self, worker_id: str, job_id: str) -> bool:
+        """Give a leased job back to the queue unfinished (the attempt still counts)."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " owner = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE job_id = ? AND owner = ? AND state = 'leased'",
+                (self.max_attempts, time.time(), str(job_id), worker_id),
+            ).rowcount == 1
+
+    def requeue_expired(self) -> int:
+        with self._transaction() as conn:
+            return self._requeue_expired(conn, time.time())
+
+    def counts(self) -> Dict[str, int]:
+        with self._transaction() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+# -----------------------------------------------------------------------------
+# TCP broker: one JSON request / response per line, same methods as above
+# -----------------------------------------------------------------------------
+
+BROKER_OPS = ("enqueue", "claim", "heartbeat", "complete", "release", "requeue_expired", "counts")
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if self.server.token and not hmac.compare_digest(
+                    str(request.get("token", "")), self.server.token
+                ):
+                    raise PermissionError("bad or missing token")
+                op = request["op"]
+                if op not in BROKER_OPS:
+                    raise ValueError(f"unknown op {op!r}")
+                value = getattr(self.server.queue, op)(*request.get("args", []))
+                reply = {"ok": True, "value": value}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+            self.wfile.flush()
+
+
+class JobQueueServer(socketserver.ThreadingTCPServer):
+    """
+    TCP broker serving a SQLiteJobQueue (or anything with the same methods).
+    token: if set, every request must carry it; required for a non-loopback host.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue, host: str = DEFAULT_BROKER_HOST, port: int = DEFAULT_BROKER_PORT,
+                 token: Optional[str] = None):
+        if not token and host not in ("127.0.0.1", "localhost", "::1"):
+            raise ValueError(f"refusing to expose the job broker on {host} without a token "
+                             f"(set {TOKEN_ENV})")
+        self.queue = queue
+        self.token = token
+        super().__init__((host, port), _BrokerHandler)
+
+
+class RemoteJobQueue:
+    """Client for JobQueueServer with the SQLiteJobQueue interface (thread-safe)."""
+
+    def __init__(self, host: str, port: int = DEFAULT_BROKER_PORT, timeout: float = 30,
+                 token: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.token = token
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def _close(self):
+        for handle in (self._file, self._sock):
+            try:
+                if handle is not None:
+                    handle.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _dropped(self) -> bool:
+        """An idle connection only turns readable when the broker has closed it."""
+        try:
+            return bool(select.select([self._sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _call(self, op: str, *args):
+        request = {"op": op, "args": list(args)}
+        if self.token:
+            request["token"] = self.token
+        payload = (json.dumps(request) + "\n").encode()
+        with self._lock:
+            if self._file is not None and self._dropped():
+                self._close()
+            # Resend only if the request never got out: once it is sent the broker
+            # may have applied it (a second claim would lease another batch)
+            for attempt in range(2):
+                try:
+                    if self._file is None:
+                        self._connect()
+                    self._file.write(payload)
+                    self._file.flush()
+                    break
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+            try:
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("broker closed the connection")
+            except OSError:
+                self._close()
+                raise
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise RuntimeError(f"job broker: {reply['error']}")
+        return reply["value"]
+
+    def enqueue(self, jobs: Iterable[Tuple[str, dict]]) -> int:
+        return self._call("enqueue", [[str(job_id), payload] for job_id, payload in jobs])
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              limit: int = 1) -> List[Job]:
+        return [Job(*job) for job in self._call("claim", worker_id, lease_seconds, limit)]
+
+    def heartbeat(self, worker_id: str, job_id: str,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        return self._call("heartbeat", worker_id, job_id, lease_seconds)
+
+    def complete(self, worker_id: str, job_id: str, result: Optional[dict] = None) -> bool:
+        return self._call("complete", worker_id, job_id, result)
+
+    def release(self, worker_id: str, job_id: str) -> bool:
+        return self._call("release", worker_id, job_id)
+
+    def requeue_expired(self) -> int:
+        return self._call("requeue_expired")
+
+    def counts(self) -> Dict[str, int]:
+        return self._call("counts")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+def open_job_queue(spec: str):
+    """
+    'tcp://host[:port]' → RemoteJobQueue (token from JOB_QUEUE_TOKEN), anything
+    else is a SQLite file path.
+    """
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].partition(":")
+        return RemoteJobQueue(host, int(port or DEFAULT_BROKER_PORT), token=os.environ.get(TOKEN_ENV))
+    return SQLiteJobQueue(spec)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "serve":
+        host, _, port = (sys.argv[3] if len(sys.argv) > 3 else "").partition(":")
+        try:
+            server = JobQueueServer(SQLiteJobQueue(sys.argv[2]), host or DEFAULT_BROKER_HOST,
+                                    int(port or DEFAULT_BROKER_PORT), token=os.environ.get(TOKEN_ENV))
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        print(f"📮 Job broker on {server.server_address[0]}:{server.server_address[1]} → {sys.argv[2]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n⏹️  Broker stopped")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "status":
+        print(open_job_queue(sys.argv[2]).counts())
+    else:
+        print(__doc__)
@@ -5,9 +5,16 @@ CRM systems, practitioner counts, and service offerings.
 """
 
 import asyncio
+import contextlib
+import functools
 import json
+import multiprocessing
+import os
+import queue
 import random
 import re
+import socket
+import sys
 import time
 from typing import Dict
 from urllib.parse import urljoin, urlparse
@@ -16,6 +23,7 @@ from playwright.async_api import async_playwright, Page, TimeoutError as Playwri
 
 from core import (
     get_email_provider,
+    dns_fingerprint,
     detect_email_provider_from_addresses,
     detect_from_cookies,
     detect_framework_from_cookies,
@@ -28,6 +36,37 @@ from core import (
     init_google_sheets,
     get_current_timestamp,
     extract_all_emails,
+    PageSnapshot,
+    harvest_page,
+    SiteProbe,
+    SiteDiscovery,
+    open_probe_session,
+    AdaptiveLimiter,
+    DeadlineBudget,
+    BrowserSupervisor,
+    classify_failure,
+    ProxyPool,
+    PROXY_BLOCK_STATUSES,
+    HTTP,
+    SheetWriter,
+    sheet_batch_update,
+    SHEET_BATCH_ROWS,
+    SHEET_FLUSH_INTERVAL,
+    scan_external_js,
+    SCRIPT_SCAN_CACHE,
+    DNS_CACHE,
+)
+from jobqueue import open_job_queue, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+from signatures import (
+    TECH_SIGNATURES,
+    TECH_SOURCES_MATCHER,
+    TECH_TEXT_MATCHER,
+    VISIBLE_TEXT_LITERALS,
+    VISIBLE_TEXT_REGEXES,
+    VISIBLE_TEXT_AUTOMATON,
+    HEADER_MATCHER,
+    SIGNATURE_VERSION,
+    classify_request_url,
 )
 
 
@@ -115,7 +154,7 @@ def _vendor_name_from_domain(domain: str) -> str:
     return domain
 
 
-async def detect_booking_type(page, base_url: str) -> dict:
+async def detect_booking_type(snapshot: PageSnapshot, base_url: str) -> dict:
     """
     Detect whether clinic booking is embedded, external_vendor, or not_detected.
 
@@ -127,6 +166,7 @@ async def detect_booking_type(page, base_url: str) -> dict:
        - If iframe src matches known vendor → external_vendor (embedded iframe)
        - If iframe src is own subdomain → embedded
     3. Return first confident match.
+    Iframes, links, page text and raw HTML all come from the homepage snapshot.
 
     Returns:
         {
@@ -148,11 +188,7 @@ async def detect_booking_type(page, base_url: str) -> dict:
         # ----------------------------------------------------------------
         # Step 1: Check iframes first — most reliable signal
         # ----------------------------------------------------------------
-        iframes = await page.query_selector_all("iframe[src]")
-        for iframe in iframes:
-            src = await iframe.get_attribute("src") or ""
-            if not src:
-                continue
+        for src in snapshot.iframe_srcs:
             src_lower = src.lower()
             iframe_domain = urlparse(src).netloc.lower().replace("www.", "")
 
@@ -177,13 +213,12 @@ async def detect_booking_type(page, base_url: str) -> dict:
         # ----------------------------------------------------------------
         # Step 2: Scan booking links (buttons, nav, CTAs)
         # ----------------------------------------------------------------
-        all_links = await page.query_selector_all("a[href]")
         booking_candidates = []
 
-        for link in all_links:
+        for href, text in snapshot.links:
             try:
-                href = (await link.get_attribute("href") or "").strip()
-                text = (await link.inner_text()).lower().strip()
+                href = href.strip()
+                text = text.lower().strip()
 
                 if not href or href.startswith(("mailto:", "tel:", "#")):
                     continue
@@ -268,8 +303,8 @@ async def detect_booking_type(page, base_url: str) -> dict:
             "forms.gle":            "Google Forms",
         }
         try:
-            page_text_lower = (await page.inner_text("body")).lower()
-            raw_html_lower = (await page.content()).lower()
+            page_text_lower = snapshot.text_lower
+            raw_html_lower = snapshot.html_lower
             has_lead_phrase = any(phrase in page_text_lower for phrase in LEAD_FORM_PHRASES)
             has_lead_domain = any(domain in raw_html_lower for domain in LEAD_FORM_DOMAINS)
             matched_vendor = ""
@@ -289,8 +324,7 @@ async def detect_booking_type(page, base_url: str) -> dict:
 
         # Step 4: Fallback — scan raw HTML for vendor domain fingerprints
         try:
-            raw_html = await page.content()
-            raw_lower = raw_html.lower()
+            raw_lower = snapshot.html_lower
             for vendor_domain in EXTERNAL_BOOKING_DOMAINS:
                 if vendor_domain in raw_lower:
                     vendor_name = _vendor_name_from_domain(vendor_domain)
@@ -319,13 +353,27 @@ EXCLUDE_ROLES = [
 ]
 
 
-async def count_team_members(page: Page, page_cache: dict = None) -> int:
+async def count_team_members(
+    page: Page,
+    homepage: PageSnapshot,
+    page_cache: dict = None,
+    probe: SiteProbe = None,
+    discovery: SiteDiscovery = None,
+    counted: dict = None,
+    budget: DeadlineBudget = None,
+    timeout_scale: float = 1.0,
+) -> int:
     """
     Count practitioners by:
-    1. First scanning all <a href> links for a team/staff page URL
-    2. Then trying hardcoded fallback paths
+    1. Taking the top-ranked "team" URLs from site discovery (sitemap + links), if given
+    2. Otherwise scanning the homepage's <a href> links for a team/staff page URL,
+       then trying hardcoded fallback paths (only those the probe finds, if given)
     3. Counting lines in visible text that contain a practitioner keyword,
        excluding admin/non-clinical roles
+    counted: optional dict whose "best" is updated after each page, so a caller
+    that cancels the count can keep the best count so far.
+    budget / timeout_scale: navigations are stretched by timeout_scale and never
+    run past the budget's "team" slice.
     """
     EXCLUDE_ROLES = [
         "ceo", "chief executive", "admin", "receptionist", "manager",
@@ -340,45 +388,53 @@ async def count_team_members(page: Page, page_cache: dict = None) -> int:
         "about-us", "about us", "who we are",
     ]
 
-    base = f"{urlparse(page.url).scheme}://{urlparse(page.url).netloc}"
-    urls_to_try = []
+    base = f"{urlparse(homepage.url).scheme}://{urlparse(homepage.url).netloc}"
 
-    # Step 1: Discover team page from existing <a href> links
-    try:
-        links = await page.query_selector_all("a[href]")
-        for link in links:
-            href = (await link.get_attribute("href") or "").strip()
-            if not href or href.startswith(("mailto:", "tel:", "#", "javascript:")):
-                continue
-            href_lower = href.lower()
-            if any(kw in href_lower for kw in TEAM_LINK_KEYWORDS):
-                full = urljoin(base, href)
-                if full not in urls_to_try:
-                    urls_to_try.append(full)
-    except Exception:
-        pass
+    # Step 1: Ranked candidates from the sitemap and homepage links (URL + anchor text)
+    urls_to_try = await discovery.candidates("team", homepage, k=6) if discovery is not None else []
 
-    # Step 2: Add hardcoded fallback paths
-    for path in ["/about", "/about-us", "/team", "/our-team",
-                 "/staff", "/meet-the-team", "/practitioners"]:
-        candidate = urljoin(base, path)
-        if candidate not in urls_to_try:
-            urls_to_try.append(candidate)
+    if not urls_to_try:
+        # Step 2a: Discover team page from existing <a href> links
+        try:
+            for href, _ in homepage.links:
+                href = href.strip()
+                if not href or href.startswith(("mailto:", "tel:", "#", "javascript:")):
+                    continue
+                href_lower = href.lower()
+                if any(kw in href_lower for kw in TEAM_LINK_KEYWORDS):
+                    full = urljoin(base, href)
+                    if full not in urls_to_try:
+                        urls_to_try.append(full)
+        except Exception:
+            pass
+
+        # Step 2b: Add hardcoded fallback paths
+        for path in ["/about", "/about-us", "/team", "/our-team",
+                     "/staff", "/meet-the-team", "/practitioners"]:
+            candidate = urljoin(base, path)
+            if candidate not in urls_to_try:
+                urls_to_try.append(candidate)
+
+    if probe is not None:
+        urls_to_try = await probe.filter(urls_to_try)
 
     best_count = 0
 
     for url in urls_to_try[:6]:  # cap at 6 pages
         if page_cache is not None and url in page_cache:
-            _, text = page_cache[url]
+            text = page_cache[url].text
         else:
             try:
                 if page.is_closed():
                     break
-                await page.goto(url, timeout=7000, wait_until="domcontentloaded")
+                nav_ms = int(7000 * timeout_scale)
+                if budget is not None:
+                    nav_ms = budget.timeout_ms(nav_ms, "team")
+                await page.goto(url, timeout=nav_ms, wait_until="domcontentloaded")
                 await page.wait_for_timeout(150)
                 text = await page.inner_text("body")
                 if page_cache is not None:
-                    page_cache[url] = (await page.content(), text)
+                    page_cache[url] = PageSnapshot(url, await page.content(), text)
             except Exception:
                 continue
 
@@ -397,6 +453,8 @@ async def count_team_members(page: Page, page_cache: dict = None) -> int:
 
         if len(found) > best_count:
             best_count = len(found)
+            if counted is not None:
+                counted["best"] = best_count
 
     return best_count
 
@@ -621,489 +679,35 @@ def apply_stack_priority_to_result(result: dict) -> dict:
     return result
 
 
-# Tech stack signatures - fingerprints for detection
-# Category order: pms_ehr → booking → cms → crm → payments → telehealth →
-# forms → pixels → live_chat → reviews → infra (12 cats, 11 output cols excl. booking)
-#
-# Trace (vibenaturalhealth.com.au): With _collect_page_sources now including relative
-# link hrefs, all 4 previously missed stacks are detected:
-# 1. Contact Form 7: contact-form-7/includes in script/link URLs
-# 2. Elementor Forms: send-app-elementor-form-tracker in plugin script path
-# 3. Trustindex: loader-feed.js (CDN) + trustindex-feed-instagram-widget (relative CSS)
-# 4. Send App: send-app-cf7-form-tracker, send-app-elementor-form-tracker, plugins/send-app
-TECH_SIGNATURES = {
-    # ─────────────────────────────────────────────────────────────────────
-    # 1. PRACTICE MANAGEMENT SYSTEMS (PMS / EHR)
-    # ─────────────────────────────────────────────────────────────────────
-    "pms_ehr": {
-        # ── Allied Health Cloud SaaS ──
-        "Cliniko":               ["cliniko.com", "app.cliniko.com", "secure.cliniko.com", "booking.cliniko.com", "telehealth.cliniko.com"],
-        "Nookal":                ["nookal.com", "connect.nookal.com", "portal.nookal.com"],
-        "Jane App":              ["janeapp.com", "jane.app", "clinics.janeapp.com"],
-        "Halaxy":                ["halaxy.com"],
-        "Power Diary":           ["powerdiary.com"],
-        "Splose":                ["splose.com"],
-        "Coreplus":              ["coreplus.com.au"],
-        "Practice Better":       ["practicebetter.io", "practicebetter.com"],
-        "SimplePractice":        ["simplepractice.com", "telehealth.simplepractice.com"],
-        "Carepatron":            ["carepatron.com"],
-        "WriteUpp":              ["writeupp.com"],
-        "PracSuite":             ["pracsuite.com"],
-        "TM2 / TM3":             ["tm2online.com", "tm3online.com", "tmonline.net"],
-        "Smartsoft Front Desk":  ["frontdesk.com.au", "smartsoft.com.au", "booking.frontdesk"],
-        "Xestro":                ["xestro.com"],
-        "PPMP":                  ["ppmp.com.au"],
-
-        # ── GP / Specialist / Multi-site ──
-        "Best Practice":         ["bpsoftware.com.au", "bp-software.com.au", "bestpracticesoftware", "medicalonline", "bp premier", "best practice software", "bp software"],
-        "AutoMed":               ["automed.com.au", "ams connect", "amsconnect", "automed systems"],
-        "MedicalDirector":       ["medicaldirector.com", "helix.medicaldirector", "pracsoft.com", "portal.medicaldirector"],
-        "Zedmed":                ["zedmed.com.au"],
-        "Genie Solutions":       ["genie.com.au", "geniesolutions", "gentu.com.au"],
-        "Clinic to Cloud":       ["clinictocloud.com", "clinic-to-cloud"],
-        "ProCare":               ["procare.com.au", "procarehealth.com.au"],
-        "Titanium":              ["titaniumhealthcare.com.au", "titanium-software.com.au"],
-        "Bluechip":              ["bluechip.com.au", "bluechipmedical"],
-        "Shexie":                ["shexie.com.au"],
-        "Medilink":              ["medilink.com.au"],
-        "PrimaryClinic":         ["primaryclinic.com.au"],
-        "Communicare":           ["communicare.com.au", "telstrahealth.com/communicare"],
-        "MasterCare":            ["mastercare.com.au", "globalhealth.com.au/mastercare"],
-        "Audit4":                ["audit4.com", "software4specialists.com"],
-        "Profile (Intrahealth)": ["intrahealth.com", "profile-pms"],
-
-        # ── Dental ──
-        "Dental4Windows":        ["centaurportal.com", "centaur-software.com", "centaurportal.com/d4w",
-                                 "dental4windows", "d4w/org-", "dental4windows.com", "centaursoftware.com.au"],
-        "Exact (SOE)":           ["software-of-excellence.com", "exact-dental.com", "soeortho.com"],
-        "Praktika":              ["praktika.com.au"],
-        "Oasis Dental":         ["oasisdental.com"],
-        "Dentrix":               ["dentrix.com", "henryschein.com/dentrix"],
-        "Core Practice":         ["corepractice.com.au"],
-
-        # ── Enterprise / Hospital ──
-        "Epic":                  ["epic.com", "mychart.com", "app.epic.com"],
-        "Cerner":                ["cerner.com", "healthelife.com.au", "oracle.com/health"],
-        "Allscripts":            ["allscripts.com", "veradigm.com"],
-        "Meditech":              ["meditech.com"],
-        "TrakCare":              ["trakcare.com", "intersystems.com/trakcare"],
-        "MediRecords":           ["medirecords.com", "medirecords"],
-        "Athenahealth":          ["athenahealth.com", "athenaone.com"],
-        "DrChrono":              ["drchrono.com", "onpatient.com"],
-        "AdvancedMD":            ["advancedmd.com"],
-        "Kareo":                 ["kareo.com", "tebra.com"],
-        "Practice Fusion":       ["practicefusion.com"],
-        "NextGen":               ["nextgen.com", "nextgenhealth.com"],
-        "eClinicalWorks":        ["eclinicalworks.com", "healow.com"],
-        "Greenway Health":       ["greenwayhealth.com"],
-
-        # ── Enterprise / Specialist portals ──
-        "Salesforce Health Cloud": ["salesforce.com", "force.com", "health-cloud", "salesforceiq", "lightning.force.com"],
-        "Genea":                   ["genea.com.au", "genea kinnect", "geneakinnect", "powered by genea"],
-
-        # ── Niche / Wellness ──
-        "Mindbody":              ["mindbodyonline.com", "mindbody.io"],
-        "Fresha":                ["fresha.com", "shedul.com"],
-        "Timely":                ["gettimely.com"],
-        "Cosmetri":              ["cosmetri.com"],
-        "Zandamed":              ["zandamed.com"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 2. BOOKING SYSTEMS
-    # ─────────────────────────────────────────────────────────────────────
-    "booking": {
-        "HotDoc":                ["cdn.hotdoc.com.au", "hotdoc-widgets.min.js", "hotdoc-widget",
-                                 "hotdoc.com.au/medical-centres", "book.hotdoc.com.au"],
-        "HealthEngine":          ["healthengine.com.au", "booking.healthengine.com.au"],
-        "AutoMed":               ["automed.com.au", "ams connect", "amsconnect.com.au"],
-        "Cliniko Booking":       ["booking.cliniko.com", "secure.cliniko.com"],
-        "Nookal Booking":        ["connect.nookal.com", "portal.nookal.com"],
-        "Jane App Booking":      ["clinics.janeapp.com"],
-        "Halaxy Booking":        ["halaxy.com/book"],
-        "Power Diary Booking":   ["powerdiary.com/book"],
-        "Front Desk Booking":    ["booking.frontdesk.com.au"],
-        "HubSpot Meetings":      ["meetings.hubspot.com", "meetings.hs-sites"],
-        "Calendly":              ["calendly.com", "assets.calendly"],
-        "Acuity":                ["acuityscheduling.com"],
-        "Setmore":               ["setmore.com"],
-        "Doctolib":              ["doctolib.fr", "doctolib.de", "doctolib.com"],
-        "Zocdoc":                ["zocdoc.com"],
-        "Docplanner":            ["docplanner.com"],
-        "Doctoralia":            ["doctoralia.com"],
-        "Fresha":                ["fresha.com"],
-        "Mindbody":              ["mindbodyonline.com"],
-        "Timely":                ["gettimely.com"],
-        "FormAssembly":          ["tfaforms.net", "tfaforms.com", "formassembly.com", "request.*consultation", "consultation.*request"],
-        "Genea Kinnect":         ["genea-kinnect", "geneakinnect", "kinnect.genea"],
-        "D4W eAppointments":     ["centaurportal.com/d4w", "centaurportal.com", "d4w/org-",
-                                 "practiceid=", "centaur.*appointment", "d4w.*appointment"],
-        "MediRecords Booking":  ["medirecords"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 3. CMS / WEBSITE BUILDER
-    # ─────────────────────────────────────────────────────────────────────
-    "cms": {
-        "WordPress":   ["wp-content", "wp-includes", "wp-json", "/wp-json/wp/v2/", "wordpress", "/themes/Divi/", "/themes/divi/"],
-        "Drupal":      ["sites/default/files", "drupalSettings", "core/misc/drupal.js", "drupal.org"],
-        "Wix":         ["wix.com", "wix-thunderbolt", "static.wixstatic.com", "static.parastorage.com", "wix-code"],
-        "Squarespace": ["squarespace.com", "static1.squarespace", "squarespace.com/universal/scripts"],
-        "Webflow":     ["webflow.com", "assets-global.website-files", "cdn.prod.website-files.com", "data-wf-domain"],
-        "Framer":      ["framer.com", "framerusercontent.com"],
-        "Joomla":      ["joomla.org", "joomla"],
-        "Ghost":       ["ghost.org", "ghost"],
-        "Weebly":      ["weebly.com"],
-        "Sitecore":    ["sitecore.net", "sitecore.com", "-/media/", "/-/jssmedia/"],
-        "Umbraco":     ["umbraco.com", "umbraco", "/umbraco/"],
-        "HubSpot CMS": ["hs-sites.com", "hubspotpagebuilder.com", "hs-scripts.com/cms"],
-        "Shopify":     ["cdn.shopify.com", "shopify.theme"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 4. CRM, EMAIL MARKETING & PATIENT ENGAGEMENT
-    # ─────────────────────────────────────────────────────────────────────
-    "crm": {
-        # ── Full CRM platforms ──
-        "HubSpot":           ["hubspot.com", "hs-scripts.com", "hsforms.com",
-                              "js.hs-scripts.com", "hs-analytics.net",
-                              "data-hubspot"],
-        "Salesforce":        ["salesforce.com", "pardot.com", "force.com",
-                              "salesforceliveagent", "salesforce-communities",
-                              "tfaforms.net"],
-        "Salesforce Marketing Cloud": [
-            "sfmc_utm",
-            "exacttarget.com",
-            "exacttarget",
-            "marketingcloud.com",
-            "salesforce-mc",
-            "members.list-manage",
-            "pub.s10.exacttarget.com",
-            "sfmc",
-        ],
-        "Zoho CRM":          ["zoho.com/crm", "zohopublic", "salesiq.zoho.com",
-                              "zohocrm", "campaigns.zoho"],
-        "Pipedrive":         ["pipedrive.com", "pipedriveassets.com"],
-        "Keap":              ["infusionsoft.com", "keap.com"],
-        "PatientPop":        ["patientpop.com"],
-        "Podium":            ["podium.com", "podium-widget"],
-        "Birdeye":           ["birdeye.com", "birdeye.io", "birdeyecdn"],
-        # ── Email marketing / automation ──
-        "ActiveCampaign":    ["activecampaign.com", "trackcmp.net",
-                              "activehosted.com", "acsbapp.com"],
-        "Mailchimp":         ["chimpstatic.com", "mailchimp.com", "mc.js",
-                              "list-manage.com", "mcjs", "data-mailchimp"],
-        "Klaviyo":           ["klaviyo.com", "_learnq", "static.klaviyo",
-                              "klaviyo_forms"],
-        "Campaign Monitor":  ["createsend.com", "campaignmonitor.com"],
-        "Brevo":             ["sendinblue.com", "brevo.com"],
-        "ConvertKit":        ["convertkit.com"],
-        "Constant Contact":  ["constantcontact.com"],
-        "GoHighLevel":       ["leadconnectorhq.com", "msgsndr.com", "link.msgsndr.com",
-                             "widgets.leadconnectorhq.com", "highlevel.com",
-                             "gohighlevel.com", "highlevel-chat"],
-        "LeadConnector":     ["leadconnectorhq.com", "link.msgsndr.com", "msgsndr.com"],
-        # plugins/send-app, send-app-cf7-form-tracker, send-app-elementor-form-tracker: catch WP plugin assets (CF7/Elementor form trackers); relative paths now in link_hrefs
-        "Send App":          ["plugins/send-app", "send-app-cf7-form-tracker", "send-app-elementor-form-tracker"],
-        "MediRecords (Clinical CRM)": ["medirecords"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 5. PAYMENTS & BILLING
-    # ─────────────────────────────────────────────────────────────────────
-    "payments": {
-        "Stripe":   ["js.stripe.com", "stripe.com/v3", "api.stripe.com"],
-        "Square":   ["squareup.com", "sq-payment-form", "square.com"],
-        "PayPal":   ["paypal.com", "paypalobjects.com"],
-        "Xero":     ["xero.com", "xero-widget"],
-        "MYOB":     ["myob.com"],
-        "Tyro":     ["tyro.com"],
-        "Medipass": ["medipass.com.au", "medipass-connect"],
-        "Hicaps":   ["hicaps.com.au"],
-        "Windcave": ["windcave.com", "paymentexpress.com"],
-        "Authorize.net": ["authorize.net", "acceptjs.authorize", "authorizeNet", "accept.authorize"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 7. TELEHEALTH / VIRTUAL CARE
-    # ─────────────────────────────────────────────────────────────────────
-    "telehealth": {
-        "AutoMed":                ["ams connect", "amsconnect", "automed telehealth"],
-        "Cliniko Telehealth":     ["telehealth.cliniko.com"],
-        "Healthdirect Video":     ["healthdirect.gov.au/video-call", "vcc.healthdirect.org.au"],
-        "Zoom":                   ["zoom.us", "zoom.com"],
-        "Coviu":                  ["coviu.com"],
-        "Whereby":                ["whereby.com", "appear.in"],
-        "Doxy.me":                ["doxy.me"],
-        "SimplePractice Telehealth": ["telehealth.simplepractice.com"],
-        "MedAdvisor":             ["medadvisor.com.au"],
-        "Hello Home Doctor":       ["hello home doctor", "134 100"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 8. FORMS & INTAKE
-    # ─────────────────────────────────────────────────────────────────────
-    "forms": {
-        # contact-form-7/includes: catches /wp-content/plugins/contact-form-7/includes/js/index.js, /includes/css/styles.css (was missed when only absolute URLs were collected)
-        "Contact Form 7":  ["plugins/contact-form-7", "contact-form-7", "wpcf7", "cf7", "contact-form-7/includes"],
-        # send-app-elementor-form-tracker: catches send-app-elementor-form-tracker.js inside wp-content/plugins/send-app/ (Elementor Forms integration)
-        # Guard: avoid bare "elementor" — too broad, matches Wix's feature-elementory-support, send-app tracker URL substrings
-        "Elementor Forms": ["elementor-pro", "elementor/assets", "plugins/elementor", "elementor-frontend", "/elementor/modules/forms", "send-app-elementor-form-tracker"],
-        "Gravity Forms":   ["gravityforms", "gform_", "gravity-forms"],
-        "WPForms":         ["wpforms", "wpforms-form"],
-        "Ninja Forms":     ["ninja-forms", "nf-form"],
-        "Snapforms":      ["snapforms.com.au", "snapforms"],
-        "AutoMed Forms":  ["ams form", "automed form", "new patient ams"],
-        "Typeform":  ["typeform.com", "embed.typeform.com"],
-        "JotForm":   ["jotform.com", "form.jotform.com"],
-        "Halaxy Forms": ["halaxy.com/form", "halaxy.com/eform"],
-        "Google Forms": ["docs.google.com/forms", "forms.gle"],
-        "Paperform":  ["paperform.co"],
-        "Cognito Forms": ["cognitoforms.com"],
-        "FormAssembly": ["tfaforms.net", "tfaforms.com", "formassembly.com", "fa-form", "wFORMS"],
-        "Formstack":    ["formstack.com", "fscdn.formstack.com", ".formstack.com/forms/"],
-        "HubSpot Forms": [
-            "hscollectedforms.net",
-            "forms.hsforms.com",
-            "js-ap1.hscollectedforms.net",
-            "hsforms.com/embed/v3/form",
-            "hsforms.net",
-        ],
-        "GoHighLevel Forms": ["link.msgsndr.com/js/form_embed", "msgsndr.com/js/form",
-                             "leadconnectorhq.com/form", "highlevel.*form"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 9. AD PIXELS & ANALYTICS
-    # ─────────────────────────────────────────────────────────────────────
-    "pixels": {
-        "Meta Pixel":         ["fbevents.js", "connect.facebook.net/en_us/fbevents", "fbq("],
-        "Google Ads":         ["googleadservices.com", "google_conversion"],
-        "Google Analytics 4": [
-            "gtag.js",
-            "googletagmanager.com/gtag",
-            "gtag/js?id=G-",              # GA4 measurement ID
-            "google-analytics.com/g/collect",  # GA4 hit endpoint
-        ],
-        "Google Universal Analytics": [
-            "gtag/js?id=UA-",
-            "google-analytics.com/analytics.js",  # UA async snippet
-            "ssl.google-analytics.com/ga.js",     # UA legacy snippet (ga.js)
-            "google-analytics.com/ga.js",         # non-SSL variant
-            "UA-\\d{4,}-\\d{1,}",                # UA-XXXXXXX-X inline ID
-        ],
-        "Google Tag Manager": ["googletagmanager.com", "gtm.js"],
-        "LinkedIn Insight":   ["snap.licdn.com", "linkedin.com/insight"],
-        "TikTok Pixel":       ["analytics.tiktok.com", "ttq.load"],
-        "Pinterest":          ["pintrk(", "ct.pinterest.com"],
-        "Snapchat":           ["sc-static.net", "snaptr("],
-        "Hotjar":             ["hotjar.com", "hjsetting"],
-        "Microsoft Clarity":  ["clarity.ms", "microsoft.com/clarity"],
-        "Segment":            ["segment.com", "analytics.js"],
-        "Mixpanel":           ["mixpanel.com"],
-        "Heap":               ["heap.io"],
-        "Call Dynamics":      ["calldynamics.com.au", "artemisData"],
-        "DoubleClick / Floodlight": [
-            "googletagmanager.com/gtag/js?id=DC-",
-            "fls.doubleclick.net",
-            "stats.g.doubleclick.net",
-            "id=DC-",
-        ],
-        "Bing Ads":         ["bat.bing.com", "bat.js", "microsoft.com/bat", "bing.com/ads"],
-        "Outbrain":         ["amplify.outbrain.com", "obtp.js", "outbrain.com"],
-        "Taboola":          ["cdn.taboola.com", "taboola.com/libtrc"],
-        "Reddit Ads": [
-            "rdt.js",                        # Reddit pixel script filename
-            "alb.reddit.com",                # Reddit pixel network endpoint
-            "reddit-pixel",                  # inline snippet identifier
-            "!function(w,d){if(!w.rdt)",     # Reddit pixel bootstrap snippet
-        ],
-        "CallRail":         ["cdn.callrail.com", "callrail.com"],
-        "Contentsquare":    ["hj.contentsquare.net", "contentsquare.net", "csq-"],
-        "Simpli.fi":        ["tag.simpli.fi", "simpli.fi"],
-        "AD360":            ["cdn.ad360.media", "ad360.media", "ad360pixelevent"],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 10. LIVE CHAT & PATIENT MESSAGING
-    # ─────────────────────────────────────────────────────────────────────
-    "live_chat": {
-        "Intercom":       ["intercom.com", "widget.intercom.io", "intercomsettings"],
-        "Drift":          ["drift.com", "js.drift.com"],
-        "Tawk.to":        ["tawk.to", "embed.tawk.to"],
-        "Zendesk":        ["zendesk.com", "zopim.com", "zdassets.com"],
-        "Crisp":          ["crisp.chat", "client.crisp.chat"],
-        "LiveChat":       ["livechatinc.com", "__lc"],
-        "Freshchat":      ["freshchat.com", "wchat.freshchat.com"],
-        "HubSpot Chat":   ["hubspot-messages"],
-        "WhatsApp Widget":["wa.me", "whatsapp.com/send", "api.whatsapp"],
-        "Podium Chat":    ["podium.com", "podiumwidget"],
-        "Birdeye Chat":   ["birdeye.com"],
-        "Tidio":          ["tidio.com", "tidiochat"],
-        "GoHighLevel Chat": ["widgets.leadconnectorhq.com/chat-widget",
-                            "leadconnectorhq.com/chat", "msgsndr.com/chat"],
-        "Genesys": [
-            "mypurecloud.com",
-            "mypurecloud.com.au",
-            "genesys.com",
-            "genesys-bootstrap",
-            "genesys.min.js",
-            "purecloud.com",
-            "apps.mypurecloud",
-        ],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 11. REVIEWS & REPUTATION
-    # ─────────────────────────────────────────────────────────────────────
-    "reviews": {
-        "Google Reviews": [
-            # Schema.org structured rating data (self-reported stars on the page)
-            "aggregaterating",
-            "ratingvalue",
-            "ratingcount",
-            # Embedded Google Maps widget with reviews panel (not just a link)
-            "google.com/maps/embed",
-            "maps.googleapis.com/maps/api/js",
-            # Google Places reviews widget
-            "maps.googleapis.com/maps/api/place",
-            # Direct Places review deep-link (write-a-review CTA)
-            "search.google.com/local/writereview",
-            "g.co/kgs",  # Knowledge Graph - only in structured widgets
-        ],
-        # loader-feed.js: CDN script (cdn.trustindex.io/loader-feed.js); trustindex-feed-instagram-widget: relative CSS /wp-content/uploads/trustindex-feed-instagram-widget.css (was missed before relative link hrefs fix)
-        "Trustindex":            ["cdn.trustindex.io", "trustindex-feed", "loader-feed.js", "trustindex-feed-instagram-widget"],
-        "Doctify":               ["doctify.com"],
-        "HealthEngine Reviews":  ["healthengine.com.au"],
-        "RateMDs":               ["ratemds.com"],
-        "Trustpilot":            ["trustpilot.com", "widget.trustpilot"],
-        "Podium Reviews":        ["podium.com", "podium-widget"],
-        "Birdeye Reviews":       ["birdeye.com"],
-        "Feefo":                 ["feefo.com"],
-        "Whitecoat":             ["whitecoat.com.au"],
-        "Elfsight": [
-            "static.elfsight.com",
-            "elfsight.com/platform",
-            "apps.elfsight.com",
-            "elfsight-app",
-        ],
-    },
-
-    # ─────────────────────────────────────────────────────────────────────
-    # 11. INFRASTRUCTURE / CDN / HOSTING
-    # Signals here = the CLINIC'S OWN hosting stack, not third-party vendors.
-    # Primary detection comes from HTTP headers via detect_from_headers().
-    # HTML-based patterns below are conservative — only match highly specific
-    # fingerprints that indicate direct use, not third-party asset loading.
-    # ─────────────────────────────────────────────────────────────────────
-    "infra": {
-        # Cloudflare: cookie/header fingerprints (set by detect_from_headers too)
-        "Cloudflare":   ["__cf_bm", "cf-ray", "cloudflare-nginx"],
-        # Vercel: only vercel.app subdomains = actually hosted on Vercel
-        "Vercel":       ["vercel.app"],
-        # Netlify: only netlify.app subdomains or netlify identity scripts
-        "Netlify":      ["netlify.app", "netlify-identity-widget"],
-        # AWS: only match the site's OWN S3/CloudFront, not third-party scripts.
-        # Use a long-form match to reduce false positives.
-        "AWS":          ["s3.amazonaws.com", "s3-ap-southeast-2.amazonaws.com",
-                         "s3-us-east-1.amazonaws.com"],
-        # Azure: only actual Azure-hosted sites
-        "Azure":        ["azurewebsites.net", "azureedge.net"],
-        # Google Cloud: excluded — too many false positives (GCS/storage URLs from embeds, CDN)
-        # Kinsta, WP Engine, Flywheel — common managed WordPress hosts in AU
-        "Kinsta":       ["kinsta.cloud", "kinstacdn.com"],
-        "WP Engine":    ["wpengine.com", "wpenginepowered.com"],
-        "Flywheel":     ["flywheelstaging.com", "flywheelsites.com"],
-        "Pantheon":     ["pantheonsite.io"],
-        "HealthLink":   ["healthlink.net", "healthlink edi", "edi:", "healthlink secure"],
-        "VentraIP":     ["ventraip.com.au", "synergywholesale.com", "cpanel", "ventra"],
-        "cPanel":       ["cpanel", "whm.cpanel", "cpsess"],
-        "Crazy Domains":["crazydomains.com.au"],
-        "NetRegistry":  ["netregistry.com.au"],
-        "GreenGeeks":   ["greengeeks.com"],
-        "SiteGround":   ["siteground.com", "sgcpanel"],
-        "WPStaq":       ["wpstaq", "wpstaq.com"],
-        "NitroPack":    ["nitropack.io", "x-nitro-cache", "cdn-akhmn.nitrocdn.com", "nitrocdn.com"],
-    },
-}
-
-# Visible text signatures — phrases that appear in page copy (not scripts/URLs).
-# Uses regex for flexible matching. Catches tools referenced in copy but not exposed via scripts/iframes.
-VISIBLE_TEXT_SIGNATURES = {
-    "pms_ehr": {
-        "Best Practice":    ["best practice software", "bp premier", "proficiency in best practice"],
-        "AutoMed":         ["ams connect", "automed systems", "ams connect app"],
-        "MedicalDirector": ["medical director", "helix"],
-        "Salesforce":       ["salesforce", "health cloud", "salesforce health cloud"],
-        "Genea":            ["powered by genea", "genea kinnect", "genea world"],
-        "Dental4Windows":  ["dental4windows", "d4w", "centaur portal", "centaur software"],
-    },
-    "booking": {
-        "AutoMed":         ["book.*ams connect", "ams connect app", "appointments through.*ams"],
-        "HotDoc":          ["hotdoc widget", "book online.*hotdoc", "hotdoc.*book online",
-                           "cdn.hotdoc.com.au", "hotdoc.com.au", "book.*hotdoc", "hotdoc.*book", "hotdoc telehealth", "quick consult"],
-        "HealthEngine":    ["healthengine.com.au", "book.*healthengine"],
-        "FormAssembly":    ["request a consultation", "request.*appointment.*form", "tfaforms"],
-        "Genea Kinnect":   ["genea kinnect", "kinnect app", "manage.*appointments.*kinnect"],
-        "D4W eAppointments": ["centaurportal", "d4w.*book", "book.*d4w", "centaur.*book"],
-    },
-    "telehealth": {
-        "AutoMed":         ["telehealth.*ams connect", "ams connect.*telehealth", "download.*ams connect.*video"],
-        "HotDoc":          ["telehealth.*hotdoc", "hotdoc.*telehealth", "hotdoc.*video consult", "phone consult.*hotdoc", "video consult.*hotdoc"],
-        "Coviu":           ["coviu", "video.*coviu"],
-        "Zoom":            ["zoom.*telehealth", "telehealth.*zoom"],
-        "Hello Home Doctor": ["hello home doctor", "134 100"],
-    },
-    "forms": {
-        "Contact Form 7":  ["contact form 7", "wpcf7", "powered by contact form 7"],
-        "Snapforms":       ["snapforms"],
-        "AutoMed Forms":   ["new patient.*ams", "ams.*new patient", "registration.*ams connect"],
-        "HotDoc Forms":    ["repeat prescription.*hotdoc", "specialist referral.*hotdoc", "hotdoc.*quick consult", "quick consult.*hotdoc"],
-        "FormAssembly":    ["tfaforms", "formassembly", "request a consultation"],
-        "GoHighLevel Forms": ["highlevel.*form", "leadconnector.*form"],
-    },
-    "crm": {
-        "Salesforce":      ["salesforce", "formassembly", "tfaforms"],
-        "GoHighLevel":     ["msgsndr", "leadconnector", "gohighlevel",
-                           "appointment reminder.*highlevel", "newsletter.*highlevel"],
-    },
-    "live_chat": {
-        "GoHighLevel Chat": ["chat.*highlevel", "leadconnector.*chat"],
-    },
-    "reviews": {
-        "Google Reviews":  ["google reviews", "google maps", "write a review.*google", "review us on google"],
-        "Elfsight":        ["elfsight", "powered by elfsight"],
-    },
-    "infra": {
-        "HealthLink":      ["healthlink edi", "edi:", "healthlink secure messaging"],
-        "VentraIP":        ["ventraip", "synergy wholesale", "hosted by ventraip",
-                            "parked.*ventraip"],
-        "cPanel":          ["cpanel", "webmail", "cPanel Email"],
-    },
-    "payments": {
-        "HICAPS":   ["hicaps available", "hicaps terminal", "hicaps on-site",
-                     "eftpos and hicaps", "hicaps and eftpos", "hicaps claims",
-                     "health fund claims.*hicaps", "hicaps"],
-        "Tyro":     ["tyro", "tyro payments", "tyro health"],
-        "Medipass": ["medipass", "medipass connect"],
-    },
-}
+@functools.lru_cache(maxsize=64)
+def _scan_visible_text_cached(page_text: str) -> tuple:
+    """Memoized core of scan_visible_text_for_tech, keyed by the page text itself."""
+    text_lower = page_text.lower()
+    seen = VISIBLE_TEXT_AUTOMATON.find_all(text_lower)
+    hits = set()
+    for phrase in seen:
+        hits.update(VISIBLE_TEXT_LITERALS.get(phrase, ()))
+    for regex, fragments, category, tool_name in VISIBLE_TEXT_REGEXES:
+        if (category, tool_name) in hits:
+            continue
+        if fragments is not None and not all(f in seen for f in fragments):
+            continue
+        if regex.search(text_lower):
+            hits.add((category, tool_name))
+    return tuple(hits)
 
 
 def scan_visible_text_for_tech(page_text: str) -> dict:
     """
     Scan lowercased visible page text for tool name mentions.
     Catches tools that are referenced in copy but not exposed via scripts/iframes.
+    Results are memoized per text, so rescanning a page already seen by
+    detect_tech_stack (e.g. the homepage in scrape_clinic) is free.
     Returns dict of category -> set of tool names.
     """
     found = {}
-    text_lower = page_text.lower()
-    for category, tools in VISIBLE_TEXT_SIGNATURES.items():
-        for tool_name, phrases in tools.items():
-            for phrase in phrases:
-                if re.search(phrase, text_lower):
-                    found.setdefault(category, set()).add(tool_name)
-                    break
+    for category, tool_name in _scan_visible_text_cached(page_text or ""):
+        found.setdefault(category, set()).add(tool_name)
     return found
 
 
@@ -1168,26 +772,6 @@ BOOKING_IS_ALSO_PMS = {
     "D4W eAppointments",   # Centaur Portal = direct extension of Dental4Windows PMS
 }
 
-# Header-based infra detection (Server, X-Powered-By, CF-Ray, Via, X-Generator)
-# Excluded: Fastly, Google Cloud — too many false positives (CDN/proxy headers from third-party assets)
-HEADER_SIGNATURES = {
-    "Cloudflare":    ["cloudflare", "cf-ray"],
-    "AWS":           ["amazonaws", "cloudfront", "x-amz"],
-    "Azure":         ["azure", "azurewebsites", "azureedge"],
-    "nginx":         ["nginx"],
-    "Apache":        ["apache"],
-    "Microsoft-IIS": ["microsoft-iis", "iis"],
-    "Vercel":        ["vercel"],
-    "Netlify":       ["netlify"],
-    "Kinsta":        ["kinsta"],
-    "WP Engine":     ["wpengine"],
-    "LiteSpeed":     ["litespeed"],            # common in AU shared hosting
-    "VentraIP":      ["ventraip", "synergy", "cpanel"],
-    "cPanel/Apache": ["apache", "cpanel"],
-    "Parked Domain": ["parking", "parked-domain", "domain-for-sale"],
-    "WPStaq":        ["wpstaq"],
-    "NitroPack":     ["x-nitro-cache", "nitropack", "nitro-cache"],
-}
 
 # Home visit keywords
 HOME_VISIT_KEYWORDS = [
@@ -1223,21 +807,21 @@ PRIVATE_BILLING_KEYWORDS = [
 ]
 
 
-def detect_billing_type(page_text: str, html: str) -> str:
+def detect_billing_type(snapshot: PageSnapshot) -> str:
     """
     Detect billing model from visible page text and HTML.
     Returns: "Bulk Billing", "Private / Mixed", or "not_detected"
     Priority: if both signals found, return "Private / Mixed" (mixed billing).
     Also checks for dollar amounts > $50 as a Private / Mixed signal.
     """
-    text_lower = (page_text + " " + html).lower()
+    haystacks = (snapshot.text_lower, snapshot.html_lower)
 
-    has_bulk = any(kw in text_lower for kw in BULK_BILLING_KEYWORDS)
+    has_bulk = any(kw in h for h in haystacks for kw in BULK_BILLING_KEYWORDS)
 
-    has_private = any(kw in text_lower for kw in PRIVATE_BILLING_KEYWORDS)
+    has_private = any(kw in h for h in haystacks for kw in PRIVATE_BILLING_KEYWORDS)
 
     # Check for dollar amounts > $50 (e.g. $80, $90, $120) as private signal
-    dollar_amounts = re.findall(r'\$(\d+)', text_lower)
+    dollar_amounts = [amt for h in haystacks for amt in re.findall(r'\$(\d+)', h)]
     has_large_fee = any(int(amt) > 50 for amt in dollar_amounts if amt.isdigit())
 
     if has_private or has_large_fee:
@@ -1320,11 +904,6 @@ PRACTITIONER_KEYWORDS = [
 ]
 
 
-def _normalize_for_match(text: str) -> str:
-    """Normalize text for case-insensitive pattern matching."""
-    return (text or "").lower()
-
-
 async def detect_from_headers(response) -> dict:
     """
     Extract infra/CDN from HTTP response headers.
@@ -1336,9 +915,8 @@ async def detect_from_headers(response) -> dict:
     try:
         headers = await response.all_headers() if hasattr(response, "all_headers") else {}
         header_str = " ".join(f"{k}:{v}" for k, v in headers.items()).lower()
-        for name, patterns in HEADER_SIGNATURES.items():
-            if any(p in header_str for p in patterns):
-                found[name] = True
+        for name in HEADER_MATCHER.match(header_str):
+            found[name] = True
 
         # CSP header — enterprise tools whitelist their domains here
         csp_value = headers.get("content-security-policy", "")
@@ -1352,77 +930,36 @@ async def detect_from_headers(response) -> dict:
     return found
 
 
-def _scan_page_for_tech(html: str, page_text: str, script_srcs: list, iframe_srcs: list, link_hrefs: list) -> dict:
+def _scan_page_for_tech(snapshot: PageSnapshot) -> dict:
     """
     Scan HTML, scripts, iframes, links, and visible text for tech signatures.
     Returns dict of category -> set of detected tool names.
     """
     results = {cat: set() for cat in TECH_SIGNATURES}
-    html_lower = _normalize_for_match(html)
-    text_lower = _normalize_for_match(page_text)
-    all_sources = html_lower + " " + " ".join(
-        _normalize_for_match(s) for s in script_srcs + iframe_srcs + link_hrefs
-    )
-
-    for category, tools in TECH_SIGNATURES.items():
-        for tool_name, patterns in tools.items():
-            for pattern in patterns:
-                pat = _normalize_for_match(pattern)
-
-                # GUARD: skip patterns too short to be reliable
-                if len(pat) < 6:
-                    continue
-
-                # Prefer URL/script context over raw HTML body
-                if pat in all_sources:
-                    results[category].add(tool_name)
-                    break
-
-                # Only match in visible text if pattern is long enough to be specific
-                if pat in text_lower and len(pat) >= 8:
-                    results[category].add(tool_name)
-                    break
+    html_lower = snapshot.html_lower
+    text_lower = snapshot.text_lower
+    script_srcs, iframe_srcs, link_hrefs = snapshot.script_srcs, snapshot.iframe_srcs, snapshot.link_hrefs
+
+    # One pass per haystack: raw HTML, the src/href list, then visible text
+    # (only patterns long enough to be specific — see signatures._compile_tech_signatures).
+    # HTML and srcs are scanned separately rather than concatenated into a second
+    # full copy of the page. Filename and WordPress theme signatures ride along
+    # in the sources matcher.
+    hits = (TECH_SOURCES_MATCHER.match(html_lower)
+            | TECH_SOURCES_MATCHER.match(snapshot.sources_lower)
+            | TECH_TEXT_MATCHER.match(text_lower))
+    for category, tool_name in hits:
+        results.setdefault(category, set()).add(tool_name)
 
     # Regex-based UA ID detector (UA IDs appear inline in scripts, not as URLs)
     if re.search(r"UA-\d{4,10}-\d{1,2}", html_lower):
         results.setdefault("pixels", set()).add("Google Universal Analytics")
 
-    # Filename-based detection for tools deployed on custom subdomains
-    FILENAME_SIGNATURES = {
-        "sfmc_utm":        ("crm",      "Salesforce Marketing Cloud"),
-        "sfmc.js":         ("crm",      "Salesforce Marketing Cloud"),
-        "callrail":        ("pixels",   "CallRail"),
-        "contentsquare":   ("pixels",   "Contentsquare"),
-        "obtp.js":         ("pixels",   "Outbrain"),
-        "taboola":         ("pixels",   "Taboola"),
-        "bat.js":          ("pixels",   "Bing Ads"),
-        "reddit":          ("pixels",   "Reddit Ads"),
-    }
-    for filename_sig, (cat, tool) in FILENAME_SIGNATURES.items():
-        if filename_sig in all_sources:
-            results.setdefault(cat, set()).add(tool)
-
     # Meta generator tag detection
-    meta_hits = detect_from_meta_generator(html)
+    meta_hits = detect_from_meta_generator(snapshot)
     for cat, tools in meta_hits.items():
         results.setdefault(cat, set()).update(tools)
 
-    # Theme detection pass (WordPress themes/page builders)
-    THEME_SIGNATURES = {
-        "Divi":            ["/themes/Divi/", "/themes/divi/", "et_pb_", "divi-child"],
-        "Elementor":       ["/plugins/elementor/", "elementor-frontend", "data-elementor-type"],
-        "Avada":           ["/themes/Avada/", "fusion-builder"],
-        "Beaver Builder":  ["fl-builder", "/plugins/bb-plugin/"],
-        "WPBakery":        ["vc_row", "wpb_wrapper"],
-        "GeneratePress":   ["/themes/generatepress/"],
-        "Astra":           ["/themes/astra/"],
-    }
-    for theme_name, patterns in THEME_SIGNATURES.items():
-        for pat in patterns:
-            if pat.lower() in all_sources:
-                results.setdefault("cms", set()).add(f"WordPress ({theme_name})")
-                break
-
     # WordPress plugin path detection (script/link srcs contain wp-content/plugins/)
     plugin_signatures = {
         "Contact Form 7": ["plugins/contact-form-7", "contact-form-7", "wpcf7"],
@@ -1449,43 +986,6 @@ def _scan_page_for_tech(html: str, page_text: str, script_srcs: list, iframe_src
     return results
 
 
-async def _collect_page_sources(page: Page) -> tuple:
-    """
-    Collect script srcs, iframe srcs, and link hrefs from page.
-    Script srcs: URLs from script tags (used for TECH_SIGNATURES matching).
-    Link hrefs: ALL hrefs (relative + absolute) — relative paths like
-    /wp-content/uploads/trustindex-feed-instagram-widget.css were previously
-    dropped and caused Trustindex/CF7/CSS-based signatures to be missed.
-    """
-    script_srcs, iframe_srcs, link_hrefs = [], [], []
-    try:
-        for script in await page.query_selector_all("script[src]"):
-            src = await script.get_attribute("src")
-            if src:
-                script_srcs.append(src)
-                # If this is a CDN-proxied URL that contains a wp-content path,
-                # also append the path component alone so plugin signatures match
-                # e.g. cdn-akhmn.nitrocdn.com/.../wp-content/plugins/gravityforms/...
-                if "wp-content" in src.lower():
-                    path = urlparse(src).path
-                    if path and path not in script_srcs:
-                        script_srcs.append(path)
-        for iframe in await page.query_selector_all("iframe[src]"):
-            src = await iframe.get_attribute("src")
-            if src:
-                iframe_srcs.append(src)
-        for link in await page.query_selector_all("link[href], a[href]"):
-            href = await link.get_attribute("href")
-            if href and href.strip():
-                h = href.strip()
-                # Include relative + absolute; exclude non-URL values
-                if h != "#" and not h.startswith(("mailto:", "tel:", "javascript:")):
-                    link_hrefs.append(h)
-    except Exception:
-        pass
-    return script_srcs, iframe_srcs, link_hrefs
-
-
 def _merge_tech_results(accum: dict, new: dict, header_infra: dict = None) -> None:
     """Merge new detection results into accum. In-place."""
     for cat, tools in new.items():
@@ -1506,61 +1006,125 @@ def _tech_dict_to_flat(tech: dict) -> dict:
     }
 
 
-async def detect_tech_stack(
-    page: Page,
-    context,
-    base_url: str,
-    initial_response=None,
-    page_cache: dict = None,
-) -> dict:
+# -----------------------------------------------------------------------------
+# Early exit: stop navigating once the fields a run needs are resolved
+# -----------------------------------------------------------------------------
+
+# Fields each crawl policy must resolve. None = exhaustive (never skip a navigation).
+# The early-exit policies are opt-in: a skipped stage also loses every other column
+# it would have filled (tech subpages add crm, forms, pixels, reviews, cms, ...).
+CRAWL_POLICIES = {
+    "full":        None,
+    "key_fields":  {"booking", "pms_ehr", "billing_type", "practitioner_count"},
+    "booking_pms": {"booking", "pms_ehr"},   # cheap first pass
+    "web_stack":   {"cms", "infra"},         # CNAME/NS records often answer both: no subpages
+}
+DEFAULT_CRAWL_POLICY = "full"
+
+# Fields each navigation stage of scrape_clinic can resolve
+STAGE_FIELDS = {
+    "tech_subpages": {"booking", "pms_ehr", "cms", "infra"},
+    "fee_pages":     {"billing_type"},
+    "team_pages":    {"practitioner_count"},
+}
+
+
+class FieldTracker:
     """
-    Detect tech stack from up to 3 pages: homepage + /contact + /book (or first booking link).
-    Scans HTML, script srcs, iframe srcs, link hrefs, HTTP headers, and visible text.
-    Returns flat dict: {"pms_ehr": "Cliniko", "booking": "HotDoc", "cms": "WordPress", ...}
+    Target fields one clinic has resolved so far. Detectors mark() what they
+    find; should_visit() asks the run's policy whether a navigation stage can
+    still add a required field. Skipped stages are recorded for the summary.
     """
-    from urllib.parse import urljoin
 
-    accum = {cat: set() for cat in TECH_SIGNATURES}
-    all_script_srcs = []
+    __slots__ = ("required", "resolved", "skipped")
+
+    def __init__(self, policy: str = DEFAULT_CRAWL_POLICY):
+        self.required = CRAWL_POLICIES[policy]
+        self.resolved = set()
+        self.skipped = []
+
+    def mark(self, field: str, value) -> None:
+        """Record field as resolved if value is a real detection."""
+        if value and value not in ("not_detected", "Not Detected"):
+            self.resolved.add(field)
+
+    def should_visit(self, stage: str) -> bool:
+        if self.required is None:
+            return True
+        if (STAGE_FIELDS[stage] & self.required) - self.resolved:
+            return True
+        self.skipped.append(stage)
+        return False
+
+
+# Subpage fetching for detect_tech_stack
+# (discovery field, hardcoded paths used when discovery finds nothing for it)
+TECH_SUBPAGE_FIELDS = [
+    ("contact",  ["/contact", "/contact-us"]),
+    ("booking",  ["/book", "/booking", "/book-online", "/appointments"]),
+    ("team",     ["/about", "/about-us"]),
+    ("services", ["/services", "/our-services"]),
+]
+MAX_TECH_PAGES = 5          # homepage + up to 4 subpages
+SUBPAGE_POOL_SIZE = 3       # side tabs open at once per clinic context
+MAX_PAGES_PER_DOMAIN = 3    # concurrent navigations against one host, across all workers
+_domain_slots: Dict[str, list] = {}   # netloc -> [semaphore, holders + waiters]
 
-    # Fire robots.txt fetch in background before subpage visits
-    robots_task = asyncio.create_task(scan_robots_txt(base_url))
 
-    # 1. Scan homepage (current page)
+@contextlib.asynccontextmanager
+async def _domain_slot(netloc: str):
+    """
+    Per-host semaphore so duplicate rows / chains never hammer one site.
+    An entry lives only while someone holds or waits for it, so the dict
+    stays as small as the hosts in flight and no semaphore outlives its loop.
+    """
+    entry = _domain_slots.get(netloc)
+    if entry is None:
+        entry = _domain_slots[netloc] = [asyncio.Semaphore(MAX_PAGES_PER_DOMAIN), 0]
+    entry[1] += 1
     try:
-        html = await page.content()
-        page_text = await page.inner_text("body") if await page.query_selector("body") else ""
-        if page_cache is not None:
-            page_cache[base_url] = (html, page_text)
-        script_srcs, iframe_srcs, link_hrefs = await _collect_page_sources(page)
-        all_script_srcs.extend(script_srcs)
-        page_results = _scan_page_for_tech(html, page_text, script_srcs, iframe_srcs, link_hrefs)
-        header_infra = await detect_from_headers(initial_response) if initial_response else {}
-        _merge_tech_results(accum, page_results, header_infra)
-        text_hits = scan_visible_text_for_tech(page_text)
-        _merge_tech_results(accum, text_hits)
-    except Exception as e:
-        print(f"  Error scanning homepage for tech: {e}")
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _domain_slots[netloc]
 
-    # 2. Visit /contact, /book, /about, /services (max 4 extra pages, 5 total)
-    extra_urls = []
+
+async def _discovered_or_guessed(
+    discovery: SiteDiscovery, field: str, homepage: PageSnapshot, k: int, guesses: list
+) -> list:
+    """Top-k discovered URLs for field, or the hardcoded guesses when discovery has none."""
+    if discovery is not None:
+        found = await discovery.candidates(field, homepage, k)
+        if found:
+            return found
+    return guesses
+
+
+async def _tech_subpage_urls(base_url: str, homepage: PageSnapshot, discovery: SiteDiscovery) -> list:
+    """Candidate subpages for detect_tech_stack, best first."""
     parsed = urlparse(base_url)
     base = f"{parsed.scheme or 'https'}://{parsed.netloc}"
-    for path in [
-        "/contact", "/contact-us",
-        "/book", "/booking", "/book-online", "/appointments",
-        "/about", "/about-us",
-        "/services", "/our-services",
-    ]:
-        extra_urls.append(urljoin(base, path))
-
-    # Find first booking link on page
+    per_field = []
+    for field, paths in TECH_SUBPAGE_FIELDS:
+        per_field.append(await _discovered_or_guessed(
+            discovery, field, homepage, 2, [urljoin(base, path) for path in paths]
+        ))
+    # Round-robin across fields so the page limit covers each field before seconds
+    extra_urls = []
+    for rank in range(max((len(urls) for urls in per_field), default=0)):
+        for urls in per_field:
+            if rank < len(urls) and urls[rank] not in extra_urls:
+                extra_urls.append(urls[rank])
+
+    # Find first booking link on the homepage (a[href*="book"], a[href*="appointment"])
     try:
-        booking_links = await page.query_selector_all(
-            'a[href*="book"], a[href*="booking"], a[href*="appointment"]'
-        )
-        for link in booking_links[:3]:
-            href = await link.get_attribute("href")
+        booking_links = [
+            href for href, _ in homepage.links
+            if "book" in href or "appointment" in href
+        ]
+        for href in booking_links[:3]:
             if href:
                 full = urljoin(base_url, href)
                 if full not in extra_urls and urlparse(full).netloc == parsed.netloc:
@@ -1569,40 +1133,195 @@ async def detect_tech_stack(
     except Exception:
         pass
 
-    pages_visited = 1
-    for url in extra_urls:
-        if pages_visited >= 5:
-            break
-        # Guard: stop if context/page was closed by a previous navigation
+    return extra_urls
+
+
+async def _fetch_subpage(context, url: str, budget: DeadlineBudget = None,
+                         timeout_scale: float = 1.0):
+    """
+    Load url in a fresh tab of the clinic's context (same cookies and routes).
+    The navigation timeout is stretched by timeout_scale and capped by the
+    budget's "tech_subpages" slice.
+    Returns (PageSnapshot, header_infra) or None if the page did not load.
+    """
+    async with _domain_slot(urlparse(url).netloc):
+        tab = None
         try:
-            if page.is_closed():
-                break
+            tab = await context.new_page()
+            nav_ms = int(7000 * timeout_scale)
+            if budget is not None:
+                nav_ms = budget.timeout_ms(nav_ms, "tech_subpages")
+            resp = await tab.goto(url, timeout=nav_ms, wait_until="domcontentloaded")
+            await tab.wait_for_timeout(150)
+            snapshot = await harvest_page(tab)
+            # Read headers before the tab closes
+            header_infra = await detect_from_headers(resp) if resp else {}
+            return snapshot, header_infra
         except Exception:
-            break
-        try:
-            resp = await page.goto(url, timeout=7000, wait_until="domcontentloaded")
-            await page.wait_for_timeout(150)
+            return None
+        finally:
+            if tab is not None:
+                try:
+                    await tab.close()
+                except Exception:
+                    pass
+
 
-            if page.is_closed():
+async def _fetch_subpages(context, urls: list, limit: int, loaded: dict = None,
+                          budget: DeadlineBudget = None, timeout_scale: float = 1.0) -> list:
+    """
+    Fetch candidate subpages with up to SUBPAGE_POOL_SIZE tabs in flight.
+    Fetches start in list order and a new one is only started while
+    loaded + in-flight < limit, so the pages kept are exactly the first
+    `limit` candidates that load — same set the old one-at-a-time walk kept.
+    Returns [(url, PageSnapshot, header_infra)] in candidate order.
+    loaded: optional dict filled as pages arrive (candidate index -> same tuple),
+    so a caller that cancels the fetch can keep the pages already loaded.
+    budget / timeout_scale: passed to each _fetch_subpage.
+    """
+    loaded = {} if loaded is None else loaded
+    in_flight = {}
+    next_idx = 0
+    try:
+        while True:
+            while (next_idx < len(urls)
+                   and len(in_flight) < SUBPAGE_POOL_SIZE
+                   and len(loaded) + len(in_flight) < limit):
+                task = asyncio.create_task(_fetch_subpage(context, urls[next_idx], budget, timeout_scale))
+                in_flight[task] = next_idx
+                next_idx += 1
+            if not in_flight:
                 break
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                idx = in_flight.pop(task)
+                fetched = task.result()
+                if fetched is not None:
+                    loaded[idx] = (urls[idx], *fetched)
+    finally:
+        # Cancelled from outside (e.g. the per-clinic timeout): don't leak tabs
+        for task in in_flight:
+            task.cancel()
+    return [loaded[idx] for idx in sorted(loaded)]
 
-            html = await page.content()
-            page_text = await page.inner_text("body") if await page.query_selector("body") else ""
-            if page_cache is not None:
-                page_cache[url] = (html, page_text)
-            script_srcs, iframe_srcs, link_hrefs = await _collect_page_sources(page)
-            all_script_srcs.extend(script_srcs)
-            page_results = _scan_page_for_tech(html, page_text, script_srcs, iframe_srcs, link_hrefs)
-            header_infra = await detect_from_headers(resp) if resp else {}
-            _merge_tech_results(accum, page_results, header_infra)
-            text_hits = scan_visible_text_for_tech(page_text)
-            _merge_tech_results(accum, text_hits)
-            pages_visited += 1
-        except Exception:
-            continue
+
+async def detect_tech_stack(
+    page: Page,
+    context,
+    base_url: str,
+    initial_response=None,
+    page_cache: dict = None,
+    homepage: PageSnapshot = None,
+    probe: SiteProbe = None,
+    discovery: SiteDiscovery = None,
+    tracker: FieldTracker = None,
+    budget: DeadlineBudget = None,
+    dns_hits: dict = None,
+    http_session=None,
+    timeout_scale: float = 1.0,
+) -> dict:
+    """
+    Detect tech stack from up to MAX_TECH_PAGES pages: homepage + the first subpages
+    that load among /contact, /book, /about, /services (and the first booking link).
+    Subpages are fetched concurrently in side tabs of `context`.
+    Scans HTML, script srcs, iframe srcs, link hrefs, HTTP headers, visible text,
+    and the bodies of third-party scripts (through SCRIPT_SCAN_CACHE).
+    homepage: snapshot of the current page if the caller already took one.
+    discovery: if given, subpages are the top-ranked sitemap/link URLs per field
+    (contact, booking, team/about, services) instead of hardcoded paths, and
+    robots.txt is reused from it.
+    probe: if given, candidate subpages are HTTP-probed first and only the ones
+    that exist (resolved, deduped, no soft 404s) are opened in the browser.
+    tracker: if given, the homepage's hits are marked on it and the subpages
+    are skipped when the crawl policy needs nothing more from them.
+    dns_hits: dns_fingerprint() result; merged with the homepage scan before the
+    tracker is asked, so a cms/infra answer from DNS can skip the subpages
+    (web_stack policy).
+    http_session: the clinic's (proxied) probe session; third-party scripts are
+    fetched through it. Default: the shared HTTP client.
+    timeout_scale stretches the subpage navigation timeouts (slow-site retry pass).
+    budget: if given, subpage fetching ("tech_subpages"), the external script scan
+    ("external_js") and the robots.txt scan ("robots") run under its slices; the
+    homepage scan is always kept.
+    page_cache (url -> PageSnapshot) is filled for reuse by the other detectors.
+    Returns flat dict: {"pms_ehr": "Cliniko", "booking": "HotDoc", "cms": "WordPress", ...}
+    """
+    accum = {cat: set() for cat in TECH_SIGNATURES}
+    all_script_srcs = []
+
+    # Fire robots.txt scan in background before subpage visits
+    async def _robots_hits():
+        robots_text = await discovery.robots_txt() if discovery is not None else None
+        return await scan_robots_txt(base_url, robots_text)
+
+    robots_task = asyncio.create_task(_robots_hits())
+
+    # 1. Scan homepage (current page)
+    try:
+        if homepage is None:
+            homepage = await harvest_page(page)
+        if page_cache is not None:
+            page_cache[base_url] = homepage
+        all_script_srcs.extend(homepage.script_srcs)
+        page_results = _scan_page_for_tech(homepage)
+        header_infra = await detect_from_headers(initial_response) if initial_response else {}
+        _merge_tech_results(accum, page_results, header_infra)
+        text_hits = scan_visible_text_for_tech(homepage.text)
+        _merge_tech_results(accum, text_hits)
+    except Exception as e:
+        print(f"  Error scanning homepage for tech: {e}")
+    if dns_hits:
+        _merge_tech_results(accum, {cat: tools for cat, tools in dns_hits.items() if cat in accum})
+    if tracker is not None:
+        for category, tools in accum.items():
+            tracker.mark(category, tools)
+
+    # 2. Visit contact, booking, about, services pages (max 4 extra pages, 5 total),
+    #    unless the crawl policy already has every field these pages could add
+    loaded = {}
+
+    async def _subpages():
+        extra_urls = await _tech_subpage_urls(base_url, homepage, discovery)
+        # Fetched concurrently in side tabs; merged in candidate order so the
+        # result never depends on which subpage happened to load first
+        if probe is not None:
+            extra_urls = await probe.filter(extra_urls)
+        return await _fetch_subpages(context, extra_urls, MAX_TECH_PAGES - 1, loaded,
+                                     budget, timeout_scale)
+
+    subpages = []
+    if tracker is None or tracker.should_visit("tech_subpages"):
+        if budget is not None:
+            # Cut short: keep whichever subpages had loaded by then
+            subpages = await budget.run("tech_subpages", _subpages(), default=None)
+            if subpages is None:
+                subpages = [loaded[idx] for idx in sorted(loaded)]
+        else:
+            subpages = await _subpages()
+    for url, snapshot, header_infra in subpages:
+        if page_cache is not None:
+            page_cache[url] = snapshot
+        all_script_srcs.extend(snapshot.script_srcs)
+        page_results = _scan_page_for_tech(snapshot)
+        _merge_tech_results(accum, page_results, header_infra)
+        text_hits = scan_visible_text_for_tech(snapshot.text)
+        _merge_tech_results(accum, text_hits)
+
+    # 3. Third-party scripts: only their signature hits are cached (across clinics
+    #    and runs), so a widget script shared by many sites is downloaded once
+    js_task = scan_external_js(all_script_srcs, base_url, cache=SCRIPT_SCAN_CACHE,
+                               session=http_session)
+    if budget is not None:
+        js_hits = await budget.run("external_js", js_task, default={})
+    else:
+        js_hits = await js_task
+    _merge_tech_results(accum, js_hits)
 
     # Merge robots.txt results before returning
-    robots_hits = await robots_task
+    if budget is not None:
+        robots_hits = await budget.run("robots", robots_task, default={})
+    else:
+        robots_hits = await robots_task
     _merge_tech_results(accum, robots_hits)
 
     WIX_FORMS_THIRD_PARTY = [
@@ -1653,6 +1372,8 @@ def _ensure_sheet_headers(worksheet, tech_cats: list) -> None:
       T  whatsapp
       U  scraping_date
       V  error_log
+      W  signature_version
+      X  crawl_policy (blank = full)
     """
     headers = [
         "website_url",
@@ -1668,9 +1389,11 @@ def _ensure_sheet_headers(worksheet, tech_cats: list) -> None:
         "whatsapp",
         "scraping_date",
         "error_log",
+        "signature_version",
+        "crawl_policy",
     ]
     try:
-        worksheet.update([headers], "A1:V1")
+        worksheet.update([headers], "A1:X1")
     except Exception:
         pass
 
@@ -1705,9 +1428,9 @@ def _print_tech_summary(result: dict) -> None:
     print("\n".join(lines))
 
 
-def check_home_visits(html: str) -> bool:
+def check_home_visits(snapshot: PageSnapshot) -> bool:
     """Check if clinic offers home visits from HTML."""
-    html_lower = html.lower()
+    html_lower = snapshot.html_lower
     return any(kw in html_lower for kw in HOME_VISIT_KEYWORDS)
 
 
@@ -1740,8 +1463,48 @@ def infer_pms_booking(result: dict) -> dict:
     return result
 
 
-async def scrape_clinic(browser, url: str) -> Dict:
-    """Scrape a single clinic website."""
+# Per-stage caps, as fractions of the clinic budget. They add up to more than 1
+# on purpose: time a fast stage leaves unused is available to the later ones,
+# and no stage may ever run past the overall deadline.
+STAGE_BUDGET_SHARES = {
+    "homepage":      0.35,
+    "mx":            0.15,   # extra wait after the homepage; the lookup runs alongside it
+    "dns":           0.10,   # TXT/NS/CNAME fingerprint, also started with the homepage
+    "tech_subpages": 0.40,
+    "external_js":   0.10,
+    "robots":        0.10,
+    "fees":          0.25,
+    "team":          0.25,
+}
+
+
+def _apply_dns_hits(result: dict, dns_hits: dict, tech_categories: list) -> None:
+    """
+    Fill result from dns_fingerprint hits: the email provider when MX found
+    none (mailbox hosts only - SPF senders like SendGrid are "email_sending"),
+    and tech_categories (flat strings, as detect_tech_stack returns them).
+    """
+    if result["email_provider"] == "not_detected" and dns_hits.get("email"):
+        result["email_provider"] = ", ".join(sorted(dns_hits["email"]))
+    for cat in tech_categories:
+        if dns_hits.get(cat):
+            result[cat] = ", ".join(sorted(dns_hits[cat]))
+
+
+async def scrape_clinic(pool, url: str, crawl_policy: str = DEFAULT_CRAWL_POLICY,
+                        budget_seconds: float = None, timeout_scale: float = 1.0) -> Dict:
+    """
+    Scrape a single clinic website in a warm context borrowed from pool
+    (a ContextPool or BrowserSupervisor).
+    crawl_policy (see CRAWL_POLICIES) decides which navigation stages may be
+    skipped once the fields it needs are resolved.
+    budget_seconds: if given, a DeadlineBudget sliced per STAGE_BUDGET_SHARES;
+    stages that run out are cut, listed in result["cut_stages"], and the row
+    keeps everything detected before the cut.
+    timeout_scale stretches the page navigation timeouts (slow-site retry pass).
+    A homepage answering HTTP >= 400 is still scanned; its status goes to
+    result["http_status"], which only decides whether the row is retried.
+    """
     tech_categories = list(TECH_SIGNATURES.keys())
     result = {
         "url":                      url,
@@ -1756,202 +1519,110 @@ async def scrape_clinic(browser, url: str) -> Dict:
         "whatsapp":                 "no",
         "emails":                   [],
         "error":                    None,
+        "signature_version":        SIGNATURE_VERSION,
+        "crawl_policy":             crawl_policy,
     }
     for cat in tech_categories:
         result[cat] = "not_detected"
 
-    # Create isolated context for each clinic
-    context = await browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    )
-    async def block_heavy_resources(route):
-        if route.request.resource_type in ("image", "media", "font", "stylesheet"):
-            await route.abort()
-        else:
-            await route.continue_()
+    # Borrow a warm, cleaned context (heavy resources already blocked), behind the
+    # proxy this clinic is pinned to if an earlier attempt already visited it
+    lease = await pool.acquire(urlparse(url).netloc)
+    context, page = lease.context, lease.page
+    lease_failed = False
+
+    # One egress IP per clinic: HTTP probes go out through the context's proxy
+    proxies = getattr(pool, "proxies", None)
 
-    await context.route("**/*", block_heavy_resources)
-    page = await context.new_page()
+    # Cheap HTTP existence checks and sitemap discovery, shared by every stage below.
+    # Discovery starts now so robots.txt/sitemaps download while the homepage loads.
+    http_session = open_probe_session(proxy=lease.proxy)
+    probe = SiteProbe(http_session, url)
+    discovery = SiteDiscovery(http_session, url)
+    discovery.start()
+    tracker = FieldTracker(crawl_policy)
+    budget = DeadlineBudget(budget_seconds or float("inf"), STAGE_BUDGET_SHARES)
 
     try:
         print(f"\n🔍 Analyzing: {url}...")
 
         domain = urlparse(url).netloc.replace('www.', '')
 
-        # Start DNS lookup in parallel (non-blocking)
+        # Start DNS lookups in parallel (non-blocking): MX, plus TXT/NS/CNAME fingerprints
         provider_task = asyncio.create_task(get_email_provider(domain))
+        dns_task = asyncio.create_task(dns_fingerprint(domain))
 
-        # Network request interception — catches dynamically loaded booking, pixels, chat
+        # Network request interception — catches dynamically loaded booking, pixels, chat.
+        # Listen on the context so requests from detect_tech_stack's subpage tabs count too.
         network_hits = set()
-        NETWORK_WATCH_DOMAINS = {
-            # ── Booking / PMS ──
-            "cdn.hotdoc.com.au":       ("booking", "HotDoc"),
-            "hotdoc-widgets.min.js":   ("booking", "HotDoc"),
-            "hotdoc.com.au":           ("booking", "HotDoc"),
-            "book.hotdoc.com.au":      ("booking", "HotDoc"),
-            "hotdoc.com.au/medical":   ("booking", "HotDoc"),
-            "healthengine.com.au":     ("booking", "HealthEngine"),
-            "cliniko.com":             ("pms_ehr", "Cliniko"),
-            "halaxy.com":              ("pms_ehr", "Halaxy"),
-            "powerdiary.com":          ("pms_ehr", "Power Diary"),
-            "nookal.com":              ("pms_ehr", "Nookal"),
-            "janeapp.com":             ("pms_ehr", "Jane App"),
-            "splose.com":              ("pms_ehr", "Splose"),
-            "calendly.com":            ("booking", "Calendly"),
-            "acuityscheduling.com":    ("booking", "Acuity"),
-            "automed.com.au":          ("booking", "AutoMed"),
-            "mindbodyonline.com":      ("pms_ehr", "Mindbody"),
-            "fresha.com":              ("pms_ehr", "Fresha"),
-            "gettimely.com":           ("pms_ehr", "Timely"),
-            "simplepractice.com":      ("pms_ehr", "SimplePractice"),
-            "practicebetter.io":       ("pms_ehr", "Practice Better"),
-            "frontdesk.com.au":        ("pms_ehr", "Front Desk"),
-            # ── PMS / EHR portals ──
-            "clientsecure.me":         ("pms_ehr", "SimplePractice"),
-            "mychart.com":             ("pms_ehr", "Epic"),
-            "athenahealth.com":        ("pms_ehr", "Athenahealth"),
-            "drchrono.com":            ("pms_ehr", "DrChrono"),
-            "eclinicalworks.com":      ("pms_ehr", "eClinicalWorks"),
-            # ── CRM ──
-            "weve.to":                 ("crm", "Weave"),
-            # ── Forms / Intake ──
-            "intakeq.com":             ("forms", "IntakeQ"),
-            "tfaforms.net":            ("forms", "FormAssembly"),
-            # ── Booking ──
-            "zocdoc.com":              ("booking", "Zocdoc"),
-            "doctolib.com":            ("booking", "Doctolib"),
-            "setmore.com":             ("booking", "Setmore"),
-            # ── Pixels ──
-            "connect.facebook.net":    ("pixels", "Meta Pixel"),
-            "analytics.tiktok.com":    ("pixels", "TikTok Pixel"),
-            "googletagmanager.com":    ("pixels", "Google Tag Manager"),
-            "googleadservices.com":    ("pixels", "Google Ads"),
-            "google-analytics.com/analytics.js": ("pixels", "Google Universal Analytics"),
-            "ssl.google-analytics.com/ga.js":    ("pixels", "Google Universal Analytics"),
-            "google-analytics.com/ga.js":        ("pixels", "Google Universal Analytics"),
-            "snap.licdn.com":          ("pixels", "LinkedIn Insight"),
-            "ct.pinterest.com":        ("pixels", "Pinterest"),
-            "clarity.ms":              ("pixels", "Microsoft Clarity"),
-            "hotjar.com":              ("pixels", "Hotjar"),
-            "bat.bing.com":            ("pixels", "Bing Ads"),
-            "amplify.outbrain.com":    ("pixels", "Outbrain"),
-            "cdn.taboola.com":         ("pixels", "Taboola"),
-            "alb.reddit.com":           ("pixels", "Reddit Ads"),
-            "rdt.js":                   ("pixels", "Reddit Ads"),
-            "cdn.callrail.com":        ("pixels", "CallRail"),
-            "hj.contentsquare.net":     ("pixels", "Contentsquare"),
-            "tag.simpli.fi":           ("pixels", "Simpli.fi"),
-            "cdn.ad360.media":         ("pixels", "AD360"),
-            "fls.doubleclick.net":     ("pixels", "DoubleClick / Floodlight"),
-            "stats.g.doubleclick.net":  ("pixels", "DoubleClick / Floodlight"),
-            # ── Telehealth ──
-            "zoom.us":                 ("telehealth", "Zoom"),
-            "coviu.com":               ("telehealth", "Coviu"),
-            "vcc.healthdirect.org.au": ("telehealth", "Healthdirect Video"),
-            "telehealth.cliniko.com":  ("telehealth", "Cliniko Telehealth"),
-            # ── Live Chat ──
-            "widget.intercom.io":      ("live_chat", "Intercom"),
-            "js.drift.com":            ("live_chat", "Drift"),
-            "embed.tawk.to":           ("live_chat", "Tawk.to"),
-            "zdassets.com":            ("live_chat", "Zendesk"),
-            "client.crisp.chat":       ("live_chat", "Crisp"),
-            "wchat.freshchat.com":     ("live_chat", "Freshchat"),
-            "apps.mypurecloud.com.au": ("live_chat", "Genesys"),
-            "apps.mypurecloud.com":    ("live_chat", "Genesys"),
-            "genesys.com":             ("live_chat", "Genesys"),
-            "genesyscloud.com":        ("live_chat", "Genesys"),
-            # ── CRM / Email Marketing ──
-            "hs-scripts.com":          ("crm", "HubSpot"),
-            "pardot.com":              ("crm", "Salesforce"),
-            "exacttarget.com":         ("crm", "Salesforce Marketing Cloud"),
-            "marketingcloud.com":      ("crm", "Salesforce Marketing Cloud"),
-            "salesiq.zoho.com":        ("crm", "Zoho CRM"),
-            "pipedriveassets.com":     ("crm", "Pipedrive"),
-            "podium.com":              ("crm", "Podium"),
-            "birdeye.com":             ("reviews", "Birdeye"),
-            "klaviyo.com":             ("crm", "Klaviyo"),
-            "chimpstatic.com":         ("crm", "Mailchimp"),
-            "trackcmp.net":            ("crm", "ActiveCampaign"),
-            # ── Payments ──
-            "js.stripe.com":           ("payments", "Stripe"),
-            "squareup.com":            ("payments", "Square"),
-            "medipass.com.au":         ("payments", "Medipass"),
-            "authorize.net":             ("payments", "Authorize.net"),
-            "acceptjs.authorize.net":    ("payments", "Authorize.net"),
-            # ── Forms ──
-            "typeform.com":            ("forms", "Typeform"),
-            "jotform.com":             ("forms", "JotForm"),
-            "hscollectedforms.net":    ("forms", "HubSpot Forms"),
-            "forms.hsforms.com":       ("forms", "HubSpot Forms"),
-            "hsforms.net":             ("forms", "HubSpot Forms"),
-            "formstack.com":           ("forms", "Formstack"),
-            "fscdn.formstack.com":     ("forms", "Formstack"),
-            # ── Centaur Portal / D4W ──
-            "centaurportal.com":       ("booking", "D4W eAppointments"),
-            # ── GoHighLevel / LeadConnector ──
-            "api.leadconnectorhq.com":      ("crm", "GoHighLevel"),
-            "backend.leadconnectorhq.com":  ("crm", "GoHighLevel"),
-            "stcdn.leadconnectorhq.com":    ("crm", "GoHighLevel"),
-            "widgets.leadconnectorhq.com":  ("crm", "GoHighLevel"),
-            "link.msgsndr.com":             ("forms", "GoHighLevel Forms"),
-            "msgsndr.com":                  ("crm", "GoHighLevel"),
-            "gohighlevel.com":              ("crm", "GoHighLevel"),
-            "cdn.trustindex.io":       ("reviews", "Trustindex"),
-            "trustindex.io":           ("reviews", "Trustindex"),
-            "static.elfsight.com":     ("reviews", "Elfsight"),
-            "apps.elfsight.com":      ("reviews", "Elfsight"),
-            "elfsight.com":           ("reviews", "Elfsight"),
-            "plugins/send-app":        ("crm", "Send App"),
-            "medirecords":             ("crm", "MediRecords (Clinical CRM)"),
-            # Mailgun / LeadConnector transactional email
-            "mailgun.org":              ("crm", "Mailgun"),
-            "mg.mail":                  ("crm", "Mailgun"),
-            # ── Infra / CDN ──
-            "nitrocdn.com":             ("infra", "NitroPack"),
-            "nitropack.io":             ("infra", "NitroPack"),
-            "b-cdn.net":                ("infra", "Bunny CDN"),
-            "cdn.bunny.net":            ("infra", "Bunny CDN"),
-        }
 
         def on_request(request):
-            req_url = request.url.lower()
-            for domain, (category, name) in NETWORK_WATCH_DOMAINS.items():
-                if domain in req_url:
-                    network_hits.add((category, name))
+            network_hits.update(classify_request_url(request.url))
 
-        page.on("request", on_request)
+        lease.on("request", on_request)
 
         cookie_hits = {}
         # Load homepage
+        nav_started = time.time()
         try:
-            response = await page.goto(url, timeout=20000, wait_until='domcontentloaded')
+            response = await page.goto(
+                url, timeout=budget.timeout_ms(int(20000 * timeout_scale), "homepage"),
+                wait_until='domcontentloaded',
+            )
             await page.wait_for_timeout(400)  # Wait for dynamic content
             cookies = await context.cookies()
             cookie_hits = detect_from_cookies(cookies)
         except PlaywrightTimeoutError:
             result['error'] = 'Timeout loading homepage'
-            await context.close()
-            return result
         except Exception as e:
             result['error'] = f'Error loading homepage: {str(e)}'
-            await context.close()
+            lease_failed = True
+        else:
+            if response is not None and response.status >= 400:
+                # Error pages and bot walls often still carry the site's own
+                # scripts and links: keep scanning, let the status drive retries
+                result["http_status"] = response.status
+        if proxies is not None and lease.proxy:
+            blocked = result.get("http_status") in PROXY_BLOCK_STATUSES
+            proxy_failed = classify_failure(result['error']) in ("timeout", "connection", "tls")
+            proxies.report(lease.proxy, time.time() - nav_started,
+                           ok=not (blocked or proxy_failed), blocked=blocked)
+        if result['error']:
+            # Nothing to scan, but the DNS lookups are already under way — keep them
+            result["email_provider"] = await budget.run("mx", provider_task, default="not_detected")
+            dns_hits = await budget.run("dns", dns_task, default={})
+            _apply_dns_hits(result, dns_hits, tech_categories)
             return result
 
-        # Get HTML for analysis
-        html = await page.content()
+        # Snapshot the homepage once — every detector below reads from it
+        homepage = await harvest_page(page)
 
-        booking_result = await detect_booking_type(page, url)
+        booking_result = await detect_booking_type(homepage, url)
         result["booking_type"] = booking_result["booking_type"]
         result["booking_vendor"] = booking_result["booking_vendor"]
         result["booking_url"] = booking_result["booking_url"]
+        tracker.mark("booking", booking_result["booking_type"])
+        if booking_result["booking_vendor"] in BOOKING_IS_ALSO_PMS:
+            tracker.mark("pms_ehr", booking_result["booking_vendor"])   # inferred by infer_pms_booking
+        # Requests and cookies seen while the homepage loaded count as well
+        for category, name in network_hits:
+            tracker.mark(category, name)
+        for category, tools in cookie_hits.items():
+            tracker.mark(category, tools)
 
-        # Wait for DNS lookup to complete
-        result["email_provider"] = await provider_task
+        # Wait for DNS lookups to complete
+        result["email_provider"] = await budget.run("mx", provider_task, default="not_detected")
+        dns_hits = await budget.run("dns", dns_task, default={})
+        _apply_dns_hits(result, dns_hits, [])
 
         # Detect tech stack (homepage + up to 4 subpages: /contact, /book, /about, /services)
         # Store page texts during detect_tech_stack for reuse by billing/home visits/team count
-        page_cache = {}  # url -> (html, page_text)
-        tech_stack = await detect_tech_stack(page, context, url, initial_response=response, page_cache=page_cache)
+        page_cache = {}  # url -> PageSnapshot
+        tech_stack = await detect_tech_stack(
+            page, context, url, initial_response=response, page_cache=page_cache,
+            homepage=homepage, probe=probe, discovery=discovery, tracker=tracker, budget=budget,
+            dns_hits=dns_hits, http_session=http_session, timeout_scale=timeout_scale,
+        )
         for k, v in tech_stack.items():
             result[k] = v
 
@@ -1987,69 +1658,56 @@ async def scrape_clinic(browser, url: str) -> Dict:
                         result[category] = current + f", {name}"
 
         # Check for home visits
-        result["home_visits"] = "yes" if check_home_visits(html) else "no"
+        result["home_visits"] = "yes" if check_home_visits(homepage) else "no"
 
         # Also check services page for home visits (use cache if detect_tech_stack already visited)
         if result["home_visits"] == "no":
-            for cached_url, (cached_html, _) in page_cache.items():
-                if check_home_visits(cached_html):
+            for cached in page_cache.values():
+                if check_home_visits(cached):
                     result["home_visits"] = "yes"
                     break
 
-        # Detect billing type (homepage first, use cache if available)
-        if url in page_cache:
-            _, page_text_billing = page_cache[url]
-            html_billing = page_cache[url][0]
-        else:
-            try:
-                page_text_billing = await page.inner_text('body')
-            except Exception:
-                page_text_billing = ""
-            html_billing = html
-        result["billing_type"] = detect_billing_type(page_text_billing, html_billing)
+        # Detect billing type (homepage first)
+        result["billing_type"] = detect_billing_type(homepage)
+        tracker.mark("billing_type", result["billing_type"])
 
         # If not detected, check fee-related subpages (use cache first if available)
-        if result["billing_type"] == "not_detected":
-            fee_urls = [
+        async def check_fee_pages():
+            fee_urls = await _discovered_or_guessed(discovery, "fees", homepage, 5, [
                 urljoin(url, '/fees'),
                 urljoin(url, '/fee-schedule'),
                 urljoin(url, '/pricing'),
                 urljoin(url, '/costs'),
                 urljoin(url, '/billing'),
-            ]
+            ])
+            fee_urls = await probe.filter(fee_urls)
             for fee_url in fee_urls:
                 if fee_url in page_cache:
-                    fee_html, fee_text = page_cache[fee_url]
-                    billing = detect_billing_type(fee_text, fee_html)
+                    billing = detect_billing_type(page_cache[fee_url])
                 else:
                     try:
-                        await page.goto(fee_url, timeout=10000, wait_until='domcontentloaded')
+                        await page.goto(fee_url, timeout=budget.timeout_ms(int(10000 * timeout_scale), "fees"), wait_until='domcontentloaded')
                         await page.wait_for_timeout(400)
-                        fee_html = await page.content()
-                        fee_text = await page.inner_text('body')
-                        page_cache[fee_url] = (fee_html, fee_text)
-                        billing = detect_billing_type(fee_text, fee_html)
+                        fee_page = PageSnapshot(fee_url, await page.content(), await page.inner_text('body'))
+                        page_cache[fee_url] = fee_page
+                        billing = detect_billing_type(fee_page)
                     except Exception:
                         continue
                 if billing != "not_detected":
                     result["billing_type"] = billing
+                    tracker.mark("billing_type", billing)
                     break
 
+        if result["billing_type"] == "not_detected" and tracker.should_visit("fee_pages"):
+            await budget.run("fees", check_fee_pages())
+
         # Extract social media (from homepage HTML)
-        social = extract_social_media(html)
+        social = extract_social_media(homepage)
         result["instagram"] = social["instagram"]
         result["whatsapp"] = social["whatsapp"]
 
-        # Reuse cached homepage — no extra navigation needed
-        if url in page_cache:
-            html, page_text = page_cache[url]
-        else:
-            try:
-                html = await page.content()
-                page_text = await page.inner_text('body')
-            except Exception:
-                html, page_text = "", ""
-        text_hits = scan_visible_text_for_tech(page_text)
+        # Reuse the homepage snapshot — no extra navigation needed
+        text_hits = scan_visible_text_for_tech(homepage.text)
         for category, tools in text_hits.items():
             for name in tools:
                 current = result.get(category, "not_detected")
@@ -2057,7 +1715,7 @@ async def scrape_clinic(browser, url: str) -> Dict:
                     result[category] = name
                 elif name not in current:
                     result[category] = current + f", {name}"
-        result['emails'] = extract_all_emails(page_text, html)
+        result['emails'] = extract_all_emails(homepage.text, homepage.html)
 
         # Secondary email provider detection from contact addresses (Gmail direct, etc.)
         direct_provider = detect_email_provider_from_addresses(result.get("emails", []))
@@ -2072,19 +1730,32 @@ async def scrape_clinic(browser, url: str) -> Dict:
             result["email_provider"] = result["email_provider"].replace(", Gmail (direct)", "").replace("Gmail (direct), ", "")
 
         # Count practitioners (navigates to team page if found; uses cache for /about, /team, etc.)
-        result['practitioner_count'] = await count_team_members(page, page_cache=page_cache)
+        if tracker.should_visit("team_pages"):
+            counted = {}
+            count = await budget.run("team", count_team_members(
+                page, homepage, page_cache=page_cache, probe=probe, discovery=discovery,
+                counted=counted, budget=budget, timeout_scale=timeout_scale,
+            ), default=None)
+            # Cut short: keep the best count from the team pages already read
+            result['practitioner_count'] = count if count is not None else counted.get("best", 0)
+            tracker.mark("practitioner_count", result['practitioner_count'])
 
         # Cross-infer PMS ↔ booking and stamp source fields
         result = infer_pms_booking(result)
 
+    except asyncio.CancelledError:
+        lease_failed = True   # per-clinic timeout: context state unknown, recycle it
+        raise
     except Exception as e:
         result['error'] = f'Unexpected error: {str(e)}'
         print(f"  ❌ Error: {e}")
+        lease_failed = True
     finally:
-        try:
-            await context.close()
-        except Exception:
-            pass  # Context was already closed by a navigation/crash — safe to ignore
+        await pool.release(lease, failed=lease_failed)
+        discovery.cancel()
+        result["skipped_stages"] = tracker.skipped
+        result["cut_stages"] = budget.cut
+        result["browser_lost"] = lease.lost
 
     # Infer additional tools from co-occurrence patterns (runs after infer_pms_booking)
     result = apply_co_occurrence_rules(result)
@@ -2098,160 +1769,735 @@ async def scrape_clinic(browser, url: str) -> Dict:
     return result
 
 
-async def main():
-    SHEET_KEY_OR_URL = 'https://docs.google.com/spreadsheets/d/1y9zzp1J1Fn60UKYN0RkTsSQcHcMb1mi2cD4NH8OfAF4/edit?usp=sharing'
-    SERVICE_ACCOUNT_FILE = 'yoluko-frontdesk-3d208271a3c0.json'
+SHEET_KEY_OR_URL = 'https://docs.google.com/spreadsheets/d/1y9zzp1J1Fn60UKYN0RkTsSQcHcMb1mi2cD4NH8OfAF4/edit?usp=sharing'
+SERVICE_ACCOUNT_FILE = 'yoluko-frontdesk-3d208271a3c0.json'
+
+CONCURRENCY = 5        # ← in-flight clinics per browser (3 is safe, 5 is pushing it)
+MAX_CONCURRENCY = 12   # ceiling for the adaptive limit in main() (starts at CONCURRENCY)
+MAX_RSS_MB = 6000      # back off when this process grows past it
+CLINIC_TIMEOUT = 60    # seconds per clinic before it is abandoned outright
+CLINIC_BUDGET = 50     # deadline budget inside scrape_clinic: stages are cut, the row is kept
+CRASH_RETRIES = 2      # re-runs of a clinic whose browser died under it
+
+# Failures worth one more try. They are not written during the main pass but
+# deferred to a slower retry pass at the end of the run (see main()).
+RETRYABLE_FAILURES = {"timeout", "dns", "tls", "connection", "crash", "http_4xx", "http_5xx"}
+PERMANENT_HTTP_STATUSES = {404, 410}
+RETRY_CONCURRENCY = 2       # clinics in flight during the retry pass
+RETRY_TIMEOUT_SCALE = 2.0   # retry pass: clinic timeout, budget and navigation timeouts × this
+
+BROWSER_RECYCLE_AFTER = 300     # fresh Chromium after this many clinics...
+BROWSER_MAX_MEMORY_MB = 4000    # ...or once the browser process tree grows past this
+
+SKIP_URL_PATTERNS = [
+    "health.qld.gov.au",
+    "health.nsw.gov.au",
+    "health.vic.gov.au",
+    "health.wa.gov.au",
+    "health.sa.gov.au",
+    ".gov.au",          # all gov sites — huge, no booking stack
+    "facebook.com",
+    "linkedin.com",
+]
+
+
+def _clinic_browser(playwright, size: int, warm: int = None) -> BrowserSupervisor:
+    """
+    Supervised Chromium + context pool used by every runner below. Contexts go
+    out through the PROXY_URLS proxies when that variable is set (env or .env).
+    """
+    return BrowserSupervisor(
+        playwright, pool_size=size, warm=warm,
+        recycle_after=BROWSER_RECYCLE_AFTER, max_memory_mb=BROWSER_MAX_MEMORY_MB,
+        proxies=ProxyPool.from_env(),
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    )
+
+
+def _record_browser_stats(stats: dict, supervisor: BrowserSupervisor) -> dict:
+    stats["contexts_created"] = supervisor.created
+    stats["contexts_recycled"] = supervisor.recycled
+    stats["browser_relaunches"] = supervisor.relaunches
+    stats["browser_crashes"] = supervisor.crashes
+    if supervisor.proxies is not None:
+        stats["proxies"] = supervisor.proxies.summary()
+    stats["http_opened"], stats["http_reused"] = HTTP.opened, HTTP.reused
+    stats["http_dns_hits"], stats["http_dns_misses"] = HTTP.dns_hits, HTTP.dns_misses
+    stats["js_cached"] = SCRIPT_SCAN_CACHE.memory_hits + SCRIPT_SCAN_CACHE.disk_hits
+    stats["js_revalidated"] = SCRIPT_SCAN_CACHE.revalidated
+    stats["js_fetched"] = SCRIPT_SCAN_CACHE.fetched
+    stats["dns_cache_hits"], stats["dns_cache_misses"] = DNS_CACHE.hits, DNS_CACHE.misses
+    return stats
+
+
+def _cut_note(result: dict) -> str:
+    cut = result.get("cut_stages")
+    return f"Partial — out of time in: {', '.join(cut)}" if cut else ""
+
+
+def _error_log(result: dict) -> str:
+    """Column V: the error, else what a successful scan should still flag."""
+    if result.get("error"):
+        retried = result.get("retried_after")
+        return f"{result['error']} (retried after {retried})" if retried else result["error"]
+    notes = [_cut_note(result)]
+    if result.get("http_status"):
+        notes.insert(0, f"HTTP {result['http_status']} on homepage (scanned anyway)")
+    if result.get("retried_after"):
+        notes.append(f"retried after {result['retried_after']}")
+    return "; ".join(filter(None, notes))
+
+
+def _sheet_row_values(result: dict, tech_cats: list) -> list:
+    """One clinic result as the B→X row written to the sheet."""
+    tech_vals = [result.get(cat, "not_detected") for cat in tech_cats]
+    return [
+        result.get("email_provider", "not_detected"),
+        *tech_vals,
+        result.get("booking_type", "not_detected"),
+        result.get("booking_vendor", "") or "not_detected",
+        ", ".join(result.get("emails", [])),
+        str(result.get("practitioner_count", 0)),
+        result.get("home_visits", "no"),
+        result.get("billing_type", "not_detected"),
+        result.get("instagram", "no"),
+        result.get("whatsapp", "no"),
+        get_current_timestamp(),          # U = scraping_date
+        _error_log(result),               # V = error_log
+        result.get("signature_version", SIGNATURE_VERSION),  # W = signature_version
+        # X = crawl_policy; blank for full runs and rows that never reached scrape_clinic
+        "" if result.get("crawl_policy", "full") == "full" else result["crawl_policy"],
+    ]
 
-    CONCURRENCY = 5  # ← tune this (3 is safe, 5 is pushing it)
+
+def _row_update(row_num: int, result: dict, tech_cats: list) -> tuple:
+    """(range, rows) writing one clinic's B→X cells — a SheetWriter.put / batch entry."""
+    return f"B{row_num}:X{row_num}", [_sheet_row_values(result, tech_cats)]
+
+
+def _policy_covers(done: str, wanted: str) -> bool:
+    """True if a row crawled under policy `done` already has every field `wanted` needs."""
+    done_fields, wanted_fields = CRAWL_POLICIES.get(done or "full"), CRAWL_POLICIES[wanted]
+    if done_fields is None:
+        return True
+    return wanted_fields is not None and wanted_fields <= done_fields
+
+
+def _pending_rows(all_values: list, stats: dict, crawl_policy: str = DEFAULT_CRAWL_POLICY) -> list:
+    """
+    (row_num, url) for every sheet row not scraped yet (column T empty), plus
+    rows an earlier, narrower policy pass left incomplete (column X), so a
+    `booking_pms` first pass can be followed by a full one.
+    """
+    rows = []
+    for row_idx in range(1, len(all_values)):
+        row_num = row_idx + 1
+        row_data = all_values[row_idx]
+
+        url = row_data[0].strip() if row_data else ""
+        if not url:
+            stats["skipped"] += 1
+            continue
+
+        scraping_date = row_data[19].strip() if len(row_data) > 19 else ""
+        done_policy = row_data[23].strip() if len(row_data) > 23 else ""
+        if scraping_date and not _policy_covers(done_policy, crawl_policy):
+            print(f"Row {row_num}: re-crawl ({url}) — last pass used policy {done_policy}")
+        elif scraping_date:
+            print(f"Row {row_num}: skip ({url}) — already scraped")
+            stats["skipped"] += 1
+            continue
+
+        if not url.startswith(("http://", "https://")):
+            url = "https://" + url
+
+        rows.append((row_num, url))
+    return rows
+
+
+async def run_clinic(pool, row_num: int, url: str, crawl_policy: str,
+                     timeout_scale: float = 1.0) -> dict:
+    """
+    Scrape one sheet row end to end and return the result to write.
+    Never raises: skips, timeouts and crashes come back as results with
+    `error` set ("skipped": True marks gov/social rows). A clinic whose
+    browser crashed under it is re-run up to CRASH_RETRIES times.
+    timeout_scale stretches the clinic timeout, budget and navigation timeouts.
+    """
+    print(f"\n{'='*60}")
+    print(f"▶ Row {row_num}: {url}")
+    print(f"{'='*60}")
+
+    if any(pattern in url for pattern in SKIP_URL_PATTERNS):
+        print(f"⏭️  Row {row_num} SKIPPED — gov/social URL: {url}")
+        # Still written with a scraping_date so it won't be retried
+        return {"error": "Skipped — gov/social domain", "skipped": True}
+
+    timeout = CLINIC_TIMEOUT * timeout_scale
+    for attempt in range(CRASH_RETRIES + 1):
+        try:
+            result = await asyncio.wait_for(
+                scrape_clinic(pool, url, crawl_policy, budget_seconds=CLINIC_BUDGET * timeout_scale,
+                              timeout_scale=timeout_scale),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"⏱️  Row {row_num} TIMEOUT (>{timeout:.0f}s) — moving on")
+            return {"error": f"Skipped — exceeded {timeout:.0f}s timeout", "url": url}
+        except Exception as e:
+            print(f"❌ Row {row_num} crashed: {e}")
+            return {"error": f"Worker error: {str(e)}"}
+        if not result.pop("browser_lost", False) or attempt == CRASH_RETRIES:
+            return result
+        print(f"🔁 Row {row_num}: browser died mid-scrape — re-running on the relaunched browser")
+    return result
+
+
+def _retryable_failure(result: dict) -> str:
+    """Failure class if this result deserves a place in the retry pass, else ""."""
+    if result.get("skipped") or result.get("http_status") in PERMANENT_HTTP_STATUSES:
+        return ""
+    failure = classify_failure(result.get("error"))
+    if failure is None and result.get("http_status", 0) >= 400:
+        failure = f"http_{str(result['http_status'])[0]}xx"
+    return failure if failure in RETRYABLE_FAILURES else ""
+
+
+def _result_rank(result: dict) -> int:
+    """0 clean, 1 scanned despite a homepage HTTP error, 2 failed."""
+    if result.get("error"):
+        return 2
+    return 1 if result.get("http_status", 0) >= 400 else 0
+
+
+def _settle_retry(stats: dict, first: dict, retry: dict, failure: str) -> dict:
+    """
+    The result to write for a deferred clinic: the retry if it came back
+    cleaner than the first pass, else the first-pass result (which may hold a
+    full scan of an error page). Anything short of clean is marked as retried.
+    first is None for a clinic whose first pass never reported (its shard died).
+    """
+    better = first is None or _result_rank(retry) < _result_rank(first)
+    result = retry if better else first
+    if _result_rank(result):
+        result["retried_after"] = failure
+    elif better:
+        stats["recovered"] += 1
+    return result
+
+
+def _record_result(stats: dict, row_num: int, result: dict) -> None:
+    if result.get("skipped"):
+        stats["skipped"] += 1
+        return
+    stats["stages_skipped"] += len(result.get("skipped_stages", []))
+    stats["stages_cut"] += len(result.get("cut_stages", []))
+    if result.get("error"):
+        stats["errors"] += 1
+        print(f"❌ Row {row_num} ERROR: {result['error']}")
+    else:
+        stats["processed"] += 1
+        _print_tech_summary(result)
+        print(f"✅ Row {row_num} done")
+
+
+def _print_run_summary(stats: dict, start_time: float) -> None:
+    elapsed = time.time() - start_time
+    total_done = stats["processed"] + stats["errors"]
+    avg = elapsed / total_done if total_done else 0
+
+    print(f"\n{'='*60}")
+    print(f"✅ Processed: {stats['processed']}")
+    print(f"⏭️  Skipped:   {stats['skipped']}")
+    print(f"❌ Errors:    {stats['errors']}")
+    print(f"⏩ Stages skipped (early exit): {stats['stages_skipped']}")
+    print(f"⏳ Stages cut (out of budget):  {stats['stages_cut']}")
+    print(f"♻️  Contexts: {stats['contexts_created']} created, {stats['contexts_recycled']} recycled")
+    print(f"🧭 Browser:  {stats['browser_relaunches']} relaunches ({stats['browser_crashes']} after crashes)")
+    if stats["lost"]:
+        print(f"🔥 Lost with crashed shards: {stats['lost']} (re-run in the retry pass)")
+    if stats["deferred"]:
+        print(f"🔁 Retry pass: {stats['recovered']}/{stats['deferred']} recovered")
+    if stats.get("proxies"):
+        print(f"🌐 Proxies:  {stats['proxies']}")
+    print(f"🔌 HTTP:     {stats['http_opened']} connections opened, {stats['http_reused']} reused; "
+          f"DNS cache {stats['http_dns_hits']} hits / {stats['http_dns_misses']} misses")
+    print(f"📜 Scripts:  {stats['js_cached']} scans from cache, {stats['js_revalidated']} revalidated, "
+          f"{stats['js_fetched']} fetched")
+    print(f"📇 DNS:      {stats['dns_cache_hits']} lookups from cache, {stats['dns_cache_misses']} queried")
+    if stats.get("sheets"):
+        print(f"📝 Sheet:    {stats['sheets']}")
+    if stats.get("concurrency"):
+        print(f"🎚️  Concurrency: {stats['concurrency']}")
+    print(f"⏱️  Avg/clinic: {avg:.1f}s  |  Total: {elapsed:.0f}s")
+    print(f"{'='*60}")
+
+
+def _new_stats() -> dict:
+    return {"processed": 0, "skipped": 0, "errors": 0, "stages_skipped": 0, "stages_cut": 0,
+            "contexts_created": 0, "contexts_recycled": 0,
+            "browser_relaunches": 0, "browser_crashes": 0, "deferred": 0, "recovered": 0, "lost": 0,
+            "http_opened": 0, "http_reused": 0, "http_dns_hits": 0, "http_dns_misses": 0,
+            "js_cached": 0, "js_revalidated": 0, "js_fetched": 0,
+            "dns_cache_hits": 0, "dns_cache_misses": 0}
+
+
+def _open_sheet(crawl_policy: str):
+    """Validate the policy and open the sheet: (worksheet, all_values, tech_cats) or None."""
+    if crawl_policy not in CRAWL_POLICIES:
+        print(f"Unknown crawl policy '{crawl_policy}' — choose from: {', '.join(CRAWL_POLICIES)}")
+        return None
 
     worksheet = init_google_sheets(SHEET_KEY_OR_URL, SERVICE_ACCOUNT_FILE, worksheet_name='main_clinics')
     all_values = worksheet.get_all_values()
 
     if len(all_values) < 2:
         print("No data rows found")
-        return
+        return None
+
+    tech_cats = _get_tech_cats_for_sheet()
+    _ensure_sheet_headers(worksheet, tech_cats)
+    return worksheet, all_values, tech_cats
 
-    tech_cats_output = _get_tech_cats_for_sheet()
-    _ensure_sheet_headers(worksheet, tech_cats_output)
+
+async def main(crawl_policy: str = DEFAULT_CRAWL_POLICY):
+    opened = _open_sheet(crawl_policy)
+    if opened is None:
+        return
+    worksheet, all_values, tech_cats_output = opened
 
     # Shared state
-    semaphore = asyncio.Semaphore(CONCURRENCY)
-    sheets_lock = asyncio.Lock()         # ← serializes ALL gspread calls
-    stats = {"processed": 0, "skipped": 0, "errors": 0}
+    limiter = AdaptiveLimiter(
+        initial=CONCURRENCY, max_limit=MAX_CONCURRENCY, p90_latency=CLINIC_TIMEOUT / 2,
+        max_error_rate=0.5, max_rss_mb=MAX_RSS_MB,
+    )
+    writer = SheetWriter(worksheet)      # the only caller of gspread from here on
+    stats = _new_stats()
     start_time = time.time()
+    deferred = []                        # (row_num, url, failure class, first result) for the retry pass
+    retry_semaphore = asyncio.Semaphore(RETRY_CONCURRENCY)
+
+    def write_result(row_num: int, result: dict):
+        writer.put(*_row_update(row_num, result, tech_cats_output))   # buffered, never blocks
+        _record_result(stats, row_num, result)
 
     # ----------------------------------------------------------------
-    # Helper: all sheet writes go through this lock
+    # Worker: scrape one clinic + queue its row for the batch writer.
+    # Retryable failures are not written yet: they go to the retry pass.
     # ----------------------------------------------------------------
-    async def write_to_sheet(row_num: int, result: dict, tech_cats: list):
-        timestamp = get_current_timestamp()
-        tech_vals = [result.get(cat, "not_detected") for cat in tech_cats]
-
-        full_row_values = [
-            result.get("email_provider", "not_detected"),
-            *tech_vals,
-            result.get("booking_type", "not_detected"),
-            result.get("booking_vendor", "") or "not_detected",
-            ", ".join(result.get("emails", [])),
-            str(result.get("practitioner_count", 0)),
-            result.get("home_visits", "no"),
-            result.get("billing_type", "not_detected"),
-            result.get("instagram", "no"),
-            result.get("whatsapp", "no"),
-            timestamp,                        # U = scraping_date
-            result.get("error", "") or "",    # V = error_log
-        ]
+    async def process_clinic(pool, row_num: int, url: str):
+        async with limiter.slot():
+            started = time.time()
+            result = await run_clinic(pool, row_num, url, crawl_policy)
+            if not result.get("skipped"):
+                error = (result.get("error") or "").lower()
+                await limiter.record(time.time() - started, ok=not error,
+                                     timeout="timeout" in error or bool(result.get("cut_stages")))
+            failure = _retryable_failure(result)
+            if failure:
+                deferred.append((row_num, url, failure, result))
+                print(f"↪️  Row {row_num}: {failure} — deferred to the retry pass")
+            else:
+                write_result(row_num, result)
 
-        async with sheets_lock:
-            # Single API call — batch everything B→V
-            await asyncio.get_running_loop().run_in_executor(
-                None,
-                lambda: worksheet.update([full_row_values], f"B{row_num}:V{row_num}")
-            )
+            # Small per-clinic delay INSIDE the worker (not blocking others)
+            await asyncio.sleep(random.uniform(1, 3))
 
     # ----------------------------------------------------------------
-    # Worker: scrape one clinic + write results
+    # Retry pass: deferred clinics, fewer at a time, with longer timeouts,
+    # so slow or flaky sites never hold slots during the fast pass
     # ----------------------------------------------------------------
-    async def process_clinic(browser, row_num: int, url: str):
-        async with semaphore:
-            print(f"\n{'='*60}")
-            print(f"▶ Row {row_num}: {url}")
-            print(f"{'='*60}")
-
-            SKIP_URL_PATTERNS = [
-                "health.qld.gov.au",
-                "health.nsw.gov.au",
-                "health.vic.gov.au",
-                "health.wa.gov.au",
-                "health.sa.gov.au",
-                ".gov.au",          # all gov sites — huge, no booking stack
-                "facebook.com",
-                "linkedin.com",
-            ]
-
-            if any(pattern in url for pattern in SKIP_URL_PATTERNS):
-                print(f"⏭️  Row {row_num} SKIPPED — gov/social URL: {url}")
-                stats["skipped"] += 1
-                # Still write a scraping_date so it won't be retried
-                await write_to_sheet(row_num, {"error": "Skipped — gov/social domain"}, tech_cats_output)
-                return
-
-            try:
-                try:
-                    result = await asyncio.wait_for(scrape_clinic(browser, url), timeout=60)
-                except asyncio.TimeoutError:
-                    result = {"error": "Skipped — exceeded 60s timeout", "url": url}
-                    print(f"⏱️  Row {row_num} TIMEOUT (>60s) — moving on")
-                await write_to_sheet(row_num, result, tech_cats_output)
-
-                if result.get("error"):
-                    stats["errors"] += 1
-                    print(f"❌ Row {row_num} ERROR: {result['error']}")
-                else:
-                    stats["processed"] += 1
-                    _print_tech_summary(result)
-                    print(f"✅ Row {row_num} done")
-
-            except Exception as e:
-                stats["errors"] += 1
-                error_result = {"error": f"Worker error: {str(e)}"}
-                await write_to_sheet(row_num, error_result, tech_cats_output)
-                print(f"❌ Row {row_num} crashed: {e}")
-
-            # Small per-clinic delay INSIDE the worker (not blocking others)
+    async def retry_clinic(pool, row_num: int, url: str, failure: str, first: dict):
+        async with retry_semaphore:
+            retry = await run_clinic(pool, row_num, url, crawl_policy, timeout_scale=RETRY_TIMEOUT_SCALE)
+            write_result(row_num, _settle_retry(stats, first, retry, failure))
             await asyncio.sleep(random.uniform(1, 3))
 
     # ----------------------------------------------------------------
     # Build task list (skip already-scraped rows)
     # ----------------------------------------------------------------
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
+        pool = _clinic_browser(p, MAX_CONCURRENCY, warm=CONCURRENCY)
+        await pool.start()
+
+        tasks = [process_clinic(pool, row_num, url) for row_num, url in _pending_rows(all_values, stats, crawl_policy)]
+
+        print(f"\n🚀 Starting {len(tasks)} clinics with adaptive concurrency "
+              f"{CONCURRENCY}→≤{MAX_CONCURRENCY}, policy={crawl_policy}\n")
+
+        limiter.start()
+        writer.start()
+        try:
+            await asyncio.gather(*tasks)
+            if deferred:
+                stats["deferred"] = len(deferred)
+                by_class = {}
+                for _, _, failure, _ in deferred:
+                    by_class[failure] = by_class.get(failure, 0) + 1
+                print(f"\n🔁 Retry pass: {len(deferred)} clinics "
+                      f"({', '.join(f'{k} {v}' for k, v in sorted(by_class.items()))}), "
+                      f"concurrency={RETRY_CONCURRENCY}, timeouts ×{RETRY_TIMEOUT_SCALE:g}\n")
+                await asyncio.gather(*(retry_clinic(pool, *row) for row in deferred))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Deferred rows that were never written keep an empty scraping_date,
+            # so the next run picks them up again
+            print("\n⏹️  Interrupted")
+        finally:
+            limiter.stop()
+            await writer.close()             # rows already finished are written even on Ctrl-C
+            stats["concurrency"] = limiter.summary()
+            stats["sheets"] = writer.summary()
+            _record_browser_stats(stats, pool)
+            await pool.close()
+            await HTTP.close()
+            SCRIPT_SCAN_CACHE.close()
+            DNS_CACHE.close()
+
+    _print_run_summary(stats, start_time)
+
+
+# -----------------------------------------------------------------------------
+# Sharded runner: N worker processes (own browser + event loop each) fed from
+# one job queue; the parent is the single collector that owns all sheet writes
+# -----------------------------------------------------------------------------
+
+SHARD_POLL_INTERVAL = 5   # seconds between collector liveness checks
+
+
+async def _retry_deferred(deferred: list, crawl_policy: str, stats: dict, write) -> None:
+    """
+    Slow second pass over deferred (row_num, url, failure, first result) rows
+    in a fresh browser: RETRY_CONCURRENCY at a time, timeouts × RETRY_TIMEOUT_SCALE.
+    write(row_num, result) gets the settled result of every row.
+    """
+    semaphore = asyncio.Semaphore(RETRY_CONCURRENCY)
+
+    async with async_playwright() as p:
+        pool = _clinic_browser(p, RETRY_CONCURRENCY)
+        await pool.start()
+
+        async def retry_clinic(row_num: int, url: str, failure: str, first: dict):
+            async with semaphore:
+                retry = await run_clinic(pool, row_num, url, crawl_policy, timeout_scale=RETRY_TIMEOUT_SCALE)
+                write(row_num, _settle_retry(stats, first, retry, failure))
+                await asyncio.sleep(random.uniform(1, 3))
+
+        try:
+            await asyncio.gather(*(retry_clinic(*row) for row in deferred))
+        finally:
+            await pool.close()
+            await HTTP.close()
+            SCRIPT_SCAN_CACHE.close()
+            DNS_CACHE.close()
+
+
+async def _shard_main(shard_id: int, crawl_policy: str, concurrency: int, jobs, results) -> None:
+    loop = asyncio.get_running_loop()
+
+    async with async_playwright() as p:
+        pool = _clinic_browser(p, concurrency)
+        await pool.start()
+
+        async def consume():
+            while True:
+                job = await loop.run_in_executor(None, jobs.get)
+                if job is None:          # one sentinel per consumer
+                    return
+                row_num, url = job
+                result = await run_clinic(pool, row_num, url, crawl_policy)
+                results.put(("result", row_num, result))
+                await asyncio.sleep(random.uniform(1, 3))
+
+        try:
+            await asyncio.gather(*(consume() for _ in range(concurrency)))
+        finally:
+            counts = _record_browser_stats({}, pool)
+            await pool.close()
+            await HTTP.close()
+            SCRIPT_SCAN_CACHE.close()
+            DNS_CACHE.close()
+            results.put(("done", shard_id, counts))
+
+
+def _shard_worker(shard_id: int, crawl_policy: str, concurrency: int, jobs, results) -> None:
+    """Process entry point (module-level so the spawn start method can import it)."""
+    try:
+        asyncio.run(_shard_main(shard_id, crawl_policy, concurrency, jobs, results))
+    except KeyboardInterrupt:
+        pass
+
 
-        tasks = []
-        for row_idx in range(1, len(all_values)):
-            row_num = row_idx + 1
-            row_data = all_values[row_idx]
+def main_sharded(crawl_policy: str = DEFAULT_CRAWL_POLICY, shards: int = None,
+                 concurrency: int = CONCURRENCY) -> None:
+    """
+    Spread the crawl over `shards` processes (default: one per CPU core), each
+    running `concurrency` clinics. Workers only scrape; results are streamed
+    back here and written to the sheet one row at a time. Retryable failures
+    are held back and re-run here, slowly, once every shard has finished.
+    """
+    opened = _open_sheet(crawl_policy)
+    if opened is None:
+        return
+    worksheet, all_values, tech_cats_output = opened
 
-            url = row_data[0].strip() if row_data else ""
-            if not url:
-                stats["skipped"] += 1
+    shards = shards or os.cpu_count() or 1
+    stats = _new_stats()
+    stats["sheet_rows"] = 0
+    start_time = time.time()
+
+    rows = _pending_rows(all_values, stats, crawl_policy)
+    row_urls = dict(rows)
+    ctx = multiprocessing.get_context("spawn")
+    jobs, results = ctx.Queue(), ctx.Queue()
+    for row in rows:
+        jobs.put(row)
+    for _ in range(shards * concurrency):
+        jobs.put(None)
+
+    print(f"\n🚀 Starting {len(rows)} clinics on {shards} shards × concurrency={concurrency}, policy={crawl_policy}\n")
+
+    workers = [
+        ctx.Process(target=_shard_worker, args=(i, crawl_policy, concurrency, jobs, results), daemon=True)
+        for i in range(shards)
+    ]
+    for w in workers:
+        w.start()
+
+    finished = set()
+    received = set()             # row numbers a shard reported back
+    deferred = []                # (row_num, url, failure class, first result) for the retry pass
+    updates = {}                 # range -> rows, flushed in batches (coalesced per row)
+    flushed_at = time.time()
+
+    def flush():
+        nonlocal updates, flushed_at
+        if updates:
+            try:
+                sheet_batch_update(worksheet, updates)
+                stats["sheet_rows"] += len(updates)
+            except Exception as e:
+                print(f"❌ Sheet batch of {len(updates)} rows failed: {e}")
+        updates, flushed_at = {}, time.time()
+
+    def write(row_num: int, result: dict):
+        range_name, rows = _row_update(row_num, result, tech_cats_output)
+        updates[range_name] = rows
+        _record_result(stats, row_num, result)
+        if len(updates) >= SHEET_BATCH_ROWS or time.time() - flushed_at >= SHEET_FLUSH_INTERVAL:
+            flush()
+
+    try:
+        while len(finished) < shards:
+            if len(updates) >= SHEET_BATCH_ROWS or time.time() - flushed_at >= SHEET_FLUSH_INTERVAL:
+                flush()
+            try:
+                message = results.get(timeout=SHARD_POLL_INTERVAL)
+            except queue.Empty:
+                crashed = [i for i, w in enumerate(workers) if not w.is_alive() and i not in finished]
+                for i in crashed:
+                    print(f"🔥 Shard {i} exited without reporting (code {workers[i].exitcode})")
+                    finished.add(i)
                 continue
 
-            scraping_date = row_data[19].strip() if len(row_data) > 19 else ""
-            if scraping_date:
-                print(f"Row {row_num}: skip ({url}) — already scraped")
-                stats["skipped"] += 1
+            if message[0] == "done":
+                _, shard_id, counts = message
+                finished.add(shard_id)
+                for key, value in counts.items():
+                    if isinstance(value, str):      # per-shard summaries, e.g. proxies
+                        stats[key] = "; ".join(filter(None, (stats.get(key), value)))
+                    else:
+                        stats[key] += value
                 continue
 
-            if not url.startswith(("http://", "https://")):
-                url = "https://" + url
+            _, row_num, result = message
+            received.add(row_num)
+            failure = _retryable_failure(result)
+            if failure:
+                deferred.append((row_num, row_urls[row_num], failure, result))
+                print(f"↪️  Row {row_num}: {failure} — deferred to the retry pass")
+            else:
+                write(row_num, result)
+
+        # Rows a crashed shard had pulled (or that no shard was left to pull)
+        lost = [row_num for row_num in row_urls if row_num not in received]
+        if lost:
+            stats["lost"] = len(lost)
+            print(f"\n🔥 {len(lost)} rows never reported back (rows {', '.join(map(str, lost[:20]))}"
+                  f"{', …' if len(lost) > 20 else ''}) — added to the retry pass")
+            deferred.extend((row_num, row_urls[row_num], "shard_crash", None) for row_num in lost)
+
+        if deferred:
+            stats["deferred"] = len(deferred)
+            print(f"\n🔁 Retry pass: {len(deferred)} clinics, concurrency={RETRY_CONCURRENCY}, "
+                  f"timeouts ×{RETRY_TIMEOUT_SCALE:g}\n")
+            asyncio.run(_retry_deferred(deferred, crawl_policy, stats, write))
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted")
+        for w in workers:
+            w.terminate()
+    finally:
+        flush()                      # every row collected so far, also after Ctrl-C
+        for w in workers:
+            w.join(timeout=10)
+    stats["sheets"] = f"{stats.pop('sheet_rows', 0)} rows in batches of ≤{SHEET_BATCH_ROWS}"
+
+    _print_run_summary(stats, start_time)
 
-            tasks.append(process_clinic(browser, row_num, url))
 
-        print(f"\n🚀 Starting {len(tasks)} clinics with concurrency={CONCURRENCY}\n")
+# -----------------------------------------------------------------------------
+# Queued runner: rows are claimed from a shared lease-based job queue (see
+# jobqueue.py), so several machines can split the sheet and a killed worker's
+# rows are re-queued when their lease runs out
+# -----------------------------------------------------------------------------
 
+JOB_LEASE_SECONDS = max(DEFAULT_LEASE_SECONDS, CLINIC_TIMEOUT * 2)
+JOB_HEARTBEAT_INTERVAL = JOB_LEASE_SECONDS / 4
+JOB_IDLE_POLL = 10        # seconds to wait before re-claiming when the queue is empty
+JOB_IDLE_ROUNDS = 3       # empty claims in a row before a worker stops
+
+
+async def _heartbeat(job_queue, worker_id: str, job_id: str) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
         try:
-            await asyncio.gather(*tasks)
-        except (KeyboardInterrupt, asyncio.CancelledError):
-            print("\n⏹️  Interrupted")
+            held = await loop.run_in_executor(
+                None, job_queue.heartbeat, worker_id, job_id, JOB_LEASE_SECONDS
+            )
+        except Exception as e:
+            print(f"⚠️  Heartbeat for row {job_id} failed: {e}")
+            continue
+        if not held:
+            print(f"⚠️  Lease on row {job_id} lost — another worker may re-run it")
+            return
+
+
+async def main_queued(queue_spec: str, crawl_policy: str = DEFAULT_CRAWL_POLICY) -> None:
+    """
+    Crawl rows claimed from the job queue at queue_spec (a SQLite path or
+    tcp://host:port). Every machine seeds the queue with the sheet's unscraped
+    rows (idempotent: known rows keep their state), then its CONCURRENCY
+    workers claim, heartbeat, write and complete rows until the queue is drained.
+    A row whose sheet write fails is released for another attempt, and so is
+    a retryable failure (timeout, DNS, TLS, ...) while the job has attempts
+    left; re-claimed rows run with timeouts × RETRY_TIMEOUT_SCALE.
+    """
+    opened = _open_sheet(crawl_policy)
+    if opened is None:
+        return
+    worksheet, all_values, tech_cats_output = opened
+
+    job_queue = open_job_queue(queue_spec)
+    stats = _new_stats()
+    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    writer = SheetWriter(worksheet)
+    finishing = set()                    # jobs waiting for their row to be flushed
+    host = f"{socket.gethostname()}:{os.getpid()}"
+
+    # A narrower policy's jobs get their own ids, so a later full pass can queue the same rows again
+    suffix = "" if crawl_policy == "full" else f"@{crawl_policy}"
+    added = await loop.run_in_executor(
+        None, job_queue.enqueue,
+        [(f"{row_num}{suffix}", {"row": row_num, "url": url})
+         for row_num, url in _pending_rows(all_values, stats, crawl_policy)],
+    )
+    print(f"📮 Queued {added} new rows — queue: {await loop.run_in_executor(None, job_queue.counts)}")
+
+    async def worker(pool, worker_id: str):
+        idle = 0
+        while idle < JOB_IDLE_ROUNDS:
+            jobs = await loop.run_in_executor(None, job_queue.claim, worker_id, JOB_LEASE_SECONDS)
+            if not jobs:
+                idle += 1
+                await asyncio.sleep(JOB_IDLE_POLL)
+                continue
+            idle = 0
+            job = jobs[0]
+            row_num, url = job.payload["row"], job.payload["url"]
+
+            heartbeat = asyncio.create_task(_heartbeat(job_queue, worker_id, job.job_id))
+            try:
+                result = await run_clinic(pool, row_num, url, crawl_policy,
+                                          timeout_scale=RETRY_TIMEOUT_SCALE if job.attempts > 1 else 1.0)
+            finally:
+                heartbeat.cancel()
+
+            failure = _retryable_failure(result)
+            if failure and job.attempts < DEFAULT_MAX_ATTEMPTS:
+                # Not final yet: back to the queue, to be re-claimed for a slower attempt
+                print(f"↪️  Row {row_num}: {failure} — released for another attempt")
+                await loop.run_in_executor(None, job_queue.release, worker_id, job.job_id)
+                await asyncio.sleep(random.uniform(1, 3))
+                continue
+            if failure:
+                result["retried_after"] = failure
+
+            # The job completes once its row is flushed; the worker moves on meanwhile
+            task = asyncio.create_task(finish(
+                worker_id, job.job_id, row_num, result,
+                writer.put(*_row_update(row_num, result, tech_cats_output)),
+            ))
+            finishing.add(task)
+            task.add_done_callback(finishing.discard)
+            await asyncio.sleep(random.uniform(1, 3))
+
+    async def finish(worker_id: str, job_id: str, row_num: int, result: dict, written) -> None:
+        heartbeat = asyncio.create_task(_heartbeat(job_queue, worker_id, job_id))
+        try:
+            ok = await written
         finally:
-            await browser.close()
+            heartbeat.cancel()
+        if not ok:
+            print(f"❌ Row {row_num} sheet write failed, releasing")
+            await loop.run_in_executor(None, job_queue.release, worker_id, job_id)
+            return
+        if not await loop.run_in_executor(
+            None, job_queue.complete, worker_id, job_id, {"error": result.get("error")}
+        ):
+            print(f"⚠️  Row {row_num} written after its lease expired")
+        _record_result(stats, row_num, result)
 
-    # ----------------------------------------------------------------
-    # Summary
-    # ----------------------------------------------------------------
-    elapsed = time.time() - start_time
-    total_done = stats["processed"] + stats["errors"]
-    avg = elapsed / total_done if total_done else 0
+    async with async_playwright() as p:
+        pool = _clinic_browser(p, CONCURRENCY)
+        await pool.start()
 
-    print(f"\n{'='*60}")
-    print(f"✅ Processed: {stats['processed']}")
-    print(f"⏭️  Skipped:   {stats['skipped']}")
-    print(f"❌ Errors:    {stats['errors']}")
-    print(f"⏱️  Avg/clinic: {avg:.1f}s  |  Total: {elapsed:.0f}s")
-    print(f"{'='*60}")
+        print(f"\n🚀 Claiming rows from {queue_spec} with concurrency={CONCURRENCY}, policy={crawl_policy}\n")
+
+        writer.start()
+        try:
+            await asyncio.gather(*(worker(pool, f"{host}/{i}") for i in range(CONCURRENCY)))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("\n⏹️  Interrupted — unfinished leases will expire and be re-queued")
+        finally:
+            await writer.close()
+            await asyncio.gather(*finishing, return_exceptions=True)
+            stats["sheets"] = writer.summary()
+            _record_browser_stats(stats, pool)
+            await pool.close()
+            await HTTP.close()
+            SCRIPT_SCAN_CACHE.close()
+            DNS_CACHE.close()
 
+    print(f"📮 Queue: {await loop.run_in_executor(None, job_queue.counts)}")
+    _print_run_summary(stats, start_time)
 
-if __name__ == '__main__':
-    asyncio.run(main())
 
+if __name__ == '__main__':
+    # `python main_clinics.py [policy] [--shards N | --queue SPEC]`, e.g. `booking_pms` for a
+    # first pass; --shards 0 means one worker process per CPU core; --queue takes a SQLite
+    # path or tcp://host:port of a `python jobqueue.py serve` broker
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--shards", "--queue"):
+        if flag in args:
+            at = args.index(flag)
+            options[flag] = args[at + 1]
+            del args[at:at + 2]
+    policy = args[0] if args else DEFAULT_CRAWL_POLICY
+    if "--queue" in options:
+        asyncio.run(main_queued(options["--queue"], policy))
+    elif "--shards" in options:
+        main_sharded(policy, shards=int(options["--shards"]) or None)
+    else:
+        asyncio.run(main(policy))
@@ -7,19 +7,27 @@ social links, and contact info. Uses shared functions from core.py.
 import asyncio
 import random
 import re
+import time
 from typing import Dict, List, Optional
 from urllib.parse import urljoin, urlparse
 
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 from core import (
+    ContextPool,
+    ProxyPool,
+    PROXY_BLOCK_STATUSES,
     extract_email,
     extract_phone,
     get_company_name,
     get_current_timestamp,
+    harvest_page,
+    PageSnapshot,
+    SheetWriter,
 )
+from signatures import ECOM_TECH_SIGNATURES, ECOM_TECH_MATCHER, SIGNATURE_VERSION
 
 # -----------------------------------------------------------------------------
 # CONFIG & FINGERPRINTS
@@ -31,58 +39,6 @@ WORKSHEET_NAME = 'main_ecom'
 WORKSHEET_GID = 659638589  # Fallback if tab name differs
 SERVICE_ACCOUNT_FILE = 'yoluko-frontdesk-3d208271a3c0.json'
 
-# Tech Stack Signatures (HTML text search)
-TECH_SIGNATURES = {
-    'platform': {
-        'Shopify': ['cdn.shopify.com', 'Shopify.theme', 'shopify.com'],
-        'WooCommerce': ['wp-content/plugins/woocommerce', 'woocommerce-product-gallery'],
-        'BigCommerce': ['cdn11.bigcommerce.com', 'bigcommerce.com'],
-        'Magento': ['/static/version', 'mage/cookies'],
-        'Wix': ['wix.com', 'wix-thunderbolt'],
-        'Squarespace': ['squarespace.com', 'static1.squarespace.com'],
-    },
-    'email_marketing': {
-        'Klaviyo': ['klaviyo.js', 'klaviyo.com', '_learnq'],
-        'Mailchimp': ['chimpstatic.com', 'mailchimp.com', 'mc.js'],
-        'Omnisend': ['omnisend.com', 'omnisrc.com'],
-        'Privy': ['privy.com', 'privy-widget'],
-        'Sendlane': ['sendlane.com'],
-    },
-    'sms': {
-        'Postscript': ['postscript.io', 'sdk.postscript.io'],
-        'Attentive': ['attentivemobile.com', 'cdn.attn.tv'],
-        'SMSBump': ['smsbump.com', 'yotpo-sms'],
-        'Recart': ['recart.com'],
-    },
-    'subscriptions': {
-        'Recharge': ['rechargeapps.com', 'recharge-payments'],
-        'Skio': ['skio.com', 'skio-plan-picker'],
-        'Bold': ['boldapps.net', 'bold-common'],
-        'Smartrr': ['smartrr.com'],
-    },
-    'reviews': {
-        'Yotpo': ['staticw2.yotpo.com', 'yotpo-widgets'],
-        'Stamped': ['stamped.io', 'stamped-main-widget'],
-        'Loox': ['loox.io', 'loox-rating'],
-        'Judge.me': ['judge.me', 'judgeme_core'],
-        'Okendo': ['okendo.io', 'oke-reviews'],
-        'Junip': ['junip.co'],
-    },
-    'loyalty': {
-        'Smile.io': ['smile.io', 'smile-ui'],
-        'Yotpo Loyalty (Swell)': ['swell-rewards', 'yotpo-loyalty'],
-        'LoyaltyLion': ['loyaltylion.com', 'loyaltylion-sdk'],
-        'Rivo': ['rivo.io'],
-    },
-    'pixels': {
-        'Meta/FB': ['fbevents.js', 'fbq('],
-        'TikTok': ['ttq.load', 'analytics.tiktok.com'],
-        'GA4/GTM': ['googletagmanager.com', 'gtag(', 'ga('],
-        'Pinterest': ['pintrk('],
-        'Snapchat': ['snaptr('],
-    },
-}
-
 # -----------------------------------------------------------------------------
 # HELPER FUNCTIONS
 # -----------------------------------------------------------------------------
@@ -100,13 +56,11 @@ def detect_tech_stack(html: str) -> Dict[str, str]:
         'pixels': [],
     }
 
-    html_lower = html.lower()
+    hits = ECOM_TECH_MATCHER.match(html.lower())
 
-    for category, providers in TECH_SIGNATURES.items():
-        found = []
-        for provider_name, signatures in providers.items():
-            if any(sig.lower() in html_lower for sig in signatures):
-                found.append(provider_name)
+    for category, providers in ECOM_TECH_SIGNATURES.items():
+        # Keep table order: 'platform' takes the first provider found
+        found = [name for name in providers if (category, name) in hits]
 
         if found:
             if category == 'pixels':
@@ -132,23 +86,19 @@ def extract_specific_socials(html: str) -> Dict[str, str]:
     }
 
 
-async def find_contact_page(page: Page) -> Optional[str]:
-    """Find a Contact or About page URL from the homepage."""
+def find_contact_page(homepage: PageSnapshot) -> Optional[str]:
+    """Find a Contact or About page URL from the homepage's harvested links."""
     try:
         keywords = ['contact', 'about', 'support', 'help']
-        links = await page.query_selector_all('a[href]')
-
-        for link in links:
-            href = await link.get_attribute('href')
-            text = await link.inner_text()
 
+        for href, text in homepage.links:
             if href and text:
                 href_lower = href.lower()
                 text_lower = text.lower()
 
                 if any(kw in text_lower or kw in href_lower for kw in keywords):
-                    full_url = urljoin(page.url, href)
-                    if urlparse(full_url).netloc == urlparse(page.url).netloc:
+                    full_url = urljoin(homepage.url, href)
+                    if urlparse(full_url).netloc == urlparse(homepage.url).netloc:
                         return full_url
     except Exception:
         pass
@@ -160,7 +110,7 @@ async def find_contact_page(page: Page) -> Optional[str]:
 # -----------------------------------------------------------------------------
 
 
-async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
+async def scrape_ecom_store(pool: ContextPool, url: str, max_retries: int = 2) -> Dict:
     """Scrape a single e-commerce store with retry on timeouts/403s."""
     result = {
         'url': url,
@@ -178,13 +128,13 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
         'email': '',
         'phone': '',
         'error': None,
+        'signature_version': SIGNATURE_VERSION,
     }
 
-    context = await browser.new_context(
-        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        viewport={'width': 1366, 'height': 768},
-    )
-    page = await context.new_page()
+    lease = await pool.acquire(urlparse(url).netloc)
+    page = lease.page
+    lease_failed = False
+    proxies = pool.proxies
 
     try:
         print(f"\n🛍️  Analyzing: {url}...")
@@ -192,11 +142,17 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
         # 1. Load Homepage (with retry)
         last_error = None
         for attempt in range(max_retries + 1):
+            nav_started = time.time()
             try:
-                await page.goto(url, timeout=30000, wait_until='domcontentloaded')
+                response = await page.goto(url, timeout=30000, wait_until='domcontentloaded')
+                blocked = response is not None and response.status in PROXY_BLOCK_STATUSES
+                if proxies is not None:
+                    proxies.report(lease.proxy, time.time() - nav_started, ok=not blocked, blocked=blocked)
                 await page.wait_for_timeout(2000)
                 break
             except PlaywrightTimeoutError as e:
+                if proxies is not None:
+                    proxies.report(lease.proxy, ok=False)
                 last_error = 'Timeout loading homepage'
                 if attempt < max_retries:
                     wait = random.uniform(3, 6)
@@ -204,10 +160,12 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
                     await asyncio.sleep(wait)
                 else:
                     result['error'] = last_error
-                    await context.close()
+                    lease_failed = True
                     return result
             except Exception as e:
                 err_str = str(e).lower()
+                if proxies is not None:
+                    proxies.report(lease.proxy, ok=False, blocked='403' in err_str or 'forbidden' in err_str)
                 if '403' in err_str or 'forbidden' in err_str:
                     last_error = '403 Forbidden'
                 else:
@@ -218,13 +176,14 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
                     await asyncio.sleep(wait)
                 else:
                     result['error'] = last_error
-                    await context.close()
+                    lease_failed = True
                     return result
 
         # 2. Extract Homepage Data
         result['store_name'] = await get_company_name(page, url)
-        html = await page.content()
-        body_text = await page.inner_text('body')
+        homepage = await harvest_page(page)
+        html = homepage.html
+        body_text = homepage.text
 
         # Detect Tech Stack
         tech_stack = detect_tech_stack(html)
@@ -247,7 +206,7 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
         found_phones = [extract_phone(body_text)]
 
         # 3. Check Contact/About Page
-        contact_url = await find_contact_page(page)
+        contact_url = find_contact_page(homepage)
 
         if contact_url:
             print(f"   ↳ Checking Contact Page: {contact_url}")
@@ -271,8 +230,9 @@ async def scrape_ecom_store(browser, url: str, max_retries: int = 2) -> Dict:
     except Exception as e:
         result['error'] = f"Unexpected error: {str(e)}"
         print(f"  ❌ Error: {e}")
+        lease_failed = True
     finally:
-        await context.close()
+        await pool.release(lease, failed=lease_failed)
 
     return result
 
@@ -321,64 +281,74 @@ async def main():
 
         # 2. Launch Browser & Process Rows
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-
-            for row_idx in range(1, len(all_values)):
-                row_num = row_idx + 1
-                row_data = all_values[row_idx]
-
-                url = row_data[0].strip() if len(row_data) > 0 else ''
-                if not url:
-                    continue
-
-                # Check Column M (index 12): Status/Error - skip if already processed
-                status_log = row_data[12] if len(row_data) > 12 else ''
-                if status_log and 'Processed' in status_log:
-                    print(f"Skipping Row {row_num}: Already processed.")
-                    continue
-
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-
-                data = await scrape_ecom_store(browser, url)
-
-                # Prepare Row Update (B -> M)
-                socials_str = f"IG:{data['instagram']} FB:{data['facebook']} TT:{data['tiktok']}"
-                status = data['error'] if data['error'] else f"Processed {get_current_timestamp()}"
-
-                update_values = [
-                    data['store_name'],
-                    data['platform'],
-                    data['email_mktg'],
-                    data['sms'],
-                    data['subs'],
-                    data['reviews'],
-                    data['loyalty'],
-                    data['pixels'],
-                    socials_str,
-                    data['email'],
-                    data['phone'],
-                    status,
-                ]
-
-                try:
-                    cell_range = f'B{row_num}:M{row_num}'
-                    worksheet.update([update_values], cell_range)
+            proxies = ProxyPool.from_env()   # PROXY_URLS in env/.env; None = direct
+            # Chromium only honours per-context proxies if the launch sets one
+            launch_proxy = {"proxy": {"server": "http://per-context"}} if proxies else {}
+            browser = await p.chromium.launch(headless=True, **launch_proxy)
+            pool = ContextPool(
+                browser, size=1, block_resources=(), proxies=proxies,
+                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                viewport={'width': 1366, 'height': 768},
+            )
+            await pool.start()
+            writer = SheetWriter(worksheet).start()
 
+            try:
+                for row_idx in range(1, len(all_values)):
+                    row_num = row_idx + 1
+                    row_data = all_values[row_idx]
+
+                    url = row_data[0].strip() if len(row_data) > 0 else ''
+                    if not url:
+                        continue
+
+                    # Check Column M (index 12): Status/Error - skip if already processed
+                    status_log = row_data[12] if len(row_data) > 12 else ''
+                    if status_log and 'Processed' in status_log:
+                        print(f"Skipping Row {row_num}: Already processed.")
+                        continue
+
+                    if not url.startswith(('http://', 'https://')):
+                        url = 'https://' + url
+
+                    data = await scrape_ecom_store(pool, url)
+
+                    # Prepare Row Update (B -> M)
+                    socials_str = f"IG:{data['instagram']} FB:{data['facebook']} TT:{data['tiktok']}"
+                    status = data['error'] if data['error'] else f"Processed {get_current_timestamp()}"
+
+                    update_values = [
+                        data['store_name'],
+                        data['platform'],
+                        data['email_mktg'],
+                        data['sms'],
+                        data['subs'],
+                        data['reviews'],
+                        data['loyalty'],
+                        data['pixels'],
+                        socials_str,
+                        data['email'],
+                        data['phone'],
+                        status,
+                    ]
+
+                    # Buffered: written in batches by the writer, off the event loop
+                    writer.put(f'B{row_num}:M{row_num}', [update_values])
                     if not data['error']:
-                        print(f"✅ Updated Row {row_num}: {data['store_name']} ({data['platform']})")
+                        print(f"✅ Queued Row {row_num}: {data['store_name']} ({data['platform']})")
                     else:
-                        print(f"⚠️  Updated Row {row_num} with Error: {data['error']}")
-                except Exception as e:
-                    print(f"❌ Failed to write to sheet: {e}")
-
-                # Rate limiting: 5-10s between rows
-                if row_idx < len(all_values) - 1:
-                    delay = random.uniform(5, 10)
-                    print(f"⏳ Waiting {delay:.1f}s before next request...")
-                    await asyncio.sleep(delay)
-
-            await browser.close()
+                        print(f"⚠️  Queued Row {row_num} with Error: {data['error']}")
+
+                    # Rate limiting: 5-10s between rows
+                    if row_idx < len(all_values) - 1:
+                        delay = random.uniform(5, 10)
+                        print(f"⏳ Waiting {delay:.1f}s before next request...")
+                        await asyncio.sleep(delay)
+            finally:
+                await writer.close()     # flush queued rows, also on Ctrl-C
+                print(f"📝 Sheet: {writer.summary()}")
+                await pool.close()
+                await browser.close()
 
     except Exception as e:
         print(f"🔥 Fatal Error: {e}")
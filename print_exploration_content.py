@@ -15,6 +15,9 @@ from urllib.parse import urljoin, urlparse
 import aiohttp
 from playwright.async_api import async_playwright
 
+from core import HTTP
+from signatures import classify_request_url
+
 SECTION = "═" * 70
 
 
@@ -40,11 +43,10 @@ async def fetch_robots_txt(base_url: str) -> str:
         parsed = urlparse(base_url)
         robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
         headers = {"User-Agent": "Mozilla/5.0"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                robots_url, timeout=aiohttp.ClientTimeout(total=10), headers=headers
-            ) as resp:
-                return await resp.text(errors="ignore")
+        async with HTTP.session.get(
+            robots_url, timeout=aiohttp.ClientTimeout(total=10), headers=headers
+        ) as resp:
+            return await resp.text(errors="ignore")
     except Exception as e:
         return f"(failed to fetch: {e})"
 
@@ -97,7 +99,7 @@ async def dump_page_raw(page, url: str) -> tuple:
         return f"(failed to load: {e})", ""
 
 
-async def explore(url: str):
+async def _explore(url: str):
     url = normalize_url(url)
     parsed = urlparse(url)
     base = f"{parsed.scheme}://{parsed.netloc}"
@@ -256,7 +258,12 @@ async def explore(url: str):
         # ── ALL OUTGOING NETWORK REQUESTS (homepage + contact + about) ────────
         section("🌐 ALL OUTGOING NETWORK REQUESTS")
         for req_url in all_requests:
-            print(f"  {req_url}")
+            hits = classify_request_url(req_url)
+            if hits:
+                tags = ", ".join(f"{cat}: {name}" for cat, name in sorted(hits))
+                print(f"  {req_url}  [{tags}]")
+            else:
+                print(f"  {req_url}")
         if not all_requests:
             print("  (none captured)")
 
@@ -267,6 +274,13 @@ async def explore(url: str):
     print(SECTION)
 
 
+async def explore(url: str):
+    try:
+        await _explore(url)
+    finally:
+        await HTTP.close()   # shared session, also when the dump fails part-way
+
+
 OUTPUT_FILE = "printed_exploration_content.txt"
 
 
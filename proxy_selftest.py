@@ -0,0 +1,140 @@
+"""
+Proxy self-test: drives core.ProxyPool (and, if Chromium is installed,
+core.ContextPool) through local forward proxies started in-process - one
+relaying requests, one answering 403 to everything. No network, no real proxies.
+
+    python proxy_selftest.py
+"""
+
+import asyncio
+import sys
+import time
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+from playwright.async_api import Error as PlaywrightError, async_playwright
+
+from core import (
+    HTTP,
+    PROXY_BLOCK_STATUSES,
+    ContextPool,
+    ProxyPool,
+    open_probe_session,
+)
+
+
+async def _serve_local(handler) -> tuple:
+    """Serve handler for every method and path on a free 127.0.0.1 port: (runner, URL)."""
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def _forward_proxy(name: str, seen: list, status: Optional[int] = None):
+    """Forward-proxy stand-in: relays absolute-form requests, or answers `status` to all."""
+
+    async def relay(request):
+        seen.append(name)
+        if status is not None:
+            return web.Response(status=status, text="blocked by proxy")
+        async with aiohttp.ClientSession() as session:
+            async with session.request(request.method, str(request.url)) as resp:
+                return web.Response(status=resp.status, body=await resp.read())
+
+    return relay
+
+
+async def selftest() -> bool:
+    """
+    Drive a ProxyPool through a relaying proxy and one answering 403 to
+    everything: stickiness, cooldown, ejection and healthy(); then, if
+    Chromium is installed, a ContextPool's pinned acquire and recycling on
+    release. True if every check passes.
+    """
+    seen = []
+    runners = []
+    results = []
+
+    def check(label: str, passed: bool) -> None:
+        results.append(passed)
+        print(f"{'✅' if passed else '❌'} {label}")
+
+    async def origin(request):
+        return web.Response(text="<html><title>Origin</title></html>", content_type="text/html")
+
+    try:
+        urls = []
+        for handler in (origin, _forward_proxy("relay", seen), _forward_proxy("blocking", seen, 403)):
+            runner, url = await _serve_local(handler)
+            runners.append(runner)
+            urls.append(url)
+        origin_url, relay_url, blocking_url = urls
+
+        pool = ProxyPool([relay_url, blocking_url], max_streak=2, cooldown=1, eject_after=2)
+
+        async def visit(proxy: str) -> None:
+            started = time.time()
+            async with open_probe_session(proxy).get(f"{origin_url}/") as resp:
+                blocked = resp.status in PROXY_BLOCK_STATUSES
+            pool.report(proxy, time.time() - started, ok=not blocked, blocked=blocked)
+
+        first = pool.choose("a.test")
+        check("a domain keeps the proxy it was pinned to", all(pool.choose("a.test") == first for _ in range(10)))
+        for _ in range(2):
+            await visit(blocking_url)
+        check("two blocks in a row cool the blocking proxy down",
+              not pool.healthy(blocking_url) and not pool.proxies[blocking_url].ejected)
+        check("meanwhile every choice is the relaying proxy",
+              pool.healthy(relay_url) and all(pool.choose() == relay_url for _ in range(20)))
+        await asyncio.sleep(1.1)
+        check("the blocking proxy is healthy again after its cooldown", pool.healthy(blocking_url))
+        for _ in range(2):
+            await visit(blocking_url)
+        check("a second cooldown ejects it", pool.proxies[blocking_url].ejected)
+        await visit(relay_url)
+        check("requests really went through the proxies", seen == ["blocking"] * 4 + ["relay"])
+
+        # Recycling needs real browser contexts
+        pool = ProxyPool([relay_url, blocking_url], max_streak=2)
+        try:
+            async with async_playwright() as p:
+                # Chromium only honours per-context proxies if the launch sets one
+                browser = await p.chromium.launch(proxy={"server": "http://per-context"})
+                contexts = ContextPool(browser, 2, proxies=pool)
+                await contexts.start()
+                lease = await contexts.acquire("b.test")
+                proxy = lease.proxy
+                await contexts.release(lease)
+                lease = await contexts.acquire("b.test")
+                check("acquire(domain) hands out a context behind the pinned proxy", lease.proxy == proxy)
+                for _ in range(2):
+                    pool.report(proxy, ok=False)
+                await contexts.release(lease)
+                check("releasing a context whose proxy cooled down recycles it", contexts.recycled == 1)
+                lease = await contexts.acquire("b.test")
+                check("the domain moves to the healthy proxy", lease.proxy != proxy and pool.healthy(lease.proxy))
+                await contexts.release(lease)
+                await contexts.close()
+                await browser.close()
+        except PlaywrightError as e:
+            print(f"⏭️  ContextPool checks skipped — Chromium unavailable "
+                  f"(python -m playwright install chromium): {str(e).splitlines()[0]}")
+    finally:
+        await HTTP.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    print(f"\n{sum(results)}/{len(results)} proxy checks passed")
+    return all(results)
+
+
+if __name__ == "__main__":
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print(__doc__)
+    else:
+        sys.exit(0 if asyncio.run(selftest()) else 1)
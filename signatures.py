@@ -0,0 +1,1184 @@
+"""
+Signature registry for crawl_atlas detectors.
+
+Every fingerprint table used by core.py, main_clinics.py and main_ecom.py
+lives here, and the matchers built from them are compiled once at import.
+SIGNATURE_VERSION is a content hash of all tables; it is stamped on every
+scrape result so stored rows can be checked for staleness.
+"""
+
+import hashlib
+import json
+import re
+
+
+class PatternAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of literal patterns.
+    Built once (at import for the signature tables); find_all() reports every
+    pattern occurring in a haystack — overlapping and nested hits included —
+    in a single linear pass, instead of one substring search per pattern.
+    Patterns are matched exactly as given: callers lowercase both sides.
+    """
+
+    __slots__ = ("patterns", "_delta", "_out")
+
+    def __init__(self, patterns):
+        self.patterns = tuple(dict.fromkeys(p for p in patterns if p))
+        goto = [{}]
+        out = [()]
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = out[state] + (pattern,)
+
+        # Breadth-first pass: resolve failure links and fold them into a full
+        # transition table so matching never has to walk back up the trie.
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = list(goto[0].values())
+        for state in queue:
+            link = fail[state]
+            delta[state] = {**delta[link], **goto[state]}
+            out[state] = out[state] + out[link]
+            for ch, child in goto[state].items():
+                fail[child] = delta[link].get(ch, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._out = out
+
+    def find_all(self, haystack: str) -> set:
+        """Return the set of patterns that occur anywhere in haystack."""
+        delta = self._delta
+        out = self._out
+        state = 0
+        found = set()
+        for ch in haystack:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class SignatureMatcher:
+    """
+    A pattern -> owners table compiled into one PatternAutomaton.
+    match() returns every owner (e.g. a (category, tool) pair) whose pattern
+    occurs in the haystack.
+    """
+
+    __slots__ = ("index", "automaton")
+
+    def __init__(self, index: dict):
+        self.index = {pattern: tuple(owners) for pattern, owners in index.items()}
+        self.automaton = PatternAutomaton(self.index)
+
+    def match(self, haystack: str) -> set:
+        return {
+            owner
+            for pattern in self.automaton.find_all(haystack)
+            for owner in self.index[pattern]
+        }
+
+
+# -----------------------------------------------------------------------------
+# Shared tables (core.py): cookies, CSP, meta generator, inline JS, robots.txt
+# -----------------------------------------------------------------------------
+
+COOKIE_SIGNATURES = {
+    "_shopify_y":     ("cms", "Shopify"),
+    "shopify_pay":    ("cms", "Shopify"),
+    "hubspotutk":     ("crm", "HubSpot"),
+    "__hstc":         ("crm", "HubSpot"),
+    "hs":             ("crm", "HubSpot"),  # Guard: literal "hs" cookie set by HubSpot tracking (e.g. on Wix sites)
+    "__kla_id":       ("crm", "Klaviyo"),
+    "__cf_bm":        ("infra", "Cloudflare"),
+    "_cfuvid":        ("infra", "Cloudflare"),
+    "intercom-id":    ("live_chat", "Intercom"),
+    "intercom-session":("live_chat", "Intercom"),
+    "__lc_cid":       ("live_chat", "LiveChat"),
+    "_ga":            ("pixels", "Google Analytics 4"),
+    "_gid":           ("pixels", "Google Analytics 4"),
+    "_fbp":           ("pixels", "Meta Pixel"),
+    "_ttp":           ("pixels", "TikTok Pixel"),
+    "_hjid":          ("pixels", "Hotjar"),
+    "MUID":           ("pixels", "Microsoft Clarity"),
+}
+
+FRAMEWORK_COOKIE_SIGNATURES = {
+    # Laravel
+    "XSRF-TOKEN":           ("cms", "Laravel (Custom)"),
+    "_token":               ("cms", "Laravel (Custom)"),
+    # Django
+    "csrftoken":            ("cms", "Django (Custom)"),
+    "sessionid":            ("cms", "Django (Custom)"),
+    # Ruby on Rails
+    "_rails_session":       ("cms", "Rails (Custom)"),
+    # ASP.NET
+    "ASP.NET_SessionId":    ("cms", "ASP.NET (Custom)"),
+    "__RequestVerificationToken": ("cms", "ASP.NET (Custom)"),
+    # Next.js / Vercel
+    "__next_hmr_cb":        ("cms", "Next.js (Custom)"),
+    "next-auth.session-token": ("cms", "Next.js (Custom)"),
+    # Phoenix / Elixir
+    "_csrf_token":          ("cms", "Phoenix (Custom)"),
+}
+
+CSP_SIGNATURES = {
+    "mkt.dynamics.com":         ("crm", "Microsoft Dynamics 365"),
+    "dynamics.com":             ("crm", "Microsoft Dynamics 365"),
+    "cxondemand.com":           ("crm", "NICE CXone"),
+    "salesforce.com":           ("crm", "Salesforce"),
+    "pardot.com":               ("crm", "Salesforce"),
+    "marketo.net":              ("crm", "Adobe Marketo"),
+    "eloqua.com":               ("crm", "Oracle Eloqua"),
+    "hsforms.com":              ("crm", "HubSpot"),
+    "hs-scripts.com":           ("crm", "HubSpot"),
+    "klaviyo.com":              ("crm", "Klaviyo"),
+    "mypurecloud.com":          ("live_chat", "Genesys"),
+    "mypurecloud.com.au":       ("live_chat", "Genesys"),
+    "genesys.com":              ("live_chat", "Genesys"),
+    "zopim.com":                ("live_chat", "Zendesk"),
+    "zdassets.com":             ("live_chat", "Zendesk"),
+    "intercom.io":              ("live_chat", "Intercom"),
+    "tawk.to":                  ("live_chat", "Tawk.to"),
+    "formstack.com":            ("forms", "Formstack"),
+    "wpforms.com":              ("forms", "WPForms"),
+    "typeform.com":             ("forms", "Typeform"),
+    "jotform.com":              ("forms", "JotForm"),
+    "stripe.com":               ("payments", "Stripe"),
+    "authorize.net":            ("payments", "Authorize.net"),
+    "medipass.com.au":          ("payments", "Medipass"),
+    "coviu.com":                ("telehealth", "Coviu"),
+    "zoom.us":                  ("telehealth", "Zoom"),
+    "doxy.me":                  ("telehealth", "Doxy.me"),
+}
+
+META_GENERATOR_SIGNATURES = {
+    "wordpress": ("cms", "WordPress"),
+    "wix": ("cms", "Wix"),
+    "squarespace": ("cms", "Squarespace"),
+    "webflow": ("cms", "Webflow"),
+    "drupal": ("cms", "Drupal"),
+    "joomla": ("cms", "Joomla"),
+    "shopify": ("cms", "Shopify"),
+    "ghost": ("cms", "Ghost"),
+    "weebly": ("cms", "Weebly"),
+    "framer": ("cms", "Framer"),
+    "divi":      ("cms", "WordPress (Divi)"),
+    "elementor": ("cms", "WordPress (Elementor)"),
+    "avada":     ("cms", "WordPress (Avada)"),
+    "beaver builder": ("cms", "WordPress (Beaver Builder)"),
+    "wpbakery":  ("cms", "WordPress (WPBakery)"),
+}
+
+JS_INLINE_SIGNATURES = {
+    "_learnq":              ("crm", "Klaviyo"),
+    "klaviyo":              ("crm", "Klaviyo"),
+    "fbq(":                 ("pixels", "Meta Pixel"),
+    "fbevents":             ("pixels", "Meta Pixel"),
+    "ttq.load":             ("pixels", "TikTok Pixel"),
+    "gtag(":                ("pixels", "Google Analytics 4"),
+    "window.intercomsettings": ("live_chat", "Intercom"),
+    "intercom(":            ("live_chat", "Intercom"),
+    "drift.load":           ("live_chat", "Drift"),
+    "driftt.com":           ("live_chat", "Drift"),
+    "__lc =":               ("live_chat", "LiveChat"),
+    "livechat":             ("live_chat", "LiveChat"),
+    "mixpanel.init":        ("pixels", "Mixpanel"),
+    "heap.load":            ("pixels", "Heap"),
+    "hj(":                  ("pixels", "Hotjar"),
+    "hotjar":               ("pixels", "Hotjar"),
+    "window.clarity":       ("pixels", "Microsoft Clarity"),
+    "pintrk(":              ("pixels", "Pinterest"),
+    "snaptr(":              ("pixels", "Snapchat"),
+    "hsq.push":             ("crm", "HubSpot"),
+    "mc.js":                ("crm", "Mailchimp"),
+    "mailchimp":            ("crm", "Mailchimp"),
+    "activecampaign":       ("crm", "ActiveCampaign"),
+    "cliniko":              ("pms_ehr", "Cliniko"),
+    "halaxy":               ("pms_ehr", "Halaxy"),
+    "hotdoc":               ("booking", "HotDoc"),
+    "healthengine":         ("booking", "HealthEngine"),
+}
+
+ROBOTS_SIGNATURES = {
+    # CMS
+    "/wp-admin":        ("cms",   "WordPress"),
+    "/wp-content":      ("cms",   "WordPress"),
+    "shopify":          ("cms",   "Shopify"),
+    "squarespace":      ("cms",   "Squarespace"),
+    "wix":              ("cms",   "Wix"),
+    "webflow":          ("cms",   "Webflow"),
+    # WordPress plugins (Disallow paths)
+    "/wp-content/uploads/wpforms/":          ("forms",  "WPForms"),
+    "/wp-content/uploads/gravity_forms/":    ("forms",  "Gravity Forms"),
+    "/wp-content/plugins/contact-form-7/":   ("forms",  "Contact Form 7"),
+    "/wp-content/plugins/elementor/":        ("forms",  "Elementor Forms"),
+    "/wp-content/plugins/woocommerce/":      ("payments", "WooCommerce"),
+    # Hosting
+    "wpstaq":           ("infra", "WPStaq"),
+    "wpengine":         ("infra", "WP Engine"),
+    "kinsta":           ("infra", "Kinsta"),
+    "siteground":       ("infra", "SiteGround"),
+}
+
+# MX hosts -> email provider keys (core.classify_mx; display names in
+# core.EMAIL_PROVIDER_DISPLAY). Listed in output order. Per lowercased MX host:
+#   "contains": any substring matches
+#   "prefix":   host starts with it, unless it contains one of "unless"
+MX_SIGNATURES = [
+    ("gmail",         {"contains": ["google", "googlemail"]}),
+    ("microsoft_365", {"contains": ["outlook.com", "protection.outlook.com",
+                                    "mail.protection.outlook.com", "office365"]}),
+    # Proofpoint / Mimecast wrap M365/Google, but signal security investment
+    ("proofpoint",    {"contains": ["pphosted.com"]}),
+    ("mimecast",      {"contains": ["mimecast.com"]}),
+    ("zoho",          {"contains": ["zoho.com", "zohomail"]}),
+    ("godaddy",       {"contains": ["secureserver.net", "godaddy.com"]}),
+    ("fastmail",      {"contains": ["fastmail"]}),
+    ("namecheap",     {"contains": ["privateemail.com"]}),
+    ("mailgun",       {"contains": ["mailgun.org"]}),
+    ("sendgrid",      {"contains": ["sendgrid.net"]}),
+    ("amazon_ses",    {"contains": ["amazonaws.com", "amazonses.com"]}),
+    ("icloud",        {"contains": ["icloud.com", "apple.com"]}),
+    ("yahoo",         {"contains": ["yahoodns.net", "yahoo.com"]}),
+    # VentraIP / Synergy Wholesale (cPanel-based AU hosting)
+    ("ventraip",      {"contains": ["ventraip", "synergywholesale", "vendorinternet",
+                                    "cpanelemailer", "mxroute"]}),
+    ("crazy_domains", {"contains": ["crazydomains"]}),
+    ("netregistry",   {"contains": ["netregistry"]}),
+    # mail.<domain> is the typical cPanel default
+    ("cpanel_shared", {"prefix": ["mail."],
+                       "unless": [".mail.protection.outlook.com", "google", "microsoft"]}),
+]
+
+# Keys refined by the whole MX set: key -> (substring of any host, replacement key).
+# aspmx.l.google.com = Workspace; gmail-smtp-in = personal Gmail
+MX_VARIANTS = {
+    "gmail": ("aspmx", "google_workspace"),
+}
+
+# DNS records (core.dns_fingerprint), keyed by record type. Patterns are substrings
+# of the lowercased record text: TXT = SPF includes and domain verifications,
+# NS = the apex's nameservers, CNAME = where www points.
+# "email" = mailbox hosts only; those hits are a fallback for email_provider when the
+# MX lookup finds nothing. "email_sending" (SPF for bulk senders) and "verification"
+# are not TECH_SIGNATURES categories, so they never fill or resolve a tech column.
+DNS_SIGNATURES = {
+    "TXT": {
+        "include:servers.mcsv.net":         ("crm",    "Mailchimp"),
+        "hubspotemail.net":                 ("crm",    "HubSpot"),
+        "hubspot-developer-verification":   ("crm",    "HubSpot"),
+        "klaviyo":                          ("crm",    "Klaviyo"),
+        "include:_spf.google.com":          ("email",  "Google Workspace"),
+        "include:spf.protection.outlook.com": ("email", "Microsoft 365"),
+        "ms=ms":                            ("email",  "Microsoft 365"),
+        "zoho-verification":                ("email",  "Zoho"),
+        "include:zoho.com":                 ("email",  "Zoho"),
+        "include:zohomail":                 ("email",  "Zoho"),
+        "include:sendgrid.net":             ("email_sending", "SendGrid"),    # sends for the domain, not its mailbox
+        "include:mailgun.org":              ("email_sending", "Mailgun"),
+        "atlassian-domain-verification":    ("verification",  "Atlassian"),
+        "facebook-domain-verification":     ("verification",  "Meta Business"),   # not a pixel install, not hosting
+    },
+    "NS": {
+        "ns.cloudflare.com":    ("infra", "Cloudflare"),
+        "ventraip":             ("infra", "VentraIP"),
+        "nameserver.net.au":    ("infra", "VentraIP"),      # Synergy Wholesale / VentraIP
+        "crazydomains":         ("infra", "Crazy Domains"),
+        "domaincontrol.com":    ("infra", "GoDaddy"),
+        "awsdns":               ("infra", "AWS"),
+        "wixdns.net":           ("cms",   "Wix"),
+    },
+    "CNAME": {
+        "myshopify.com":        ("cms",   "Shopify"),
+        "wixdns.net":           ("cms",   "Wix"),
+        "squarespace.com":      ("cms",   "Squarespace"),
+        "webflow":              ("cms",   "Webflow"),
+        "wpengine":             ("infra", "WP Engine"),
+        "kinsta":               ("infra", "Kinsta"),
+    },
+}
+
+# -----------------------------------------------------------------------------
+# Clinic tables (main_clinics.py)
+# -----------------------------------------------------------------------------
+
+# Tech stack signatures - fingerprints for detection
+# Category order: pms_ehr → booking → cms → crm → payments → telehealth →
+# forms → pixels → live_chat → reviews → infra (12 cats, 11 output cols excl. booking)
+#
+# Trace (vibenaturalhealth.com.au): With core.harvest_page now including relative
+# link hrefs, all 4 previously missed stacks are detected:
+# 1. Contact Form 7: contact-form-7/includes in script/link URLs
+# 2. Elementor Forms: send-app-elementor-form-tracker in plugin script path
+# 3. Trustindex: loader-feed.js (CDN) + trustindex-feed-instagram-widget (relative CSS)
+# 4. Send App: send-app-cf7-form-tracker, send-app-elementor-form-tracker, plugins/send-app
+TECH_SIGNATURES = {
+    # ─────────────────────────────────────────────────────────────────────
+    # 1. PRACTICE MANAGEMENT SYSTEMS (PMS / EHR)
+    # ─────────────────────────────────────────────────────────────────────
+    "pms_ehr": {
+        # ── Allied Health Cloud SaaS ──
+        "Cliniko":               ["cliniko.com", "app.cliniko.com", "secure.cliniko.com", "booking.cliniko.com", "telehealth.cliniko.com"],
+        "Nookal":                ["nookal.com", "connect.nookal.com", "portal.nookal.com"],
+        "Jane App":              ["janeapp.com", "jane.app", "clinics.janeapp.com"],
+        "Halaxy":                ["halaxy.com"],
+        "Power Diary":           ["powerdiary.com"],
+        "Splose":                ["splose.com"],
+        "Coreplus":              ["coreplus.com.au"],
+        "Practice Better":       ["practicebetter.io", "practicebetter.com"],
+        "SimplePractice":        ["simplepractice.com", "telehealth.simplepractice.com"],
+        "Carepatron":            ["carepatron.com"],
+        "WriteUpp":              ["writeupp.com"],
+        "PracSuite":             ["pracsuite.com"],
+        "TM2 / TM3":             ["tm2online.com", "tm3online.com", "tmonline.net"],
+        "Smartsoft Front Desk":  ["frontdesk.com.au", "smartsoft.com.au", "booking.frontdesk"],
+        "Xestro":                ["xestro.com"],
+        "PPMP":                  ["ppmp.com.au"],
+
+        # ── GP / Specialist / Multi-site ──
+        "Best Practice":         ["bpsoftware.com.au", "bp-software.com.au", "bestpracticesoftware", "medicalonline", "bp premier", "best practice software", "bp software"],
+        "AutoMed":               ["automed.com.au", "ams connect", "amsconnect", "automed systems"],
+        "MedicalDirector":       ["medicaldirector.com", "helix.medicaldirector", "pracsoft.com", "portal.medicaldirector"],
+        "Zedmed":                ["zedmed.com.au"],
+        "Genie Solutions":       ["genie.com.au", "geniesolutions", "gentu.com.au"],
+        "Clinic to Cloud":       ["clinictocloud.com", "clinic-to-cloud"],
+        "ProCare":               ["procare.com.au", "procarehealth.com.au"],
+        "Titanium":              ["titaniumhealthcare.com.au", "titanium-software.com.au"],
+        "Bluechip":              ["bluechip.com.au", "bluechipmedical"],
+        "Shexie":                ["shexie.com.au"],
+        "Medilink":              ["medilink.com.au"],
+        "PrimaryClinic":         ["primaryclinic.com.au"],
+        "Communicare":           ["communicare.com.au", "telstrahealth.com/communicare"],
+        "MasterCare":            ["mastercare.com.au", "globalhealth.com.au/mastercare"],
+        "Audit4":                ["audit4.com", "software4specialists.com"],
+        "Profile (Intrahealth)": ["intrahealth.com", "profile-pms"],
+
+        # ── Dental ──
+        "Dental4Windows":        ["centaurportal.com", "centaur-software.com", "centaurportal.com/d4w",
+                                 "dental4windows", "d4w/org-", "dental4windows.com", "centaursoftware.com.au"],
+        "Exact (SOE)":           ["software-of-excellence.com", "exact-dental.com", "soeortho.com"],
+        "Praktika":              ["praktika.com.au"],
+        "Oasis Dental":         ["oasisdental.com"],
+        "Dentrix":               ["dentrix.com", "henryschein.com/dentrix"],
+        "Core Practice":         ["corepractice.com.au"],
+
+        # ── Enterprise / Hospital ──
+        "Epic":                  ["epic.com", "mychart.com", "app.epic.com"],
+        "Cerner":                ["cerner.com", "healthelife.com.au", "oracle.com/health"],
+        "Allscripts":            ["allscripts.com", "veradigm.com"],
+        "Meditech":              ["meditech.com"],
+        "TrakCare":              ["trakcare.com", "intersystems.com/trakcare"],
+        "MediRecords":           ["medirecords.com", "medirecords"],
+        "Athenahealth":          ["athenahealth.com", "athenaone.com"],
+        "DrChrono":              ["drchrono.com", "onpatient.com"],
+        "AdvancedMD":            ["advancedmd.com"],
+        "Kareo":                 ["kareo.com", "tebra.com"],
+        "Practice Fusion":       ["practicefusion.com"],
+        "NextGen":               ["nextgen.com", "nextgenhealth.com"],
+        "eClinicalWorks":        ["eclinicalworks.com", "healow.com"],
+        "Greenway Health":       ["greenwayhealth.com"],
+
+        # ── Enterprise / Specialist portals ──
+        "Salesforce Health Cloud": ["salesforce.com", "force.com", "health-cloud", "salesforceiq", "lightning.force.com"],
+        "Genea":                   ["genea.com.au", "genea kinnect", "geneakinnect", "powered by genea"],
+
+        # ── Niche / Wellness ──
+        "Mindbody":              ["mindbodyonline.com", "mindbody.io"],
+        "Fresha":                ["fresha.com", "shedul.com"],
+        "Timely":                ["gettimely.com"],
+        "Cosmetri":              ["cosmetri.com"],
+        "Zandamed":              ["zandamed.com"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 2. BOOKING SYSTEMS
+    # ─────────────────────────────────────────────────────────────────────
+    "booking": {
+        "HotDoc":                ["cdn.hotdoc.com.au", "hotdoc-widgets.min.js", "hotdoc-widget",
+                                 "hotdoc.com.au/medical-centres", "book.hotdoc.com.au"],
+        "HealthEngine":          ["healthengine.com.au", "booking.healthengine.com.au"],
+        "AutoMed":               ["automed.com.au", "ams connect", "amsconnect.com.au"],
+        "Cliniko Booking":       ["booking.cliniko.com", "secure.cliniko.com"],
+        "Nookal Booking":        ["connect.nookal.com", "portal.nookal.com"],
+        "Jane App Booking":      ["clinics.janeapp.com"],
+        "Halaxy Booking":        ["halaxy.com/book"],
+        "Power Diary Booking":   ["powerdiary.com/book"],
+        "Front Desk Booking":    ["booking.frontdesk.com.au"],
+        "HubSpot Meetings":      ["meetings.hubspot.com", "meetings.hs-sites"],
+        "Calendly":              ["calendly.com", "assets.calendly"],
+        "Acuity":                ["acuityscheduling.com"],
+        "Setmore":               ["setmore.com"],
+        "Doctolib":              ["doctolib.fr", "doctolib.de", "doctolib.com"],
+        "Zocdoc":                ["zocdoc.com"],
+        "Docplanner":            ["docplanner.com"],
+        "Doctoralia":            ["doctoralia.com"],
+        "Fresha":                ["fresha.com"],
+        "Mindbody":              ["mindbodyonline.com"],
+        "Timely":                ["gettimely.com"],
+        "FormAssembly":          ["tfaforms.net", "tfaforms.com", "formassembly.com", "request.*consultation", "consultation.*request"],
+        "Genea Kinnect":         ["genea-kinnect", "geneakinnect", "kinnect.genea"],
+        "D4W eAppointments":     ["centaurportal.com/d4w", "centaurportal.com", "d4w/org-",
+                                 "practiceid=", "centaur.*appointment", "d4w.*appointment"],
+        "MediRecords Booking":  ["medirecords"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 3. CMS / WEBSITE BUILDER
+    # ─────────────────────────────────────────────────────────────────────
+    "cms": {
+        "WordPress":   ["wp-content", "wp-includes", "wp-json", "/wp-json/wp/v2/", "wordpress", "/themes/Divi/", "/themes/divi/"],
+        "Drupal":      ["sites/default/files", "drupalSettings", "core/misc/drupal.js", "drupal.org"],
+        "Wix":         ["wix.com", "wix-thunderbolt", "static.wixstatic.com", "static.parastorage.com", "wix-code"],
+        "Squarespace": ["squarespace.com", "static1.squarespace", "squarespace.com/universal/scripts"],
+        "Webflow":     ["webflow.com", "assets-global.website-files", "cdn.prod.website-files.com", "data-wf-domain"],
+        "Framer":      ["framer.com", "framerusercontent.com"],
+        "Joomla":      ["joomla.org", "joomla"],
+        "Ghost":       ["ghost.org", "ghost"],
+        "Weebly":      ["weebly.com"],
+        "Sitecore":    ["sitecore.net", "sitecore.com", "-/media/", "/-/jssmedia/"],
+        "Umbraco":     ["umbraco.com", "umbraco", "/umbraco/"],
+        "HubSpot CMS": ["hs-sites.com", "hubspotpagebuilder.com", "hs-scripts.com/cms"],
+        "Shopify":     ["cdn.shopify.com", "shopify.theme"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 4. CRM, EMAIL MARKETING & PATIENT ENGAGEMENT
+    # ─────────────────────────────────────────────────────────────────────
+    "crm": {
+        # ── Full CRM platforms ──
+        "HubSpot":           ["hubspot.com", "hs-scripts.com", "hsforms.com",
+                              "js.hs-scripts.com", "hs-analytics.net",
+                              "data-hubspot"],
+        "Salesforce":        ["salesforce.com", "pardot.com", "force.com",
+                              "salesforceliveagent", "salesforce-communities",
+                              "tfaforms.net"],
+        "Salesforce Marketing Cloud": [
+            "sfmc_utm",
+            "exacttarget.com",
+            "exacttarget",
+            "marketingcloud.com",
+            "salesforce-mc",
+            "members.list-manage",
+            "pub.s10.exacttarget.com",
+            "sfmc",
+        ],
+        "Zoho CRM":          ["zoho.com/crm", "zohopublic", "salesiq.zoho.com",
+                              "zohocrm", "campaigns.zoho"],
+        "Pipedrive":         ["pipedrive.com", "pipedriveassets.com"],
+        "Keap":              ["infusionsoft.com", "keap.com"],
+        "PatientPop":        ["patientpop.com"],
+        "Podium":            ["podium.com", "podium-widget"],
+        "Birdeye":           ["birdeye.com", "birdeye.io", "birdeyecdn"],
+        # ── Email marketing / automation ──
+        "ActiveCampaign":    ["activecampaign.com", "trackcmp.net",
+                              "activehosted.com", "acsbapp.com"],
+        "Mailchimp":         ["chimpstatic.com", "mailchimp.com", "mc.js",
+                              "list-manage.com", "mcjs", "data-mailchimp"],
+        "Klaviyo":           ["klaviyo.com", "_learnq", "static.klaviyo",
+                              "klaviyo_forms"],
+        "Campaign Monitor":  ["createsend.com", "campaignmonitor.com"],
+        "Brevo":             ["sendinblue.com", "brevo.com"],
+        "ConvertKit":        ["convertkit.com"],
+        "Constant Contact":  ["constantcontact.com"],
+        "GoHighLevel":       ["leadconnectorhq.com", "msgsndr.com", "link.msgsndr.com",
+                             "widgets.leadconnectorhq.com", "highlevel.com",
+                             "gohighlevel.com", "highlevel-chat"],
+        "LeadConnector":     ["leadconnectorhq.com", "link.msgsndr.com", "msgsndr.com"],
+        # plugins/send-app, send-app-cf7-form-tracker, send-app-elementor-form-tracker: catch WP plugin assets (CF7/Elementor form trackers); relative paths now in link_hrefs
+        "Send App":          ["plugins/send-app", "send-app-cf7-form-tracker", "send-app-elementor-form-tracker"],
+        "MediRecords (Clinical CRM)": ["medirecords"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 5. PAYMENTS & BILLING
+    # ─────────────────────────────────────────────────────────────────────
+    "payments": {
+        "Stripe":   ["js.stripe.com", "stripe.com/v3", "api.stripe.com"],
+        "Square":   ["squareup.com", "sq-payment-form", "square.com"],
+        "PayPal":   ["paypal.com", "paypalobjects.com"],
+        "Xero":     ["xero.com", "xero-widget"],
+        "MYOB":     ["myob.com"],
+        "Tyro":     ["tyro.com"],
+        "Medipass": ["medipass.com.au", "medipass-connect"],
+        "Hicaps":   ["hicaps.com.au"],
+        "Windcave": ["windcave.com", "paymentexpress.com"],
+        "Authorize.net": ["authorize.net", "acceptjs.authorize", "authorizeNet", "accept.authorize"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 7. TELEHEALTH / VIRTUAL CARE
+    # ─────────────────────────────────────────────────────────────────────
+    "telehealth": {
+        "AutoMed":                ["ams connect", "amsconnect", "automed telehealth"],
+        "Cliniko Telehealth":     ["telehealth.cliniko.com"],
+        "Healthdirect Video":     ["healthdirect.gov.au/video-call", "vcc.healthdirect.org.au"],
+        "Zoom":                   ["zoom.us", "zoom.com"],
+        "Coviu":                  ["coviu.com"],
+        "Whereby":                ["whereby.com", "appear.in"],
+        "Doxy.me":                ["doxy.me"],
+        "SimplePractice Telehealth": ["telehealth.simplepractice.com"],
+        "MedAdvisor":             ["medadvisor.com.au"],
+        "Hello Home Doctor":       ["hello home doctor", "134 100"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 8. FORMS & INTAKE
+    # ─────────────────────────────────────────────────────────────────────
+    "forms": {
+        # contact-form-7/includes: catches /wp-content/plugins/contact-form-7/includes/js/index.js, /includes/css/styles.css (was missed when only absolute URLs were collected)
+        "Contact Form 7":  ["plugins/contact-form-7", "contact-form-7", "wpcf7", "cf7", "contact-form-7/includes"],
+        # send-app-elementor-form-tracker: catches send-app-elementor-form-tracker.js inside wp-content/plugins/send-app/ (Elementor Forms integration)
+        # Guard: avoid bare "elementor" — too broad, matches Wix's feature-elementory-support, send-app tracker URL substrings
+        "Elementor Forms": ["elementor-pro", "elementor/assets", "plugins/elementor", "elementor-frontend", "/elementor/modules/forms", "send-app-elementor-form-tracker"],
+        "Gravity Forms":   ["gravityforms", "gform_", "gravity-forms"],
+        "WPForms":         ["wpforms", "wpforms-form"],
+        "Ninja Forms":     ["ninja-forms", "nf-form"],
+        "Snapforms":      ["snapforms.com.au", "snapforms"],
+        "AutoMed Forms":  ["ams form", "automed form", "new patient ams"],
+        "Typeform":  ["typeform.com", "embed.typeform.com"],
+        "JotForm":   ["jotform.com", "form.jotform.com"],
+        "Halaxy Forms": ["halaxy.com/form", "halaxy.com/eform"],
+        "Google Forms": ["docs.google.com/forms", "forms.gle"],
+        "Paperform":  ["paperform.co"],
+        "Cognito Forms": ["cognitoforms.com"],
+        "FormAssembly": ["tfaforms.net", "tfaforms.com", "formassembly.com", "fa-form", "wFORMS"],
+        "Formstack":    ["formstack.com", "fscdn.formstack.com", ".formstack.com/forms/"],
+        "HubSpot Forms": [
+            "hscollectedforms.net",
+            "forms.hsforms.com",
+            "js-ap1.hscollectedforms.net",
+            "hsforms.com/embed/v3/form",
+            "hsforms.net",
+        ],
+        "GoHighLevel Forms": ["link.msgsndr.com/js/form_embed", "msgsndr.com/js/form",
+                             "leadconnectorhq.com/form", "highlevel.*form"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 9. AD PIXELS & ANALYTICS
+    # ─────────────────────────────────────────────────────────────────────
+    "pixels": {
+        "Meta Pixel":         ["fbevents.js", "connect.facebook.net/en_us/fbevents", "fbq("],
+        "Google Ads":         ["googleadservices.com", "google_conversion"],
+        "Google Analytics 4": [
+            "gtag.js",
+            "googletagmanager.com/gtag",
+            "gtag/js?id=G-",              # GA4 measurement ID
+            "google-analytics.com/g/collect",  # GA4 hit endpoint
+        ],
+        "Google Universal Analytics": [
+            "gtag/js?id=UA-",
+            "google-analytics.com/analytics.js",  # UA async snippet
+            "ssl.google-analytics.com/ga.js",     # UA legacy snippet (ga.js)
+            "google-analytics.com/ga.js",         # non-SSL variant
+            "UA-\\d{4,}-\\d{1,}",                # UA-XXXXXXX-X inline ID
+        ],
+        "Google Tag Manager": ["googletagmanager.com", "gtm.js"],
+        "LinkedIn Insight":   ["snap.licdn.com", "linkedin.com/insight"],
+        "TikTok Pixel":       ["analytics.tiktok.com", "ttq.load"],
+        "Pinterest":          ["pintrk(", "ct.pinterest.com"],
+        "Snapchat":           ["sc-static.net", "snaptr("],
+        "Hotjar":             ["hotjar.com", "hjsetting"],
+        "Microsoft Clarity":  ["clarity.ms", "microsoft.com/clarity"],
+        "Segment":            ["segment.com", "analytics.js"],
+        "Mixpanel":           ["mixpanel.com"],
+        "Heap":               ["heap.io"],
+        "Call Dynamics":      ["calldynamics.com.au", "artemisData"],
+        "DoubleClick / Floodlight": [
+            "googletagmanager.com/gtag/js?id=DC-",
+            "fls.doubleclick.net",
+            "stats.g.doubleclick.net",
+            "id=DC-",
+        ],
+        "Bing Ads":         ["bat.bing.com", "bat.js", "microsoft.com/bat", "bing.com/ads"],
+        "Outbrain":         ["amplify.outbrain.com", "obtp.js", "outbrain.com"],
+        "Taboola":          ["cdn.taboola.com", "taboola.com/libtrc"],
+        "Reddit Ads": [
+            "rdt.js",                        # Reddit pixel script filename
+            "alb.reddit.com",                # Reddit pixel network endpoint
+            "reddit-pixel",                  # inline snippet identifier
+            "!function(w,d){if(!w.rdt)",     # Reddit pixel bootstrap snippet
+        ],
+        "CallRail":         ["cdn.callrail.com", "callrail.com"],
+        "Contentsquare":    ["hj.contentsquare.net", "contentsquare.net", "csq-"],
+        "Simpli.fi":        ["tag.simpli.fi", "simpli.fi"],
+        "AD360":            ["cdn.ad360.media", "ad360.media", "ad360pixelevent"],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 10. LIVE CHAT & PATIENT MESSAGING
+    # ─────────────────────────────────────────────────────────────────────
+    "live_chat": {
+        "Intercom":       ["intercom.com", "widget.intercom.io", "intercomsettings"],
+        "Drift":          ["drift.com", "js.drift.com"],
+        "Tawk.to":        ["tawk.to", "embed.tawk.to"],
+        "Zendesk":        ["zendesk.com", "zopim.com", "zdassets.com"],
+        "Crisp":          ["crisp.chat", "client.crisp.chat"],
+        "LiveChat":       ["livechatinc.com", "__lc"],
+        "Freshchat":      ["freshchat.com", "wchat.freshchat.com"],
+        "HubSpot Chat":   ["hubspot-messages"],
+        "WhatsApp Widget":["wa.me", "whatsapp.com/send", "api.whatsapp"],
+        "Podium Chat":    ["podium.com", "podiumwidget"],
+        "Birdeye Chat":   ["birdeye.com"],
+        "Tidio":          ["tidio.com", "tidiochat"],
+        "GoHighLevel Chat": ["widgets.leadconnectorhq.com/chat-widget",
+                            "leadconnectorhq.com/chat", "msgsndr.com/chat"],
+        "Genesys": [
+            "mypurecloud.com",
+            "mypurecloud.com.au",
+            "genesys.com",
+            "genesys-bootstrap",
+            "genesys.min.js",
+            "purecloud.com",
+            "apps.mypurecloud",
+        ],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 11. REVIEWS & REPUTATION
+    # ─────────────────────────────────────────────────────────────────────
+    "reviews": {
+        "Google Reviews": [
+            # Schema.org structured rating data (self-reported stars on the page)
+            "aggregaterating",
+            "ratingvalue",
+            "ratingcount",
+            # Embedded Google Maps widget with reviews panel (not just a link)
+            "google.com/maps/embed",
+            "maps.googleapis.com/maps/api/js",
+            # Google Places reviews widget
+            "maps.googleapis.com/maps/api/place",
+            # Direct Places review deep-link (write-a-review CTA)
+            "search.google.com/local/writereview",
+            "g.co/kgs",  # Knowledge Graph - only in structured widgets
+        ],
+        # loader-feed.js: CDN script (cdn.trustindex.io/loader-feed.js); trustindex-feed-instagram-widget: relative CSS /wp-content/uploads/trustindex-feed-instagram-widget.css (was missed before relative link hrefs fix)
+        "Trustindex":            ["cdn.trustindex.io", "trustindex-feed", "loader-feed.js", "trustindex-feed-instagram-widget"],
+        "Doctify":               ["doctify.com"],
+        "HealthEngine Reviews":  ["healthengine.com.au"],
+        "RateMDs":               ["ratemds.com"],
+        "Trustpilot":            ["trustpilot.com", "widget.trustpilot"],
+        "Podium Reviews":        ["podium.com", "podium-widget"],
+        "Birdeye Reviews":       ["birdeye.com"],
+        "Feefo":                 ["feefo.com"],
+        "Whitecoat":             ["whitecoat.com.au"],
+        "Elfsight": [
+            "static.elfsight.com",
+            "elfsight.com/platform",
+            "apps.elfsight.com",
+            "elfsight-app",
+        ],
+    },
+
+    # ─────────────────────────────────────────────────────────────────────
+    # 11. INFRASTRUCTURE / CDN / HOSTING
+    # Signals here = the CLINIC'S OWN hosting stack, not third-party vendors.
+    # Primary detection comes from HTTP headers via detect_from_headers().
+    # HTML-based patterns below are conservative — only match highly specific
+    # fingerprints that indicate direct use, not third-party asset loading.
+    # ─────────────────────────────────────────────────────────────────────
+    "infra": {
+        # Cloudflare: cookie/header fingerprints (set by detect_from_headers too)
+        "Cloudflare":   ["__cf_bm", "cf-ray", "cloudflare-nginx"],
+        # Vercel: only vercel.app subdomains = actually hosted on Vercel
+        "Vercel":       ["vercel.app"],
+        # Netlify: only netlify.app subdomains or netlify identity scripts
+        "Netlify":      ["netlify.app", "netlify-identity-widget"],
+        # AWS: only match the site's OWN S3/CloudFront, not third-party scripts.
+        # Use a long-form match to reduce false positives.
+        "AWS":          ["s3.amazonaws.com", "s3-ap-southeast-2.amazonaws.com",
+                         "s3-us-east-1.amazonaws.com"],
+        # Azure: only actual Azure-hosted sites
+        "Azure":        ["azurewebsites.net", "azureedge.net"],
+        # Google Cloud: excluded — too many false positives (GCS/storage URLs from embeds, CDN)
+        # Kinsta, WP Engine, Flywheel — common managed WordPress hosts in AU
+        "Kinsta":       ["kinsta.cloud", "kinstacdn.com"],
+        "WP Engine":    ["wpengine.com", "wpenginepowered.com"],
+        "Flywheel":     ["flywheelstaging.com", "flywheelsites.com"],
+        "Pantheon":     ["pantheonsite.io"],
+        "HealthLink":   ["healthlink.net", "healthlink edi", "edi:", "healthlink secure"],
+        "VentraIP":     ["ventraip.com.au", "synergywholesale.com", "cpanel", "ventra"],
+        "cPanel":       ["cpanel", "whm.cpanel", "cpsess"],
+        "Crazy Domains":["crazydomains.com.au"],
+        "NetRegistry":  ["netregistry.com.au"],
+        "GreenGeeks":   ["greengeeks.com"],
+        "SiteGround":   ["siteground.com", "sgcpanel"],
+        "WPStaq":       ["wpstaq", "wpstaq.com"],
+        "NitroPack":    ["nitropack.io", "x-nitro-cache", "cdn-akhmn.nitrocdn.com", "nitrocdn.com"],
+    },
+}
+
+# Visible text signatures — phrases that appear in page copy (not scripts/URLs).
+# Uses regex for flexible matching. Catches tools referenced in copy but not exposed via scripts/iframes.
+VISIBLE_TEXT_SIGNATURES = {
+    "pms_ehr": {
+        "Best Practice":    ["best practice software", "bp premier", "proficiency in best practice"],
+        "AutoMed":         ["ams connect", "automed systems", "ams connect app"],
+        "MedicalDirector": ["medical director", "helix"],
+        "Salesforce":       ["salesforce", "health cloud", "salesforce health cloud"],
+        "Genea":            ["powered by genea", "genea kinnect", "genea world"],
+        "Dental4Windows":  ["dental4windows", "d4w", "centaur portal", "centaur software"],
+    },
+    "booking": {
+        "AutoMed":         ["book.*ams connect", "ams connect app", "appointments through.*ams"],
+        "HotDoc":          ["hotdoc widget", "book online.*hotdoc", "hotdoc.*book online",
+                           "cdn.hotdoc.com.au", "hotdoc.com.au", "book.*hotdoc", "hotdoc.*book", "hotdoc telehealth", "quick consult"],
+        "HealthEngine":    ["healthengine.com.au", "book.*healthengine"],
+        "FormAssembly":    ["request a consultation", "request.*appointment.*form", "tfaforms"],
+        "Genea Kinnect":   ["genea kinnect", "kinnect app", "manage.*appointments.*kinnect"],
+        "D4W eAppointments": ["centaurportal", "d4w.*book", "book.*d4w", "centaur.*book"],
+    },
+    "telehealth": {
+        "AutoMed":         ["telehealth.*ams connect", "ams connect.*telehealth", "download.*ams connect.*video"],
+        "HotDoc":          ["telehealth.*hotdoc", "hotdoc.*telehealth", "hotdoc.*video consult", "phone consult.*hotdoc", "video consult.*hotdoc"],
+        "Coviu":           ["coviu", "video.*coviu"],
+        "Zoom":            ["zoom.*telehealth", "telehealth.*zoom"],
+        "Hello Home Doctor": ["hello home doctor", "134 100"],
+    },
+    "forms": {
+        "Contact Form 7":  ["contact form 7", "wpcf7", "powered by contact form 7"],
+        "Snapforms":       ["snapforms"],
+        "AutoMed Forms":   ["new patient.*ams", "ams.*new patient", "registration.*ams connect"],
+        "HotDoc Forms":    ["repeat prescription.*hotdoc", "specialist referral.*hotdoc", "hotdoc.*quick consult", "quick consult.*hotdoc"],
+        "FormAssembly":    ["tfaforms", "formassembly", "request a consultation"],
+        "GoHighLevel Forms": ["highlevel.*form", "leadconnector.*form"],
+    },
+    "crm": {
+        "Salesforce":      ["salesforce", "formassembly", "tfaforms"],
+        "GoHighLevel":     ["msgsndr", "leadconnector", "gohighlevel",
+                           "appointment reminder.*highlevel", "newsletter.*highlevel"],
+    },
+    "live_chat": {
+        "GoHighLevel Chat": ["chat.*highlevel", "leadconnector.*chat"],
+    },
+    "reviews": {
+        "Google Reviews":  ["google reviews", "google maps", "write a review.*google", "review us on google"],
+        "Elfsight":        ["elfsight", "powered by elfsight"],
+    },
+    "infra": {
+        "HealthLink":      ["healthlink edi", "edi:", "healthlink secure messaging"],
+        "VentraIP":        ["ventraip", "synergy wholesale", "hosted by ventraip",
+                            "parked.*ventraip"],
+        "cPanel":          ["cpanel", "webmail", "cPanel Email"],
+    },
+    "payments": {
+        "HICAPS":   ["hicaps available", "hicaps terminal", "hicaps on-site",
+                     "eftpos and hicaps", "hicaps and eftpos", "hicaps claims",
+                     "health fund claims.*hicaps", "hicaps"],
+        "Tyro":     ["tyro", "tyro payments", "tyro health"],
+        "Medipass": ["medipass", "medipass connect"],
+    },
+}
+
+# Header-based infra detection (Server, X-Powered-By, CF-Ray, Via, X-Generator)
+# Excluded: Fastly, Google Cloud — too many false positives (CDN/proxy headers from third-party assets)
+HEADER_SIGNATURES = {
+    "Cloudflare":    ["cloudflare", "cf-ray"],
+    "AWS":           ["amazonaws", "cloudfront", "x-amz"],
+    "Azure":         ["azure", "azurewebsites", "azureedge"],
+    "nginx":         ["nginx"],
+    "Apache":        ["apache"],
+    "Microsoft-IIS": ["microsoft-iis", "iis"],
+    "Vercel":        ["vercel"],
+    "Netlify":       ["netlify"],
+    "Kinsta":        ["kinsta"],
+    "WP Engine":     ["wpengine"],
+    "LiteSpeed":     ["litespeed"],            # common in AU shared hosting
+    "VentraIP":      ["ventraip", "synergy", "cpanel"],
+    "cPanel/Apache": ["apache", "cpanel"],
+    "Parked Domain": ["parking", "parked-domain", "domain-for-sale"],
+    "WPStaq":        ["wpstaq"],
+    "NitroPack":     ["x-nitro-cache", "nitropack", "nitro-cache"],
+}
+
+# Network request interception — catches dynamically loaded booking, pixels, chat.
+# Keys are substrings of the lowercased request URL (hosts, host+path, or bare path fragments).
+NETWORK_WATCH_DOMAINS = {
+    # ── Booking / PMS ──
+    "cdn.hotdoc.com.au":       ("booking", "HotDoc"),
+    "hotdoc-widgets.min.js":   ("booking", "HotDoc"),
+    "hotdoc.com.au":           ("booking", "HotDoc"),
+    "book.hotdoc.com.au":      ("booking", "HotDoc"),
+    "hotdoc.com.au/medical":   ("booking", "HotDoc"),
+    "healthengine.com.au":     ("booking", "HealthEngine"),
+    "cliniko.com":             ("pms_ehr", "Cliniko"),
+    "halaxy.com":              ("pms_ehr", "Halaxy"),
+    "powerdiary.com":          ("pms_ehr", "Power Diary"),
+    "nookal.com":              ("pms_ehr", "Nookal"),
+    "janeapp.com":             ("pms_ehr", "Jane App"),
+    "splose.com":              ("pms_ehr", "Splose"),
+    "calendly.com":            ("booking", "Calendly"),
+    "acuityscheduling.com":    ("booking", "Acuity"),
+    "automed.com.au":          ("booking", "AutoMed"),
+    "mindbodyonline.com":      ("pms_ehr", "Mindbody"),
+    "fresha.com":              ("pms_ehr", "Fresha"),
+    "gettimely.com":           ("pms_ehr", "Timely"),
+    "simplepractice.com":      ("pms_ehr", "SimplePractice"),
+    "practicebetter.io":       ("pms_ehr", "Practice Better"),
+    "frontdesk.com.au":        ("pms_ehr", "Front Desk"),
+    # ── PMS / EHR portals ──
+    "clientsecure.me":         ("pms_ehr", "SimplePractice"),
+    "mychart.com":             ("pms_ehr", "Epic"),
+    "athenahealth.com":        ("pms_ehr", "Athenahealth"),
+    "drchrono.com":            ("pms_ehr", "DrChrono"),
+    "eclinicalworks.com":      ("pms_ehr", "eClinicalWorks"),
+    # ── CRM ──
+    "weve.to":                 ("crm", "Weave"),
+    # ── Forms / Intake ──
+    "intakeq.com":             ("forms", "IntakeQ"),
+    "tfaforms.net":            ("forms", "FormAssembly"),
+    # ── Booking ──
+    "zocdoc.com":              ("booking", "Zocdoc"),
+    "doctolib.com":            ("booking", "Doctolib"),
+    "setmore.com":             ("booking", "Setmore"),
+    # ── Pixels ──
+    "connect.facebook.net":    ("pixels", "Meta Pixel"),
+    "analytics.tiktok.com":    ("pixels", "TikTok Pixel"),
+    "googletagmanager.com":    ("pixels", "Google Tag Manager"),
+    "googleadservices.com":    ("pixels", "Google Ads"),
+    "google-analytics.com/analytics.js": ("pixels", "Google Universal Analytics"),
+    "ssl.google-analytics.com/ga.js":    ("pixels", "Google Universal Analytics"),
+    "google-analytics.com/ga.js":        ("pixels", "Google Universal Analytics"),
+    "snap.licdn.com":          ("pixels", "LinkedIn Insight"),
+    "ct.pinterest.com":        ("pixels", "Pinterest"),
+    "clarity.ms":              ("pixels", "Microsoft Clarity"),
+    "hotjar.com":              ("pixels", "Hotjar"),
+    "bat.bing.com":            ("pixels", "Bing Ads"),
+    "amplify.outbrain.com":    ("pixels", "Outbrain"),
+    "cdn.taboola.com":         ("pixels", "Taboola"),
+    "alb.reddit.com":           ("pixels", "Reddit Ads"),
+    "rdt.js":                   ("pixels", "Reddit Ads"),
+    "cdn.callrail.com":        ("pixels", "CallRail"),
+    "hj.contentsquare.net":     ("pixels", "Contentsquare"),
+    "tag.simpli.fi":           ("pixels", "Simpli.fi"),
+    "cdn.ad360.media":         ("pixels", "AD360"),
+    "fls.doubleclick.net":     ("pixels", "DoubleClick / Floodlight"),
+    "stats.g.doubleclick.net":  ("pixels", "DoubleClick / Floodlight"),
+    # ── Telehealth ──
+    "zoom.us":                 ("telehealth", "Zoom"),
+    "coviu.com":               ("telehealth", "Coviu"),
+    "vcc.healthdirect.org.au": ("telehealth", "Healthdirect Video"),
+    "telehealth.cliniko.com":  ("telehealth", "Cliniko Telehealth"),
+    # ── Live Chat ──
+    "widget.intercom.io":      ("live_chat", "Intercom"),
+    "js.drift.com":            ("live_chat", "Drift"),
+    "embed.tawk.to":           ("live_chat", "Tawk.to"),
+    "zdassets.com":            ("live_chat", "Zendesk"),
+    "client.crisp.chat":       ("live_chat", "Crisp"),
+    "wchat.freshchat.com":     ("live_chat", "Freshchat"),
+    "apps.mypurecloud.com.au": ("live_chat", "Genesys"),
+    "apps.mypurecloud.com":    ("live_chat", "Genesys"),
+    "genesys.com":             ("live_chat", "Genesys"),
+    "genesyscloud.com":        ("live_chat", "Genesys"),
+    # ── CRM / Email Marketing ──
+    "hs-scripts.com":          ("crm", "HubSpot"),
+    "pardot.com":              ("crm", "Salesforce"),
+    "exacttarget.com":         ("crm", "Salesforce Marketing Cloud"),
+    "marketingcloud.com":      ("crm", "Salesforce Marketing Cloud"),
+    "salesiq.zoho.com":        ("crm", "Zoho CRM"),
+    "pipedriveassets.com":     ("crm", "Pipedrive"),
+    "podium.com":              ("crm", "Podium"),
+    "birdeye.com":             ("reviews", "Birdeye"),
+    "klaviyo.com":             ("crm", "Klaviyo"),
+    "chimpstatic.com":         ("crm", "Mailchimp"),
+    "trackcmp.net":            ("crm", "ActiveCampaign"),
+    # ── Payments ──
+    "js.stripe.com":           ("payments", "Stripe"),
+    "squareup.com":            ("payments", "Square"),
+    "medipass.com.au":         ("payments", "Medipass"),
+    "authorize.net":             ("payments", "Authorize.net"),
+    "acceptjs.authorize.net":    ("payments", "Authorize.net"),
+    # ── Forms ──
+    "typeform.com":            ("forms", "Typeform"),
+    "jotform.com":             ("forms", "JotForm"),
+    "hscollectedforms.net":    ("forms", "HubSpot Forms"),
+    "forms.hsforms.com":       ("forms", "HubSpot Forms"),
+    "hsforms.net":             ("forms", "HubSpot Forms"),
+    "formstack.com":           ("forms", "Formstack"),
+    "fscdn.formstack.com":     ("forms", "Formstack"),
+    # ── Centaur Portal / D4W ──
+    "centaurportal.com":       ("booking", "D4W eAppointments"),
+    # ── GoHighLevel / LeadConnector ──
+    "api.leadconnectorhq.com":      ("crm", "GoHighLevel"),
+    "backend.leadconnectorhq.com":  ("crm", "GoHighLevel"),
+    "stcdn.leadconnectorhq.com":    ("crm", "GoHighLevel"),
+    "widgets.leadconnectorhq.com":  ("crm", "GoHighLevel"),
+    "link.msgsndr.com":             ("forms", "GoHighLevel Forms"),
+    "msgsndr.com":                  ("crm", "GoHighLevel"),
+    "gohighlevel.com":              ("crm", "GoHighLevel"),
+    "cdn.trustindex.io":       ("reviews", "Trustindex"),
+    "trustindex.io":           ("reviews", "Trustindex"),
+    "static.elfsight.com":     ("reviews", "Elfsight"),
+    "apps.elfsight.com":      ("reviews", "Elfsight"),
+    "elfsight.com":           ("reviews", "Elfsight"),
+    "plugins/send-app":        ("crm", "Send App"),
+    "medirecords":             ("crm", "MediRecords (Clinical CRM)"),
+    # Mailgun / LeadConnector transactional email
+    "mailgun.org":              ("crm", "Mailgun"),
+    "mg.mail":                  ("crm", "Mailgun"),
+    # ── Infra / CDN ──
+    "nitrocdn.com":             ("infra", "NitroPack"),
+    "nitropack.io":             ("infra", "NitroPack"),
+    "b-cdn.net":                ("infra", "Bunny CDN"),
+    "cdn.bunny.net":            ("infra", "Bunny CDN"),
+}
+
+# Filename-based detection for tools deployed on custom subdomains
+FILENAME_SIGNATURES = {
+    "sfmc_utm":        ("crm",      "Salesforce Marketing Cloud"),
+    "sfmc.js":         ("crm",      "Salesforce Marketing Cloud"),
+    "callrail":        ("pixels",   "CallRail"),
+    "contentsquare":   ("pixels",   "Contentsquare"),
+    "obtp.js":         ("pixels",   "Outbrain"),
+    "taboola":         ("pixels",   "Taboola"),
+    "bat.js":          ("pixels",   "Bing Ads"),
+    "reddit":          ("pixels",   "Reddit Ads"),
+}
+
+# Theme detection pass (WordPress themes/page builders)
+THEME_SIGNATURES = {
+    "Divi":            ["/themes/Divi/", "/themes/divi/", "et_pb_", "divi-child"],
+    "Elementor":       ["/plugins/elementor/", "elementor-frontend", "data-elementor-type"],
+    "Avada":           ["/themes/Avada/", "fusion-builder"],
+    "Beaver Builder":  ["fl-builder", "/plugins/bb-plugin/"],
+    "WPBakery":        ["vc_row", "wpb_wrapper"],
+    "GeneratePress":   ["/themes/generatepress/"],
+    "Astra":           ["/themes/astra/"],
+}
+
+# -----------------------------------------------------------------------------
+# Ecommerce tables (main_ecom.py)
+# -----------------------------------------------------------------------------
+
+# Tech Stack Signatures (HTML text search)
+ECOM_TECH_SIGNATURES = {
+    'platform': {
+        'Shopify': ['cdn.shopify.com', 'Shopify.theme', 'shopify.com'],
+        'WooCommerce': ['wp-content/plugins/woocommerce', 'woocommerce-product-gallery'],
+        'BigCommerce': ['cdn11.bigcommerce.com', 'bigcommerce.com'],
+        'Magento': ['/static/version', 'mage/cookies'],
+        'Wix': ['wix.com', 'wix-thunderbolt'],
+        'Squarespace': ['squarespace.com', 'static1.squarespace.com'],
+    },
+    'email_marketing': {
+        'Klaviyo': ['klaviyo.js', 'klaviyo.com', '_learnq'],
+        'Mailchimp': ['chimpstatic.com', 'mailchimp.com', 'mc.js'],
+        'Omnisend': ['omnisend.com', 'omnisrc.com'],
+        'Privy': ['privy.com', 'privy-widget'],
+        'Sendlane': ['sendlane.com'],
+    },
+    'sms': {
+        'Postscript': ['postscript.io', 'sdk.postscript.io'],
+        'Attentive': ['attentivemobile.com', 'cdn.attn.tv'],
+        'SMSBump': ['smsbump.com', 'yotpo-sms'],
+        'Recart': ['recart.com'],
+    },
+    'subscriptions': {
+        'Recharge': ['rechargeapps.com', 'recharge-payments'],
+        'Skio': ['skio.com', 'skio-plan-picker'],
+        'Bold': ['boldapps.net', 'bold-common'],
+        'Smartrr': ['smartrr.com'],
+    },
+    'reviews': {
+        'Yotpo': ['staticw2.yotpo.com', 'yotpo-widgets'],
+        'Stamped': ['stamped.io', 'stamped-main-widget'],
+        'Loox': ['loox.io', 'loox-rating'],
+        'Judge.me': ['judge.me', 'judgeme_core'],
+        'Okendo': ['okendo.io', 'oke-reviews'],
+        'Junip': ['junip.co'],
+    },
+    'loyalty': {
+        'Smile.io': ['smile.io', 'smile-ui'],
+        'Yotpo Loyalty (Swell)': ['swell-rewards', 'yotpo-loyalty'],
+        'LoyaltyLion': ['loyaltylion.com', 'loyaltylion-sdk'],
+        'Rivo': ['rivo.io'],
+    },
+    'pixels': {
+        'Meta/FB': ['fbevents.js', 'fbq('],
+        'TikTok': ['ttq.load', 'analytics.tiktok.com'],
+        'GA4/GTM': ['googletagmanager.com', 'gtag(', 'ga('],
+        'Pinterest': ['pintrk('],
+        'Snapchat': ['snaptr('],
+    },
+}
+
+# -----------------------------------------------------------------------------
+# Registry: version hash + compiled matchers
+# -----------------------------------------------------------------------------
+
+SIGNATURE_TABLES = {
+    "cookie": COOKIE_SIGNATURES,
+    "framework_cookie": FRAMEWORK_COOKIE_SIGNATURES,
+    "csp": CSP_SIGNATURES,
+    "meta_generator": META_GENERATOR_SIGNATURES,
+    "js_inline": JS_INLINE_SIGNATURES,
+    "robots": ROBOTS_SIGNATURES,
+    "dns": DNS_SIGNATURES,
+    "mx": MX_SIGNATURES,
+    "mx_variants": MX_VARIANTS,
+    "tech": TECH_SIGNATURES,
+    "visible_text": VISIBLE_TEXT_SIGNATURES,
+    "header": HEADER_SIGNATURES,
+    "network_watch": NETWORK_WATCH_DOMAINS,
+    "filename": FILENAME_SIGNATURES,
+    "theme": THEME_SIGNATURES,
+    "ecom_tech": ECOM_TECH_SIGNATURES,
+}
+
+
+def _signature_version(tables: dict) -> str:
+    """Short content hash of every table — changes whenever any signature changes."""
+    canonical = json.dumps(tables, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+SIGNATURE_VERSION = _signature_version(SIGNATURE_TABLES)
+# Narrower hash for caches of JS_INLINE_SIGNATURES hits (core.ScriptScanCache)
+JS_INLINE_VERSION = _signature_version({"js_inline": JS_INLINE_SIGNATURES})
+
+
+def _substring_matcher(table: dict) -> SignatureMatcher:
+    """Compile a {pattern: (category, tool)} table into a SignatureMatcher."""
+    return SignatureMatcher({pattern: [owner] for pattern, owner in table.items()})
+
+
+def _grouped_matcher(table: dict) -> SignatureMatcher:
+    """Compile a {name: [patterns]} table (HEADER_SIGNATURES) into a SignatureMatcher of names."""
+    index = {}
+    for name, patterns in table.items():
+        for pat in patterns:
+            index.setdefault(pat, []).append(name)
+    return SignatureMatcher(index)
+
+
+def _nested_matcher(table: dict) -> SignatureMatcher:
+    """
+    Compile a {category: {tool: [patterns]}} table (ECOM_TECH_SIGNATURES) into a
+    case-insensitive SignatureMatcher of (category, tool) pairs.
+    """
+    index = {}
+    for category, tools in table.items():
+        for tool_name, patterns in tools.items():
+            for pat in patterns:
+                index.setdefault(pat.lower(), []).append((category, tool_name))
+    return SignatureMatcher(index)
+
+
+def _compile_mx_signatures(table: list) -> tuple:
+    """
+    Compile MX_SIGNATURES into (substring matcher of keys, prefix rules as
+    (prefix, unless, key), {key: output rank}).
+    """
+    index = {}
+    prefixes = []
+    for key, rule in table:
+        for pat in rule.get("contains", ()):
+            index.setdefault(pat, []).append(key)
+        for pat in rule.get("prefix", ()):
+            prefixes.append((pat, tuple(rule.get("unless", ())), key))
+    return SignatureMatcher(index), tuple(prefixes), {key: rank for rank, (key, _) in enumerate(table)}
+
+
+def _compile_tech_signatures(tech: dict, filenames: dict, themes: dict) -> tuple:
+    """
+    Compile TECH_SIGNATURES (+ filename and theme fingerprints, which scan the
+    same all_sources haystack) into (sources matcher, visible-text matcher).
+    The length guards live here: TECH_SIGNATURES patterns under 6 chars are
+    dropped entirely and only those of 8+ chars may match in visible text.
+    """
+    sources = {}
+    text = {}
+    for category, tools in tech.items():
+        for tool_name, patterns in tools.items():
+            for pattern in patterns:
+                pat = pattern.lower()
+                # GUARD: skip patterns too short to be reliable
+                if len(pat) < 6:
+                    continue
+                sources.setdefault(pat, set()).add((category, tool_name))
+                if len(pat) >= 8:
+                    text.setdefault(pat, set()).add((category, tool_name))
+    for filename_sig, owner in filenames.items():
+        sources.setdefault(filename_sig, set()).add(owner)
+    for theme_name, patterns in themes.items():
+        for pat in patterns:
+            sources.setdefault(pat.lower(), set()).add(("cms", f"WordPress ({theme_name})"))
+    return SignatureMatcher(sources), SignatureMatcher(text)
+
+
+# Regex syntax beyond "." and ".*" — phrases using it are always confirmed with re.search
+_PHRASE_REGEX_META = set("()[]{}|^$\\+?")
+
+
+def _required_literals(phrase: str):
+    """
+    Literal fragments every match of a "." / ".*" phrase must contain
+    (e.g. "book.*hotdoc" -> ["book", "hotdoc"]). Returns None for anything fancier.
+    """
+    if any(ch in _PHRASE_REGEX_META for ch in phrase):
+        return None
+    if "*" in phrase.replace(".*", ""):
+        return None
+    fragments = [f for f in re.split(r"\.\*|\.", phrase) if f]
+    return fragments or None
+
+
+def _compile_visible_text_signatures(signatures: dict) -> tuple:
+    """
+    Compile VISIBLE_TEXT_SIGNATURES.
+    Plain phrases go straight into one automaton. Regex phrases contribute their
+    required literal fragments to the same automaton and are only confirmed with
+    re.search when every fragment was seen, so each text is scanned once.
+    Returns (literal -> [(category, tool)], [(regex, fragments, category, tool)], automaton).
+    """
+    literal_index = {}
+    regex_phrases = []
+    for category, tools in signatures.items():
+        for tool_name, phrases in tools.items():
+            for phrase in phrases:
+                if not any(ch in _PHRASE_REGEX_META or ch in ".*" for ch in phrase):
+                    literal_index.setdefault(phrase, []).append((category, tool_name))
+                else:
+                    regex_phrases.append(
+                        (re.compile(phrase), _required_literals(phrase), category, tool_name)
+                    )
+    fragments = [f for _, frags, _, _ in regex_phrases if frags for f in frags]
+    return literal_index, regex_phrases, PatternAutomaton([*literal_index, *fragments])
+
+
+TECH_SOURCES_MATCHER, TECH_TEXT_MATCHER = _compile_tech_signatures(
+    TECH_SIGNATURES, FILENAME_SIGNATURES, THEME_SIGNATURES
+)
+(VISIBLE_TEXT_LITERALS,
+ VISIBLE_TEXT_REGEXES,
+ VISIBLE_TEXT_AUTOMATON) = _compile_visible_text_signatures(VISIBLE_TEXT_SIGNATURES)
+CSP_MATCHER = _substring_matcher(CSP_SIGNATURES)
+META_GENERATOR_MATCHER = _substring_matcher(META_GENERATOR_SIGNATURES)
+JS_INLINE_MATCHER = _substring_matcher(JS_INLINE_SIGNATURES)
+ROBOTS_MATCHER = _substring_matcher(ROBOTS_SIGNATURES)
+MX_MATCHER, MX_PREFIX_RULES, MX_RANK = _compile_mx_signatures(MX_SIGNATURES)
+DNS_MATCHERS = {rdtype: _substring_matcher(table) for rdtype, table in DNS_SIGNATURES.items()}
+NETWORK_WATCH_MATCHER = _substring_matcher(NETWORK_WATCH_DOMAINS)
+HEADER_MATCHER = _grouped_matcher(HEADER_SIGNATURES)
+ECOM_TECH_MATCHER = _nested_matcher(ECOM_TECH_SIGNATURES)
+
+
+def classify_request_url(req_url: str) -> set:
+    """
+    Classify one intercepted request URL against NETWORK_WATCH_DOMAINS.
+    Single pass over the URL via the precompiled automaton.
+    Returns set of (category, name) hits.
+    """
+    return NETWORK_WATCH_MATCHER.match(req_url.lower())